@@ -1,23 +1,28 @@
 import asyncio
+import os
+import sys
 import websockets
 import json
 
+# The tracked pairs come from the project's shared pairs.json
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                "crypto-portfolio-project"))
+from http_handler import AsyncHTTPHandler  # noqa: E402
+from pair_registry import PairRegistry  # noqa: E402
+from price_service import LatestPrices  # noqa: E402
 
-CURRENCY_PAIRS = ["btcusd", "ethusd",
-                  "xrpusd", "xlmusd", "hbarusd", "vetusd", "csprusd", "xdcusd"]
 # Bitstamp websocket API URL
 WS_URL = "wss://ws.bitstamp.net"
+HTTP_BASE_URL = "https://www.bitstamp.net/api/v2"
 
-# Store latest price
-latest_price = {}
+# Latest state per pair, the same table the main ingest serves over HTTP
+latest_prices = LatestPrices()
 
 
 async def process_message(message):
     """
     Process a Websocket message and update the latest price
     """
-    global latest_price
-
     message_data = json.loads(message)
     event = message_data.get("event")
     data = message_data.get("data")
@@ -27,7 +32,7 @@ async def process_message(message):
         price = float(data["price"])
 
         # Update in memory latest price
-        latest_price[currency_pair] = price
+        latest_prices.on_trade(currency_pair, price, int(data["timestamp"]))
 
         print(f"[{currency_pair}] Spot Price: = {price} USD")
 
@@ -51,9 +56,12 @@ async def main():
     """
     Main Websocket connection handler for subscribing to Bitstamp API currency pairs and processing messages
     """
+    registry = PairRegistry(AsyncHTTPHandler(base_url=HTTP_BASE_URL, tracked_currency_pairs=[]))
+    await registry.refresh()
+
     async with websockets.connect(WS_URL) as websocket:
         # Subscribe to currency pairs
-        await subscribe_to_pairs(websocket, CURRENCY_PAIRS)
+        await subscribe_to_pairs(websocket, registry.pairs)
 
         # Listen to Websocket messages continuously
         while True:
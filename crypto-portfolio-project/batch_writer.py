@@ -0,0 +1,155 @@
+import threading
+import time
+
+
+class BatchWriter:
+    def __init__(self, write_api, bucket, batch_size=5000, flush_interval=1.0,
+                 on_success=None, on_error=None):
+        """
+        Buffer records in memory and write them to InfluxDB in batches from a background thread.
+
+        Args:
+            write_api: A synchronous influxdb_client WriteApi used to send each batch.
+            bucket (str): Target bucket for every record written through this writer.
+            batch_size (int): Flush as soon as this many records are buffered.
+            flush_interval (float): Flush at least this often (seconds) while records are pending.
+            on_success (callable): Called as on_success(bucket, batch) after a batch is written.
+            on_error (callable): Called as on_error(bucket, batch, exception) when a batch fails.
+        """
+        self.write_api = write_api
+        self.bucket = bucket
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.on_success = on_success
+        self.on_error = on_error
+
+        self._buffer = []
+        self._in_flight = 0
+        self._closed = False
+        self._flush_requested = False
+        self._condition = threading.Condition()
+
+        self._thread = threading.Thread(
+            target=self._run, name=f"batch-writer-{bucket}", daemon=True)
+        self._thread.start()
+
+    def write(self, record):
+        """
+        Queue a record (Point or line protocol string) for the next batch. Never blocks on I/O.
+        None (a line the serializer dropped for having no valid fields) is ignored.
+        """
+        if record is None:
+            return
+        with self._condition:
+            if self._closed:
+                raise RuntimeError(f"BatchWriter for {self.bucket} is closed")
+            self._buffer.append(record)
+            if len(self._buffer) >= self.batch_size:
+                self._condition.notify()
+
+    def write_many(self, records):
+        """
+        Queue several records at once.
+        """
+        with self._condition:
+            if self._closed:
+                raise RuntimeError(f"BatchWriter for {self.bucket} is closed")
+            self._buffer.extend(records)
+            if len(self._buffer) >= self.batch_size:
+                self._condition.notify()
+
+    def pending(self):
+        """
+        Number of records buffered or currently being written.
+        """
+        with self._condition:
+            return len(self._buffer) + self._in_flight
+
+    def flush(self, timeout=None):
+        """
+        Write everything buffered so far and wait until it has been sent.
+
+        Returns:
+            bool: True if the buffer drained before the timeout.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            self._flush_requested = True
+            self._condition.notify_all()
+            while self._buffer or self._in_flight:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+        return True
+
+    def close(self, timeout=None):
+        """
+        Flush pending records and stop the background thread.
+        """
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join(timeout)
+
+    def _take_batch(self):
+        """
+        Wait until a batch is due and take it from the buffer (called with the lock held).
+        """
+        deadline = time.monotonic() + self.flush_interval
+        while not self._closed and not self._flush_requested \
+                and len(self._buffer) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 and self._buffer:
+                break
+            if remaining <= 0:
+                deadline = time.monotonic() + self.flush_interval
+                remaining = self.flush_interval
+            self._condition.wait(remaining)
+
+        batch = self._buffer[:self.batch_size]
+        del self._buffer[:self.batch_size]
+        if not self._buffer:
+            self._flush_requested = False
+        self._in_flight = len(batch)
+        return batch
+
+    def _run(self):
+        while True:
+            with self._condition:
+                batch = self._take_batch()
+                if not batch and self._closed:
+                    self._condition.notify_all()
+                    return
+
+            if batch:
+                self._send(batch)
+
+            with self._condition:
+                self._in_flight = 0
+                self._condition.notify_all()
+
+    def _send(self, batch):
+        # Line protocol strings go out as a single payload instead of a list to re-serialize
+        record = "\n".join(batch) if isinstance(batch[0], str) else batch
+        try:
+            self.write_api.write(bucket=self.bucket, record=record)
+        except Exception as e:
+            if self.on_error:
+                self._call(self.on_error, self.bucket, batch, e)
+            else:
+                print(
+                    f"[ERROR] Failed to write batch of {len(batch)} records to {self.bucket}: {e}")
+            return
+
+        if self.on_success:
+            self._call(self.on_success, self.bucket, batch)
+
+    @staticmethod
+    def _call(callback, *args):
+        try:
+            callback(*args)
+        except Exception as e:
+            print(f"[ERROR] Batch writer callback failed: {e}")
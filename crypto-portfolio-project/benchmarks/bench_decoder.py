@@ -0,0 +1,135 @@
+"""
+Micro-benchmark for WebSocket message decoding.
+
+Compares the original decoding path (json.loads + channel split on every frame) with
+TradeDecoder on a corpus of raw Bitstamp frames, one frame per line.
+
+Usage:
+    python benchmarks/bench_decoder.py [--corpus FILE] [--repeat N]
+    python benchmarks/bench_decoder.py --write-corpus FILE [--frames N]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from message_decoder import TradeDecoder, loads  # noqa: E402
+from run_ingest_bench import bench_pairs  # noqa: E402
+
+# The first pairs of pairs.json, the pair list shared by every script
+PAIRS = bench_pairs(7)
+
+
+def synthetic_corpus(frames=100_000, trade_share=0.9, seed=1):
+    """
+    Build a realistic message mix: mostly trades plus heartbeats and subscription acks.
+    """
+    rng = random.Random(seed)
+    corpus = []
+    trade_id = 300_000_000
+    now = 1_700_000_000
+    for i in range(frames):
+        pair = rng.choice(PAIRS)
+        if rng.random() < trade_share:
+            trade_id += 1
+            corpus.append(json.dumps({
+                "data": {
+                    "id": trade_id, "timestamp": str(now + i // 50),
+                    "amount": round(rng.uniform(0.0001, 5), 8),
+                    "amount_str": "0.01000000", "price": round(rng.uniform(0.01, 70000), 2),
+                    "price_str": "27200", "type": rng.randint(0, 1),
+                    "microtimestamp": str((now + i // 50) * 1_000_000),
+                    "buy_order_id": trade_id * 3, "sell_order_id": trade_id * 3 + 1,
+                },
+                "channel": f"live_trades_{pair}",
+                "event": "trade",
+            }))
+        elif rng.random() < 0.5:
+            corpus.append(json.dumps({"event": "bts:heartbeat", "channel": "", "data": {"status": "success"}}))
+        else:
+            corpus.append(json.dumps({"event": "bts:subscription_succeeded",
+                                      "channel": f"live_trades_{pair}", "data": {}}))
+    return corpus
+
+
+def load_corpus(path):
+    with open(path) as f:
+        return [line.rstrip("\n") for line in f if line.strip()]
+
+
+def decode_baseline(corpus):
+    """
+    The decoding path process_message used before TradeDecoder.
+    """
+    trades = 0
+    for message in corpus:
+        message_json = json.loads(message)
+        if message_json.get("event") == "trade":
+            data = message_json.get("data", {})
+            currency_pair = message_json["channel"].split("_")[2]
+            float(data["price"])
+            int(data["timestamp"])
+            trades += 1 if currency_pair else 0
+    return trades
+
+
+def decode_fast(corpus):
+    decoder = TradeDecoder(PAIRS)
+    decode = decoder.decode
+    trades = 0
+    for message in corpus:
+        trade = decode(message)
+        if trade:
+            currency_pair, data = trade
+            float(data["price"])
+            int(data["timestamp"])
+            trades += 1 if currency_pair else 0
+    return trades
+
+
+def measure(fn, corpus, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        trades = fn(corpus)
+        best = min(best, time.perf_counter() - started)
+    return trades, len(corpus) / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--corpus", help="File with one raw frame per line.")
+    parser.add_argument("--frames", type=int, default=100_000,
+                        help="Size of the synthetic corpus.")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--write-corpus", help="Write the synthetic corpus to FILE and exit.")
+    args = parser.parse_args()
+
+    corpus = synthetic_corpus(args.frames)
+    if args.write_corpus:
+        with open(args.write_corpus, "w") as f:
+            f.write("\n".join(corpus) + "\n")
+        return
+    if args.corpus:
+        corpus = load_corpus(args.corpus)
+
+    baseline_trades, baseline_rate = measure(decode_baseline, corpus, args.repeat)
+    fast_trades, fast_rate = measure(decode_fast, corpus, args.repeat)
+    assert baseline_trades == fast_trades, "decoders disagree on the number of trades"
+
+    print(json.dumps({
+        "frames": len(corpus),
+        "trades": fast_trades,
+        "json_library": getattr(loads, "__module__", "json"),
+        "baseline_msgs_per_sec": round(baseline_rate),
+        "decoder_msgs_per_sec": round(fast_rate),
+        "speedup": round(fast_rate / baseline_rate, 2),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Micro-benchmark for trade serialization: influxdb_client.Point vs LineProtocolSerializer.
+
+Usage:
+    python benchmarks/bench_line_protocol.py [--points N] [--repeat N]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import influxdb_client  # noqa: E402
+from line_protocol import LineProtocolSerializer  # noqa: E402
+from run_ingest_bench import bench_pairs  # noqa: E402
+
+# The first pairs of pairs.json, the pair list shared by every script
+PAIRS = bench_pairs(7)
+
+
+def trades(count, seed=1):
+    rng = random.Random(seed)
+    return [(rng.choice(PAIRS), round(rng.uniform(0.01, 70000), 2), 1_700_000_000_000_000_000 + i)
+            for i in range(count)]
+
+
+def serialize_points(batch):
+    points = [influxdb_client.Point("crypto_data")
+              .tag("currency_pair", pair)
+              .field("price", price)
+              .time(timestamp)
+              for pair, price, timestamp in batch]
+    return "\n".join(point.to_line_protocol() for point in points)
+
+
+def serialize_lines(batch):
+    trade = LineProtocolSerializer().trade
+    return "\n".join([trade(pair, price, timestamp) for pair, price, timestamp in batch])
+
+
+def measure(fn, batch, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        payload = fn(batch)
+        best = min(best, time.perf_counter() - started)
+    return payload, best / len(batch) * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--points", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    batch = trades(args.points)
+    point_payload, point_ns = measure(serialize_points, batch, args.repeat)
+    line_payload, line_ns = measure(serialize_lines, batch, args.repeat)
+    assert point_payload == line_payload, "serializers produced different payloads"
+
+    print(json.dumps({
+        "points": args.points,
+        "point_ns_per_point": round(point_ns),
+        "serializer_ns_per_point": round(line_ns),
+        "speedup": round(point_ns / line_ns, 1),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Fake Bitstamp WebSocket server for ingest benchmarks.
+
+Answers bts:subscribe requests like Bitstamp and streams live_trades events for every
+subscribed channel at a configurable total rate, split over all open connections in
+proportion to their subscriptions. Each trade's price is its send time in Unix
+microseconds, which fake_influxdb.py uses to measure trade-to-write latency.
+
+Usage:
+    python benchmarks/fake_bitstamp.py --port 18765 --rate 5000
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import time
+
+from websockets.asyncio.server import serve
+from websockets.exceptions import ConnectionClosed
+
+TICK = 0.01  # Seconds between send bursts
+
+
+async def stream(connection, rate, trade_ids, subscriptions):
+    subscribed = []
+    subscriptions[connection] = subscribed
+
+    async def read_subscriptions():
+        async for message in connection:
+            request = json.loads(message)
+            channel = request.get("data", {}).get("channel")
+            if request.get("event") == "bts:subscribe" and channel:
+                subscribed.append(channel)
+                await connection.send(json.dumps(
+                    {"event": "bts:subscription_succeeded", "channel": channel, "data": {}}))
+            elif request.get("event") == "bts:unsubscribe" and channel in subscribed:
+                subscribed.remove(channel)
+
+    reader = asyncio.create_task(read_subscriptions())
+    channels = itertools.cycle(range(1 << 30))
+    owed = 0.0
+    next_tick = time.monotonic()
+    try:
+        while True:
+            next_tick += TICK
+            total = sum(len(s) for s in subscriptions.values())
+            if total:
+                owed += rate * TICK * len(subscribed) / total
+            now = time.time()
+            while owed >= 1 and subscribed:
+                owed -= 1
+                trade_id = next(trade_ids)
+                channel = subscribed[next(channels) % len(subscribed)]
+                await connection.send(json.dumps({
+                    "data": {
+                        "id": trade_id,
+                        "timestamp": str(int(now)),
+                        "amount": 0.01,
+                        "amount_str": "0.01000000",
+                        "price": float(int(time.time() * 1e6)),
+                        "price_str": "0",
+                        "type": trade_id % 2,
+                        "microtimestamp": str(int(now * 1e6)),
+                        "buy_order_id": trade_id * 2,
+                        "sell_order_id": trade_id * 2 + 1,
+                    },
+                    "channel": channel,
+                    "event": "trade",
+                }))
+            await asyncio.sleep(max(0.0, next_tick - time.monotonic()))
+    except ConnectionClosed:
+        pass
+    finally:
+        reader.cancel()
+        del subscriptions[connection]
+
+
+async def run(port, rate):
+    trade_ids = itertools.count(1)
+    subscriptions = {}  # connection -> channels subscribed on it
+
+    async def handler(connection):
+        await stream(connection, rate, trade_ids, subscriptions)
+
+    async with serve(handler, "127.0.0.1", port, ping_interval=None, max_queue=None):
+        await asyncio.Future()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Bitstamp WebSocket server.")
+    parser.add_argument("--port", type=int, default=18765)
+    parser.add_argument("--rate", type=float, default=1000,
+                        help="Trades per second across all subscribed pairs.")
+    args = parser.parse_args()
+    # The benchmark probes the port before connecting; don't log those aborted handshakes
+    logging.getLogger("websockets").setLevel(logging.CRITICAL)
+    asyncio.run(run(args.port, args.rate))
+
+
+if __name__ == "__main__":
+    main()
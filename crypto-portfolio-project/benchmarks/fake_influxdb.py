@@ -0,0 +1,154 @@
+"""
+Fake InfluxDB write endpoint for ingest benchmarks.
+
+Accepts POST /api/v2/write, records every payload and can inject latency or errors. Trades
+produced by fake_bitstamp.py carry their send time (Unix microseconds) as the price, so the
+server can compute trade-to-write latency for every crypto_data line it receives. Conflated
+lines count the trades they stand for through their tick_count field.
+
+Endpoints:
+    POST /api/v2/write   line protocol payload (204, or 503 when an error is injected)
+    GET  /stats          JSON summary: lines, requests, errors, latency percentiles
+    POST /reset          clear recorded statistics
+
+Usage:
+    python benchmarks/fake_influxdb.py --port 18086 [--latency-ms 5] [--error-rate 0.1]
+"""
+import argparse
+import gzip
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q / 100 * len(values)))]
+
+
+class WriteRecorder:
+    def __init__(self, latency_ms=0.0, error_rate=0.0, seed=1):
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.requests = 0
+            self.errors = 0
+            self.lines = {}
+            self.latencies_us = []
+            self.ticks = 0
+            self.reset_us = time.time() * 1e6
+
+    def record(self, bucket, body):
+        now_us = time.time() * 1e6
+        latencies = []
+        count = 0
+        ticks = 0
+        for line in body.splitlines():
+            if not line:
+                continue
+            count += 1
+            if line.startswith("crypto_data,"):
+                # "crypto_data,currency_pair=btcusd price=<send time in us> <timestamp>",
+                # conflated lines add high, low and tick_count fields
+                fields = dict(field.split("=", 1) for field in line.rsplit(" ", 2)[1].split(","))
+                sent_us = float(fields["price"])
+                if sent_us >= self.reset_us:  # Ignore trades sent before the last reset
+                    latencies.append(now_us - sent_us)
+                    ticks += int(fields.get("tick_count", "1i")[:-1])
+        with self.lock:
+            self.requests += 1
+            self.lines[bucket] = self.lines.get(bucket, 0) + count
+            self.latencies_us.extend(latencies)
+            self.ticks += ticks
+
+    def stats(self):
+        with self.lock:
+            latencies = list(self.latencies_us)
+            return {
+                "requests": self.requests,
+                "errors_injected": self.errors,
+                "lines": dict(self.lines),
+                "trades": len(latencies),
+                "ticks": self.ticks,
+                "latency_p50_ms": round(percentile(latencies, 50) / 1000, 3) if latencies else None,
+                "latency_p99_ms": round(percentile(latencies, 99) / 1000, 3) if latencies else None,
+                "latency_max_ms": round(max(latencies) / 1000, 3) if latencies else None,
+            }
+
+
+def make_handler(recorder):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _reply(self, status, body=b"", content_type="application/json"):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if body:
+                self.wfile.write(body)
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            body = self.rfile.read(length)
+            path, _, query = self.path.partition("?")
+
+            if path == "/reset":
+                recorder.reset()
+                return self._reply(204)
+            if path != "/api/v2/write":
+                return self._reply(404)
+
+            if recorder.latency_ms:
+                time.sleep(recorder.latency_ms / 1000)
+            if recorder.error_rate and recorder.random.random() < recorder.error_rate:
+                with recorder.lock:
+                    recorder.errors += 1
+                return self._reply(503, b'{"code":"unavailable","message":"injected error"}')
+
+            if self.headers.get("Content-Encoding") == "gzip":
+                body = gzip.decompress(body)
+            params = dict(p.split("=", 1) for p in query.split("&") if "=" in p)
+            recorder.record(params.get("bucket", ""), body.decode())
+            self._reply(204)
+
+        def do_GET(self):
+            if self.path == "/stats":
+                return self._reply(200, json.dumps(recorder.stats()).encode())
+            if self.path in ("/ping", "/health"):
+                return self._reply(204)
+            self._reply(404)
+
+    return Handler
+
+
+def serve(port, latency_ms=0.0, error_rate=0.0):
+    recorder = WriteRecorder(latency_ms=latency_ms, error_rate=error_rate)
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(recorder))
+    server.daemon_threads = True
+    server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake InfluxDB write endpoint.")
+    parser.add_argument("--port", type=int, default=18086)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    serve(args.port, args.latency_ms, args.error_rate)
+
+
+if __name__ == "__main__":
+    main()
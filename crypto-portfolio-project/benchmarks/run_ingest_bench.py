@@ -0,0 +1,273 @@
+"""
+End-to-end ingest benchmark.
+
+Starts fake_bitstamp.py and fake_influxdb.py as separate processes, then drives
+WebSocketClient.listen + main.process_message + InfluxDBHandler against them in this process.
+Reports throughput, trade-to-write latency percentiles, CPU and peak RSS of the ingest process
+as one JSON object per scenario.
+
+Usage:
+    python benchmarks/run_ingest_bench.py                      # every scenario, one process each
+    python benchmarks/run_ingest_bench.py --scenario burst     # a single scenario
+    python benchmarks/run_ingest_bench.py --output results.jsonl --duration 20
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, PROJECT_DIR)
+
+SCENARIOS = {
+    "baseline": {"rate": 1000, "pairs": 7},
+    "burst": {"rate": 10000, "pairs": 7},
+    "burst_conflated": {"rate": 10000, "pairs": 7, "tick_mode": "conflate"},
+    "many_pairs": {"rate": 5000, "pairs": 200},
+    "many_pairs_sharded": {"rate": 5000, "pairs": 200, "shards": 4},
+    "many_pairs_multiprocess": {"rate": 5000, "pairs": 200, "processes": 4},
+    "slow_influx": {"rate": 2000, "pairs": 7, "influx_latency_ms": 250},
+    "flaky_influx": {"rate": 2000, "pairs": 7, "influx_error_rate": 0.2},
+}
+
+DEFAULTS = {
+    "rate": 1000,
+    "pairs": 7,
+    "influx_latency_ms": 0.0,
+    "influx_error_rate": 0.0,
+    "batch_size": 5000,
+    "flush_interval": 1.0,
+    "workers": 1,
+    "overflow": "block",
+    "shards": 1,
+    "tick_mode": "raw",
+    "processes": 0,
+    "writers": 1,
+    "conflate_interval": 0.25,
+}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for_port(port, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with socket.socket() as s:
+            if s.connect_ex(("127.0.0.1", port)) == 0:
+                return
+        time.sleep(0.05)
+    raise RuntimeError(f"Fake server on port {port} did not start")
+
+
+def influx_request(port, path, method="GET"):
+    request = urllib.request.Request(f"http://127.0.0.1:{port}{path}", method=method)
+    with urllib.request.urlopen(request, timeout=10) as response:
+        body = response.read()
+    return json.loads(body) if body else None
+
+
+def bench_pairs(count):
+    from pair_registry import PairRegistry
+    config = PairRegistry(None).load_config() or {}
+    pairs = list(config.get("pairs", [])[:count])
+    pairs += [f"bench{i:03d}usd" for i in range(count - len(pairs))]
+    return pairs
+
+
+def cpu_seconds(who=resource.RUSAGE_SELF):
+    usage = resource.getrusage(who)
+    return usage.ru_utime + usage.ru_stime
+
+
+async def drive_multiprocess(config, ws_port, influx_port, spool_dir, duration, warmup):
+    from multiprocess_ingest import IngestSupervisor
+
+    supervisor = IngestSupervisor(url=f"ws://127.0.0.1:{ws_port}",
+                                  currency_pairs=bench_pairs(config["pairs"]),
+                                  parsers=config["processes"], writers=config["writers"],
+                                  writer_settings={"spool_dir": spool_dir,
+                                                   "tick_mode": config["tick_mode"],
+                                                   "conflate_interval": config["conflate_interval"]},
+                                  output=subprocess.DEVNULL)
+    supervisor.start()
+    try:
+        await asyncio.sleep(warmup)
+        influx_request(influx_port, "/reset", method="POST")
+        cpu_start = cpu_seconds()
+        started = time.monotonic()
+        await asyncio.sleep(duration)
+        ring_depths = supervisor.stats()["ring_depths"]
+    finally:
+        supervisor.stop()
+    elapsed = time.monotonic() - started
+    # Children are only accounted for once they have exited and been waited for
+    cpu = cpu_seconds() - cpu_start + cpu_seconds(resource.RUSAGE_CHILDREN)
+
+    stats = influx_request(influx_port, "/stats")
+    return {
+        "trades_written": stats["trades"],
+        "throughput_trades_per_sec": round(stats["trades"] / duration, 1),
+        "latency_p50_ms": stats["latency_p50_ms"],
+        "latency_p99_ms": stats["latency_p99_ms"],
+        "latency_max_ms": stats["latency_max_ms"],
+        "write_requests": stats["requests"],
+        "write_errors_injected": stats["errors_injected"],
+        "cpu_seconds": round(cpu, 3),
+        "cpu_utilization": round(cpu / elapsed, 3),
+        "ring_depths": ring_depths,
+    }
+
+
+async def drive(config, ws_port, influx_port, spool_dir, duration, warmup):
+    import main
+    from influxdb_handler import InfluxDBHandler
+    from message_pipeline import MessagePipeline
+    from sharded_client import ShardedWebSocketClient
+    from tick_conflator import TickConflator
+    from websocket_client import WebSocketClient
+
+    # Swap main's handler for one pointed at the fake InfluxDB with the scenario's settings
+    main.influxdb_handler.close()
+    handler = InfluxDBHandler(
+        websocket_url=f"http://127.0.0.1:{influx_port}",
+        ohlc_url=f"http://127.0.0.1:{influx_port}",
+        token="bench", org="bench",
+        batch_size=config["batch_size"],
+        flush_interval=config["flush_interval"],
+        on_batch_success=lambda bucket, batch: None,
+        on_batch_error=lambda bucket, batch, error: None,
+        spool_dir=spool_dir,
+    )
+    main.influxdb_handler = handler
+    main.candle_aggregator.on_bar = handler.write_candle
+    main.snapshot_rollup.on_snapshot = handler.write_snapshot
+    main.CONFLATE_INTERVAL = config["conflate_interval"]
+    main.tick_conflator = TickConflator(on_tick=handler.write_conflated_trade,
+                                        interval=config["conflate_interval"],
+                                        default_mode=config["tick_mode"])
+
+    pipeline = MessagePipeline(workers=config["workers"], overflow=config["overflow"])
+    if config["shards"] > 1:
+        client = ShardedWebSocketClient(url=f"ws://127.0.0.1:{ws_port}",
+                                        currency_pairs=bench_pairs(config["pairs"]),
+                                        shards=config["shards"], pipeline=pipeline,
+                                        decoder=main.trade_decoder)
+    else:
+        client = WebSocketClient(url=f"ws://127.0.0.1:{ws_port}",
+                                 currency_pairs=bench_pairs(config["pairs"]),
+                                 pipeline=pipeline, decoder=main.trade_decoder)
+    listener = asyncio.create_task(client.listen(main.process_message))
+    conflation = asyncio.create_task(main.flush_conflated())
+
+    await asyncio.sleep(warmup)
+    influx_request(influx_port, "/reset", method="POST")
+    cpu_start = cpu_seconds()
+    started = time.monotonic()
+    await asyncio.sleep(duration)
+    listener.cancel()
+    conflation.cancel()
+    await asyncio.gather(listener, conflation, return_exceptions=True)
+    main.tick_conflator.flush()
+    await asyncio.to_thread(handler.flush, 30)
+    elapsed = time.monotonic() - started
+    cpu = cpu_seconds() - cpu_start
+
+    stats = influx_request(influx_port, "/stats")
+    handler.close()
+    return {
+        "trades_written": stats["trades"],
+        "trades_represented": stats["ticks"],
+        "throughput_trades_per_sec": round(stats["trades"] / duration, 1),
+        "latency_p50_ms": stats["latency_p50_ms"],
+        "latency_p99_ms": stats["latency_p99_ms"],
+        "latency_max_ms": stats["latency_max_ms"],
+        "write_requests": stats["requests"],
+        "write_errors_injected": stats["errors_injected"],
+        "cpu_seconds": round(cpu, 3),
+        "cpu_utilization": round(cpu / elapsed, 3),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "pipeline": pipeline.stats(),
+    }
+
+
+def run_scenario(name, overrides, duration, warmup):
+    config = {**DEFAULTS, **SCENARIOS.get(name, {}), **overrides}
+    ws_port, influx_port = free_port(), free_port()
+    servers = [
+        subprocess.Popen([sys.executable, os.path.join(BENCH_DIR, "fake_bitstamp.py"),
+                          "--port", str(ws_port), "--rate", str(config["rate"])]),
+        subprocess.Popen([sys.executable, os.path.join(BENCH_DIR, "fake_influxdb.py"),
+                          "--port", str(influx_port),
+                          "--latency-ms", str(config["influx_latency_ms"]),
+                          "--error-rate", str(config["influx_error_rate"])]),
+    ]
+    try:
+        wait_for_port(ws_port)
+        wait_for_port(influx_port)
+        os.environ.update(INFLUXDB_URL=f"http://127.0.0.1:{influx_port}",
+                          INFLUXDB_TOKEN="bench", INFLUXDB_ORG="bench")
+        with tempfile.TemporaryDirectory() as spool_dir, \
+                contextlib.redirect_stdout(io.StringIO()):
+            if config["processes"]:
+                result = asyncio.run(drive_multiprocess(config, ws_port, influx_port, spool_dir,
+                                                        duration, warmup))
+            else:
+                result = asyncio.run(drive(config, ws_port, influx_port, spool_dir, duration,
+                                           warmup))
+    finally:
+        for server in servers:
+            server.terminate()
+            server.wait()
+
+    return {"scenario": name, "duration_s": duration, "config": config, **result}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end ingest benchmark.")
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS),
+                        help="Run one scenario in this process (default: all, one process each).")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--warmup", type=float, default=2.0)
+    parser.add_argument("--output", help="Append JSON lines to this file as well as stdout.")
+    for key, value in DEFAULTS.items():
+        parser.add_argument(f"--{key.replace('_', '-')}", type=type(value), default=None)
+    args = parser.parse_args()
+    overrides = {key: getattr(args, key) for key in DEFAULTS if getattr(args, key) is not None}
+
+    if args.scenario:
+        results = [run_scenario(args.scenario, overrides, args.duration, args.warmup)]
+    else:
+        # Separate processes keep CPU and RSS figures independent between scenarios
+        results = []
+        for name in SCENARIOS:
+            command = [sys.executable, os.path.abspath(__file__), "--scenario", name,
+                       "--duration", str(args.duration), "--warmup", str(args.warmup)]
+            for key, value in overrides.items():
+                command += [f"--{key.replace('_', '-')}", str(value)]
+            output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+            results.append(json.loads(output.strip().splitlines()[-1]))
+
+    for result in results:
+        line = json.dumps(result)
+        print(line)
+        if args.output:
+            with open(args.output, "a") as f:
+                f.write(line + "\n")
+
+
+if __name__ == "__main__":
+    main()
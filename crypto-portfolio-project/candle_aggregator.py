@@ -0,0 +1,151 @@
+# Supported bar sizes in seconds, keyed by the resolution tag written to InfluxDB
+RESOLUTIONS = {
+    "1m": 60,
+    "5m": 300,
+    "15m": 900,
+    "1h": 3600,
+    "4h": 14400,
+    "1d": 86400,
+}
+
+# Positions in the per-bar state list; the trade times after TRADES are never emitted
+START, OPEN, HIGH, LOW, CLOSE, VOLUME, TRADES, FIRST_AT, LAST_AT = range(9)
+
+
+class CandleAggregator:
+    def __init__(self, resolutions=("1m", "5m", "1h"), on_bar=None, amend_window=0):
+        """
+        Build OHLCV bars incrementally from the live trade stream.
+
+        Each trade updates the open bar of every resolution in constant time. A bar is emitted
+        once a trade for a later period arrives or close_due() is called after the period ended.
+
+        Trades for bars that were already emitted (e.g., recovered by GapRepairer after live
+        trades resumed) amend those bars when they are at most `amend_window` seconds older
+        than the newest bar; amended bars are emitted again by the next close_due() and
+        overwrite the earlier point in InfluxDB. Older late trades are dropped and counted.
+
+        Args:
+            resolutions (tuple): Bar sizes to maintain, keys of RESOLUTIONS (e.g., ("1m", "1h")).
+            on_bar (callable): Called as on_bar(currency_pair, resolution, start, open, high,
+                low, close, volume, trades) for every closed bar; `start` is in Unix seconds.
+            amend_window (int): How far back, in seconds, emitted bars are kept for amending
+                (0 drops every late trade).
+        """
+        unknown = [name for name in resolutions if name not in RESOLUTIONS]
+        if unknown:
+            raise ValueError(f"Unknown candle resolutions: {unknown}")
+        self.resolutions = [(name, RESOLUTIONS[name]) for name in resolutions]
+        self.on_bar = on_bar
+        self.amend_window = amend_window
+        self.late_trades = 0
+        self.amended_trades = 0
+        self._bars = {}  # (pair, resolution) -> [start, open, high, low, close, volume, trades, ...]
+        self._emitted = {}  # (pair, resolution) -> start of the last emitted bar
+        self._history = {}  # (pair, resolution) -> {start: bar} of emitted bars open to amends
+        self._amended = set()  # (pair, resolution, start) of bars to emit again
+
+    def add_trade(self, currency_pair, price, amount, timestamp):
+        """
+        Fold one trade into the open bar of every resolution.
+
+        Args:
+            currency_pair (str): The currency pair, e.g., "btcusd".
+            price (float): Trade price.
+            amount (float): Traded quantity.
+            timestamp (int): Trade time in Unix seconds.
+        """
+        for name, seconds in self.resolutions:
+            start = timestamp - timestamp % seconds
+            key = (currency_pair, name)
+            bar = self._bars.get(key)
+
+            if bar is None:
+                if start <= self._emitted.get(key, -1):
+                    self._late(key, start, price, amount, timestamp)
+                    continue
+                self._bars[key] = [start, price, price, price, price, amount, 1,
+                                   timestamp, timestamp]
+            elif start > bar[START]:
+                self._emit(key, bar)
+                self._bars[key] = [start, price, price, price, price, amount, 1,
+                                   timestamp, timestamp]
+            elif start == bar[START]:
+                _fold(bar, price, amount, timestamp)
+            else:
+                # Trade for a bar that was already emitted or skipped while disconnected
+                self._late(key, start, price, amount, timestamp)
+
+    def close_due(self, now):
+        """
+        Emit every open bar whose period ended at or before `now` (Unix seconds), and again
+        every emitted bar amended by late trades since the last call.
+        """
+        if self._amended:
+            for currency_pair, name, start in sorted(self._amended):
+                bar = self._history.get((currency_pair, name), {}).get(start)
+                if bar is not None:
+                    self._send(currency_pair, name, bar)
+            self._amended.clear()
+        for name, seconds in self.resolutions:
+            for key in [key for key, bar in self._bars.items()
+                        if key[1] == name and bar[START] + seconds <= now]:
+                self._emit(key, self._bars.pop(key))
+
+    def open_bars(self):
+        """
+        Snapshot of the bars still being built, as {(pair, resolution): bar list}.
+        """
+        return {key: bar[:TRADES + 1] for key, bar in self._bars.items()}
+
+    def _late(self, key, start, price, amount, timestamp):
+        newest = self._bars[key][START] if key in self._bars else self._emitted[key]
+        if not self.amend_window or newest - start > self.amend_window:
+            self.late_trades += 1
+            return
+        history = self._history.setdefault(key, {})
+        bar = history.get(start)
+        if bar is None:
+            # A period without live trades, e.g., while the WebSocket was down
+            history[start] = [start, price, price, price, price, amount, 1, timestamp, timestamp]
+        else:
+            _fold(bar, price, amount, timestamp)
+        self._amended.add((key[0], key[1], start))
+        self.amended_trades += 1
+
+    def _emit(self, key, bar):
+        self._emitted[key] = bar[START]
+        if self.amend_window:
+            history = self._history.setdefault(key, {})
+            history[bar[START]] = bar
+            # Bars are emitted in time order, so the oldest are at the front
+            cutoff = bar[START] - self.amend_window
+            while next(iter(history)) < cutoff:
+                del history[next(iter(history))]
+        self._send(key[0], key[1], bar)
+
+    def _send(self, currency_pair, name, bar):
+        if self.on_bar is None:
+            return
+        try:
+            self.on_bar(currency_pair, name, *bar[:TRADES + 1])
+        except Exception as e:
+            print(f"[ERROR] Failed to emit {name} candle for {currency_pair}: {e}")
+
+
+def _fold(bar, price, amount, timestamp):
+    """
+    Fold a trade into a bar; its time decides whether it becomes the open or the close.
+    """
+    if price > bar[HIGH]:
+        bar[HIGH] = price
+    elif price < bar[LOW]:
+        bar[LOW] = price
+    if timestamp >= bar[LAST_AT]:
+        bar[CLOSE] = price
+        bar[LAST_AT] = timestamp
+    elif timestamp < bar[FIRST_AT]:
+        bar[OPEN] = price
+        bar[FIRST_AT] = timestamp
+    bar[VOLUME] += amount
+    bar[TRADES] += 1
@@ -0,0 +1,108 @@
+import asyncio
+import gzip
+import threading
+import time
+import zlib
+
+
+class CaptureWriter:
+    def __init__(self, path, flush_interval=1.0):
+        """
+        Record raw WebSocket frames with their receive time into a gzip-compressed capture file.
+
+        Each line is "<receive time>\\t<frame>". The file is opened in append mode, so every
+        recording session adds a new gzip member and earlier captures are kept. Frames are
+        buffered in memory and compressed on a background thread.
+
+        Args:
+            path (str): Capture file, e.g. "capture.jsonl.gz".
+            flush_interval (float): Seconds between writes of buffered frames to disk.
+        """
+        self.path = path
+        self.flush_interval = flush_interval
+        self.frames = 0
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._file = gzip.open(path, "at", encoding="utf-8")
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="capture-writer", daemon=True)
+        self._thread.start()
+
+    def record(self, frame):
+        """
+        Buffer one frame stamped with the current time.
+        """
+        if isinstance(frame, bytes):
+            frame = frame.decode()
+        # Raw newlines can only appear as insignificant JSON whitespace
+        frame = frame.replace("\n", " ")
+        with self._lock:
+            self._buffer.append(f"{time.time():.6f}\t{frame}\n")
+
+    def _write_buffered(self):
+        with self._lock:
+            lines, self._buffer = self._buffer, []
+        if lines:
+            self._file.write("".join(lines))
+            self._file.flush()
+            self.frames += len(lines)
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self._write_buffered()
+
+    def close(self):
+        """
+        Write any buffered frames and finish the gzip member.
+        """
+        self._stop.set()
+        self._thread.join()
+        self._write_buffered()
+        self._file.close()
+
+
+def read_capture(path):
+    """
+    Iterate over a capture file.
+
+    Yields:
+        tuple: (receive time in Unix seconds, raw frame). A truncated tail (e.g. after a crash
+            while recording) ends the iteration instead of raising.
+    """
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        try:
+            for line in f:
+                received, _, frame = line.rstrip("\n").partition("\t")
+                if frame:
+                    yield float(received), frame
+        except (EOFError, zlib.error, gzip.BadGzipFile) as e:
+            print(f"[WARNING] Capture file {path} ends with a truncated record: {e}")
+
+
+async def replay_capture(path, message_handler, speed=1.0):
+    """
+    Feed captured frames back through a message handler.
+
+    Args:
+        path (str): Capture file written by CaptureWriter.
+        message_handler (callable): Async handler, e.g. main.process_message.
+        speed (float): 1 replays in real time, N replays N times faster, 0 as fast as possible.
+
+    Returns:
+        int: Number of frames replayed.
+    """
+    count = 0
+    first_received = None
+    started = time.monotonic()
+    for received, frame in read_capture(path):
+        if speed:
+            if first_received is None:
+                first_received = received
+            delay = (received - first_received) / speed - (time.monotonic() - started)
+            if delay > 0:
+                await asyncio.sleep(delay)
+        elif count % 1000 == 0:
+            await asyncio.sleep(0)  # Let other tasks (e.g. writers) run between chunks
+        await message_handler(frame)
+        count += 1
+    return count
@@ -0,0 +1,88 @@
+import numpy as np
+
+# Columns of Flux CSV output that carry no data worth keeping per row
+SKIPPED_COLUMNS = ("", "result", "table", "_start", "_stop")
+
+
+def _convert(values, datatype):
+    """
+    Turn one column of CSV strings into a NumPy array of its Flux datatype.
+    Empty cells (nulls) become NaN, or NaT for times.
+    """
+    if datatype == "double":
+        array = np.array(values)
+        return np.where(array == "", "nan", array).astype(np.float64)
+    if datatype in ("long", "unsignedLong"):
+        array = np.array(values)
+        if (array == "").any():
+            return np.where(array == "", "nan", array).astype(np.float64)
+        return array.astype(np.int64 if datatype == "long" else np.uint64)
+    if datatype == "boolean":
+        return np.array(values) == "true"
+    if datatype.startswith("dateTime"):
+        # numpy parses RFC3339 (up to nanoseconds) once the UTC "Z" suffix is removed
+        return np.array([value[:-1] if value.endswith("Z") else value for value in values],
+                        dtype="datetime64[ns]")
+    return np.array(values, dtype=object)
+
+
+def read_columns(rows, by="_field"):
+    """
+    Read Flux annotated CSV (datatype annotation plus header) into NumPy columns.
+
+    Rows are read one at a time, so no per-record objects are built. Each column is collected
+    as strings and converted to a typed array once: doubles to float64, longs to int64,
+    booleans to bool, times to datetime64[ns] and everything else to object arrays.
+
+    Args:
+        rows (iterable): CSV rows as lists of strings, e.g. from QueryApi.query_csv with
+            Dialect(header=True, annotations=["datatype"]).
+        by (str): Column the rows are grouped by, e.g. "_field" for one set of arrays per
+            field. None returns a single group keyed None.
+
+    Returns:
+        dict: {group value: {column: array}}. Flux bookkeeping columns (result, table,
+            _start, _stop) are dropped.
+    """
+    chunks = {}  # group -> list of {column: [values]}, one per table and group
+    datatypes = header = None
+    current = {}
+
+    for row in rows:
+        if not row or row == [""]:
+            # A blank line ends a table; the next one starts with annotations and a header
+            header = None
+            continue
+        if row[0] == "#datatype":
+            datatypes, header = row, None
+            continue
+        if row[0].startswith("#"):
+            continue
+        if header is None:
+            header = row
+            current = {}
+            key_index = header.index(by) if by and by in header else None
+            kept = [(i, name) for i, name in enumerate(header) if name not in SKIPPED_COLUMNS]
+            continue
+
+        key = row[key_index] if key_index is not None else None
+        chunk = current.get(key)
+        if chunk is None:
+            chunk = current[key] = {name: [] for _, name in kept}
+            chunk[None] = [datatypes[i] if datatypes else "string" for i, _ in kept]
+            chunks.setdefault(key, []).append(chunk)
+        for i, name in kept:
+            chunk[name].append(row[i])
+
+    groups = {}
+    for key, parts in chunks.items():
+        columns = {}
+        for chunk in parts:
+            types = chunk.pop(None)
+            for datatype, (name, values) in zip(types, chunk.items()):
+                columns.setdefault(name, []).append(_convert(values, datatype))
+        groups[key] = {
+            name: arrays[0] if len(arrays) == 1 else np.concatenate(arrays)
+            for name, arrays in columns.items()
+        }
+    return groups
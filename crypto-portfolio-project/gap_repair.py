@@ -0,0 +1,130 @@
+import asyncio
+import collections
+import time
+
+# Bitstamp's transactions endpoint only looks back over these fixed windows
+TRANSACTION_INTERVALS = (("minute", 60), ("hour", 3600), ("day", 86400))
+
+
+class GapRepairer:
+    def __init__(self, http_handler, on_trade, history=10000, metrics=None):
+        """
+        Track the last trade seen per pair and recover the trades missed while the WebSocket
+        was disconnected from Bitstamp's REST transactions endpoint.
+
+        Recovered trades and the live stream overlap around a reconnect, so every trade id is
+        checked against the ids recently seen for its pair and duplicates are dropped.
+
+        Args:
+            http_handler (AsyncHTTPHandler): Client used to fetch /transactions/{pair}/.
+            on_trade (callable): Called as on_trade(pair, data) for each recovered trade, with
+                data shaped like a live trade ("id", "timestamp", "price", "amount", "type").
+            history (int): Trade ids remembered per pair for de-duplication.
+            metrics (Metrics): Optional metrics counting recovered trades per pair.
+        """
+        self.http_handler = http_handler
+        self.on_trade = on_trade
+        self.history = history
+        self.metrics = metrics
+
+        self.last_trade = {}  # pair -> (timestamp, trade id) of the newest trade seen
+        self.repaired = 0
+        self.duplicates = 0
+        self._seen = {}  # pair -> (deque of ids in arrival order, set of the same ids)
+        self._disconnected = {}  # pair -> last_trade entry when the connection dropped
+
+    def observe(self, currency_pair, data):
+        """
+        Record a trade from the live stream or a repair.
+
+        Returns:
+            bool: False if the trade was already seen and should be skipped.
+        """
+        trade_id = data.get("id")
+        if trade_id is None:
+            return True
+        seen = self._seen.get(currency_pair)
+        if seen is None:
+            seen = self._seen[currency_pair] = (collections.deque(), set())
+        order, ids = seen
+        if trade_id in ids:
+            self.duplicates += 1
+            return False
+        ids.add(trade_id)
+        order.append(trade_id)
+        if len(order) > self.history:
+            ids.discard(order.popleft())
+
+        last = self.last_trade.get(currency_pair)
+        if last is None or trade_id > last[1]:
+            self.last_trade[currency_pair] = (int(data["timestamp"]), trade_id)
+        return True
+
+    def disconnected(self, currency_pairs):
+        """
+        Remember where each pair's stream stopped. Call when a connection drops.
+        """
+        for pair in currency_pairs:
+            if pair in self.last_trade and pair not in self._disconnected:
+                self._disconnected[pair] = self.last_trade[pair]
+
+    def pending(self):
+        """
+        Pairs disconnected and not yet being repaired, i.e. whose stream is down.
+        """
+        return self._disconnected.keys()
+
+    async def repair(self, currency_pairs):
+        """
+        Fetch and replay the trades each pair missed since it was disconnected.
+
+        Returns:
+            int: Number of trades recovered.
+        """
+        now = time.time()
+        gaps = {pair: self._disconnected.pop(pair) for pair in currency_pairs
+                if pair in self._disconnected}
+        results = await asyncio.gather(
+            *(self._repair_pair(pair, since, last_id, now) for pair, (since, last_id) in gaps.items()))
+        recovered = sum(results)
+        if gaps:
+            print(f"[INFO] Gap repair recovered {recovered} trades for {len(gaps)} pairs")
+        return recovered
+
+    async def _repair_pair(self, currency_pair, since, last_id, now):
+        gap = now - since
+        interval = next((name for name, seconds in TRANSACTION_INTERVALS if gap < seconds), "day")
+        if gap >= TRANSACTION_INTERVALS[-1][1]:
+            print(f"[WARNING] Gap for {currency_pair} exceeds one day, only the last day is recovered")
+        try:
+            transactions = await self.http_handler.fetch_transactions(currency_pair, interval)
+        except Exception as e:
+            print(f"[ERROR] Gap repair failed for {currency_pair}: {e}")
+            return 0
+
+        recovered = 0
+        # The endpoint returns newest first; replay oldest first like the live stream
+        for transaction in reversed(transactions):
+            trade_id = int(transaction["tid"])
+            if trade_id <= last_id:
+                continue
+            data = {
+                "id": trade_id,
+                "timestamp": transaction["date"],
+                "price": transaction["price"],
+                "amount": transaction["amount"],
+                "type": int(transaction["type"]),
+            }
+            if not self.observe(currency_pair, data):
+                continue
+            try:
+                self.on_trade(currency_pair, data)
+            except Exception as e:
+                print(f"[ERROR] Failed to process recovered trade for {currency_pair}: {e}")
+                continue
+            recovered += 1
+
+        self.repaired += recovered
+        if self.metrics and recovered:
+            self.metrics.trades_repaired.inc(currency_pair, recovered)
+        return recovered
@@ -1,16 +1,79 @@
-import requests
+import asyncio
+import random
+import threading
+import time
+from rate_governor import RateGovernor
+
+REQUEST_TIMEOUT = 10
 
 
 class HTTPHandler:
-    def __init__(self, base_url, tracked_currency_pairs):
+    def __init__(self, base_url, tracked_currency_pairs, pool_size=10, metrics=None,
+                 metadata_cache=None):
         """
         Initialize the HTTP client for Bitstamp API.
         Args:
             base_url (str): Base URL for Bitstamp API.
             tracked_currency_pairs (list): List of tracked currency pairs (e.g., ["btcusd", "xrpusd"]).
+            pool_size (int): Number of keep-alive connections kept open to the API host.
+            metrics (Metrics): Optional metrics recording request latency per endpoint.
+            metadata_cache (MetadataCache): Optional cache for the /currencies/ list.
         """
         self.base_url = base_url
         self.tracked_currency_pairs = tracked_currency_pairs
+        self.metrics = metrics
+        self.metadata_cache = metadata_cache
+        self.pool_size = pool_size
+
+        # The session (and requests itself) is only set up by the first request
+        self._session = None
+        self._session_lock = threading.Lock()
+        self.session_init_seconds = 0.0  # Time spent importing requests and creating the session
+
+    @property
+    def session(self):
+        """
+        Pooled keep-alive session, created on first use.
+        """
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    started = time.perf_counter()
+                    import requests
+                    from requests.adapters import HTTPAdapter
+                    # Reuse TCP/TLS connections across calls instead of reconnecting every time
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                    session.mount("https://", adapter)
+                    session.mount("http://", adapter)
+                    self._session = session
+                    self.session_init_seconds = time.perf_counter() - started
+        return self._session
+
+    @session.setter
+    def session(self, session):
+        self._session = session
+
+    def _get(self, url, params=None, headers=None):
+        """
+        Perform a GET request over the shared session.
+        """
+        if not self.metrics:
+            return self.session.get(url, params=params, headers=headers, timeout=REQUEST_TIMEOUT)
+        started = time.perf_counter()
+        try:
+            return self.session.get(url, params=params, headers=headers, timeout=REQUEST_TIMEOUT)
+        finally:
+            # Label by the first path segment ("ohlc", "ticker", ...) to keep pairs out of it
+            endpoint = url[len(self.base_url):].strip("/").split("/")[0]
+            self.metrics.http_latency.observe(time.perf_counter() - started, endpoint)
+
+    def close(self):
+        """
+        Close the pooled connections.
+        """
+        if self._session is not None:
+            self._session.close()
 
     def fetch_ohlc(self, currency_pair, step, limit, start=None, end=None):
         """
@@ -26,6 +89,13 @@ class HTTPHandler:
         Returns:
             list: List of OHLC data points.
         """
+        url, params = self._ohlc_request(currency_pair, step, limit, start, end)
+
+        # Perform the API request
+        response = self._get(url, params=params)
+        return self._parse_ohlc(response)
+
+    def _ohlc_request(self, currency_pair, step, limit, start, end):
         url = f"{self.base_url}/ohlc/{currency_pair}/"
 
         # Define query parameters for the API call
@@ -37,10 +107,10 @@ class HTTPHandler:
             params["start"] = start
         if end:
             params["end"] = end
+        return url, params
 
-        # Perform the API request
-        response = requests.get(url, params=params)
-
+    @staticmethod
+    def _parse_ohlc(response):
         if response.status_code == 200:
             ohlc_data = response.json().get("data", {}).get("ohlc", [])
             return ohlc_data
@@ -48,35 +118,110 @@ class HTTPHandler:
             raise Exception(
                 f"Failed to fetch OHLC data: {response.status_code}, {response.text}")
 
-    # Add this method back to your HTTPHandler class
-
-    def fetch_ticker_info(self, currency_pairs):
+    def fetch_ticker_info(self, currency_pairs, bulk=False):
         """
         Fetch ticker information for the given currency pairs.
 
         Args:
             currency_pairs (list): List of currency pair symbols (e.g., ["btcusd", "xrpusd"]).
+            bulk (bool): Fetch every market with a single /ticker/ request and only fall back
+                to per-pair requests for pairs missing from it.
 
         Returns:
             dict: A dictionary with currency pairs as keys and their ticker data as values.
         """
         tickers = {}
+        if bulk:
+            tickers = self._parse_bulk_tickers(self._get(self._bulk_ticker_url()), currency_pairs)
         for pair in currency_pairs:
+            if pair in tickers:
+                continue
             # Construct the URL for the API call
             url = f"{self.base_url}/ticker/{pair}/"
 
             # Perform the API request
-            response = requests.get(url)
+            response = self._get(url)
 
-            # Handle successful responses
-            if response.status_code == 200:
-                tickers[pair] = response.json()
-            else:
-                print(
-                    f"[WARNING] Failed to fetch ticker data for {pair}: {response.status_code}, {response.text}")
+            ticker = self._parse_ticker(pair, response)
+            if ticker is not None:
+                tickers[pair] = ticker
+
+        return tickers
 
+    def _bulk_ticker_url(self):
+        return f"{self.base_url}/ticker/"
+
+    @staticmethod
+    def _parse_bulk_tickers(response, currency_pairs):
+        """
+        Pick the tracked pairs out of an all-markets /ticker/ response.
+
+        Returns:
+            dict: {pair: ticker data}; empty if the request failed.
+        """
+        if response.status_code != 200:
+            print(
+                f"[WARNING] Failed to fetch bulk ticker data: {response.status_code}, {response.text}")
+            return {}
+        wanted = set(currency_pairs)
+        tickers = {}
+        for ticker in response.json():
+            # Markets are named like "BTC/USD"; tracked pairs use the URL symbol "btcusd"
+            pair = ticker.get("pair", "").replace("/", "").lower()
+            if pair in wanted:
+                tickers[pair] = ticker
         return tickers
 
+    @staticmethod
+    def _parse_ticker(pair, response):
+        # Handle successful responses
+        if response.status_code == 200:
+            return response.json()
+        print(
+            f"[WARNING] Failed to fetch ticker data for {pair}: {response.status_code}, {response.text}")
+        return None
+
+    def fetch_transactions(self, currency_pair, interval="hour"):
+        """
+        Fetch recent trades for a currency pair, newest first.
+
+        Args:
+            currency_pair (str): The market symbol, e.g., "btcusd".
+            interval (str): How far back to go: "minute", "hour" or "day".
+
+        Returns:
+            list: Trade dicts with "date", "tid", "price", "amount" and "type".
+        """
+        url, params = self._transactions_request(currency_pair, interval)
+        return self._parse_transactions(currency_pair, self._get(url, params=params))
+
+    def _transactions_request(self, currency_pair, interval):
+        return f"{self.base_url}/transactions/{currency_pair}/", {"time": interval}
+
+    @staticmethod
+    def _parse_transactions(currency_pair, response):
+        if response.status_code == 200:
+            return response.json()
+        raise Exception(
+            f"Failed to fetch transactions for {currency_pair}: {response.status_code}, {response.text}")
+
+    def fetch_trading_pairs(self):
+        """
+        Fetch Bitstamp's trading pairs info.
+
+        Returns:
+            list: Pair dicts with "name" (e.g., "BTC/USD"), "url_symbol" (e.g., "btcusd"),
+                "trading" ("Enabled"/"Disabled") and precision details.
+        """
+        return self._parse_trading_pairs(self._get(f"{self.base_url}/trading-pairs-info/"))
+
+    @staticmethod
+    def _parse_trading_pairs(response):
+        if response.status_code == 200:
+            return response.json()
+        raise Exception(
+            f"Failed to fetch trading pairs info: {response.status_code}, {response.text}")
+
     def fetch_currencies_with_logo(self):
         """
         Fetch a list of all available currencies with their logos and filter them.
@@ -87,15 +232,82 @@ class HTTPHandler:
                 - all_currencies: Full list of currencies from the Bitstamp API.
                 - unmatched_pairs: A list of pairs where no matching symbol was found in the response.
         """
-        url = f"{self.base_url}/currencies/"
-        response = requests.get(url)
+        import requests
+
+        all_currencies = self._cached_currencies()
+        if all_currencies is None:
+            try:
+                response = self._get(self._currencies_url(), headers=self._currencies_validators())
+            except requests.RequestException as e:
+                all_currencies = self._stale_currencies(e)
+            else:
+                all_currencies = self._read_currencies(response)
+        return self._filter_currencies(all_currencies)
+
+    def fetch_currency_metadata(self):
+        """
+        Fetch currency metadata indexed by symbol, e.g. {"BTC": {"currency": "BTC", "logo": ...}}.
+        Served from the metadata cache whenever it is fresh.
+        """
+        _, all_currencies, _ = self.fetch_currencies_with_logo()
+        return self._currency_index(all_currencies)
 
+    def _currencies_url(self):
+        return f"{self.base_url}/currencies/"
+
+    def _cached_currencies(self):
+        """
+        The cached /currencies/ list if it is still fresh, otherwise None.
+        """
+        if self.metadata_cache is None:
+            return None
+        return self.metadata_cache.fresh(self._currencies_url())
+
+    def _currencies_validators(self):
+        if self.metadata_cache is None:
+            return None
+        return self.metadata_cache.validators(self._currencies_url()) or None
+
+    def _read_currencies(self, response):
+        """
+        Turn a /currencies/ response into the full currency list, updating the cache.
+
+        Returns:
+            list: All currencies; the stale cached list if the request failed, or None.
+        """
+        url = self._currencies_url()
+        if response.status_code == 304 and self.metadata_cache:
+            return self.metadata_cache.revalidated(url)
         if response.status_code != 200:
             print(
                 f"Failed to fetch currencies: {response.status_code}, {response.text}")
-            return [], [], []
+            return self.metadata_cache.stale(url) if self.metadata_cache else None
 
         all_currencies = response.json()
+        if self.metadata_cache:
+            self.metadata_cache.store(url, all_currencies, response.headers)
+        return all_currencies
+
+    def _stale_currencies(self, error):
+        """
+        The stale cached currency list when Bitstamp cannot be reached; re-raises the request
+        error when nothing is cached.
+        """
+        stale = self.metadata_cache.stale(self._currencies_url()) if self.metadata_cache else None
+        if stale is None:
+            raise error
+        print(f"[WARNING] Failed to fetch currencies, using the cached list: {error}")
+        return stale
+
+    def _currency_index(self, all_currencies):
+        if self.metadata_cache and self.metadata_cache.stale(self._currencies_url()) is not None:
+            # Built once per cached response instead of on every call
+            return self.metadata_cache.index(self._currencies_url(), "currency")
+        return {currency["currency"].upper(): currency for currency in all_currencies}
+
+    def _filter_currencies(self, all_currencies):
+        if all_currencies is None:
+            return [], [], []
 
         # Get unique symbols (e.g., ["BTC", "XRP"]) from tracked pairs (e.g., ["btcusd", "xrpusd"])
         tracked_symbols = set(pair[:-3].upper()
@@ -114,3 +326,122 @@ class HTTPHandler:
         ]
 
         return filtered_currencies, all_currencies, unmatched_pairs
+
+
+class AsyncHTTPHandler(HTTPHandler):
+    def __init__(self, base_url, tracked_currency_pairs, governor=None, pool_size=20, max_retries=5,
+                 metrics=None, metadata_cache=None):
+        """
+        Async variant of HTTPHandler for use inside the event loop.
+
+        Requests run on worker threads over the pooled keep-alive session, so they never
+        block the loop, and every call first takes a token from a shared rate governor.
+
+        Args:
+            base_url (str): Base URL for Bitstamp API.
+            tracked_currency_pairs (list): List of tracked currency pairs (e.g., ["btcusd", "xrpusd"]).
+            governor (RateGovernor): Token bucket shared by all calls (defaults to Bitstamp's limits).
+            pool_size (int): Number of keep-alive connections kept open to the API host.
+            max_retries (int): How many times a request rejected with HTTP 429 is retried.
+            metrics (Metrics): Optional metrics recording request latency per endpoint.
+            metadata_cache (MetadataCache): Optional cache for the /currencies/ list.
+        """
+        super().__init__(base_url, tracked_currency_pairs, pool_size=pool_size, metrics=metrics,
+                         metadata_cache=metadata_cache)
+        self.governor = governor or RateGovernor()
+        self.max_retries = max_retries
+
+    async def _get_async(self, url, params=None, headers=None):
+        """
+        Rate-limited GET that backs off and retries on HTTP 429.
+        """
+        for attempt in range(self.max_retries + 1):
+            await self.governor.acquire()
+            response = await asyncio.to_thread(self._get, url, params, headers)
+            if response.status_code != 429 or attempt == self.max_retries:
+                return response
+
+            retry_after = response.headers.get("Retry-After")
+            try:
+                delay = float(retry_after)
+            except (TypeError, ValueError):
+                delay = min(60, 0.5 * 2 ** attempt) * (1 + random.random())
+            print(
+                f"[WARNING] Rate limited by {url}, backing off {delay:.1f}s (attempt {attempt + 1})")
+            self.governor.pause(delay)
+        return response
+
+    async def fetch_ohlc(self, currency_pair, step, limit, start=None, end=None):
+        """
+        Fetch OHLC data for a currency pair. See HTTPHandler.fetch_ohlc.
+        """
+        url, params = self._ohlc_request(currency_pair, step, limit, start, end)
+        response = await self._get_async(url, params=params)
+        return self._parse_ohlc(response)
+
+    async def fetch_ticker_info(self, currency_pairs, bulk=False):
+        """
+        Fetch ticker information for all given pairs concurrently. See HTTPHandler.fetch_ticker_info.
+        """
+        tickers = {}
+        if bulk:
+            try:
+                response = await self._get_async(self._bulk_ticker_url())
+                tickers = self._parse_bulk_tickers(response, currency_pairs)
+            except Exception as e:
+                print(f"[WARNING] Failed to fetch bulk ticker data: {e}")
+            missing = [pair for pair in currency_pairs if pair not in tickers]
+            if missing:
+                print(f"[INFO] Fetching {len(missing)} tickers missing from the bulk response")
+            currency_pairs = missing
+
+        async def fetch(pair):
+            try:
+                response = await self._get_async(f"{self.base_url}/ticker/{pair}/")
+            except Exception as e:
+                print(f"[WARNING] Failed to fetch ticker data for {pair}: {e}")
+                return pair, None
+            return pair, self._parse_ticker(pair, response)
+
+        results = await asyncio.gather(*(fetch(pair) for pair in currency_pairs))
+        tickers.update((pair, ticker) for pair, ticker in results if ticker is not None)
+        return tickers
+
+    async def fetch_transactions(self, currency_pair, interval="hour"):
+        """
+        Fetch recent trades for a currency pair. See HTTPHandler.fetch_transactions.
+        """
+        url, params = self._transactions_request(currency_pair, interval)
+        response = await self._get_async(url, params=params)
+        return self._parse_transactions(currency_pair, response)
+
+    async def fetch_trading_pairs(self):
+        """
+        Fetch Bitstamp's trading pairs info. See HTTPHandler.fetch_trading_pairs.
+        """
+        response = await self._get_async(f"{self.base_url}/trading-pairs-info/")
+        return self._parse_trading_pairs(response)
+
+    async def fetch_currencies_with_logo(self):
+        """
+        Fetch and filter the currency list. See HTTPHandler.fetch_currencies_with_logo.
+        """
+        import requests
+
+        all_currencies = self._cached_currencies()
+        if all_currencies is None:
+            try:
+                response = await self._get_async(self._currencies_url(),
+                                                 headers=self._currencies_validators())
+            except requests.RequestException as e:
+                all_currencies = self._stale_currencies(e)
+            else:
+                all_currencies = self._read_currencies(response)
+        return self._filter_currencies(all_currencies)
+
+    async def fetch_currency_metadata(self):
+        """
+        Fetch currency metadata indexed by symbol. See HTTPHandler.fetch_currency_metadata.
+        """
+        _, all_currencies, _ = await self.fetch_currencies_with_logo()
+        return self._currency_index(all_currencies)
@@ -1,70 +1,413 @@
 # New file with changes highlighted and comments on removed lines
 
-import influxdb_client
-from influxdb_client.client.write_api import SYNCHRONOUS
+import json
+import threading
+import time
+from query_cache import QueryCache
+from batch_writer import BatchWriter
+from line_protocol import LineProtocolSerializer
+from write_spool import WriteSpool, SpoolReplayer
+
+
+class LazyWriteApi:
+    def __init__(self, get_client):
+        """
+        Synchronous influxdb_client WriteApi that is created on the first write.
+
+        Args:
+            get_client (callable): Returns the InfluxDBClient to take the WriteApi from.
+        """
+        self.get_client = get_client
+        self._write_api = None
+        self._lock = threading.Lock()
+
+    def write_api(self):
+        if self._write_api is None:
+            with self._lock:
+                if self._write_api is None:
+                    from influxdb_client.client.write_api import SYNCHRONOUS
+                    self._write_api = self.get_client().write_api(write_options=SYNCHRONOUS)
+        return self._write_api
+
+    def write(self, bucket, record, **kwargs):
+        return self.write_api().write(bucket=bucket, record=record, **kwargs)
 
 
 class InfluxDBHandler:
-    def __init__(self, websocket_url, ohlc_url, token, org):
+    def __init__(self, websocket_url, ohlc_url, token, org, batch_size=5000, flush_interval=1.0,
+                 on_batch_success=None, on_batch_error=None, spool_dir=None,
+                 spool_max_bytes=512 * 1024 * 1024, replay_rate=5.0, metrics=None,
+                 query_cache_size=64, query_cache_ttl=30.0):
         """
         Initialize the InfluxDB clients for WebSocket and OHLC data buckets.
+
+        Clients are created on first use (see ws_client and ohlc_client), and both buckets
+        share one client when they live on the same URL, so commands that never touch
+        InfluxDB neither import influxdb_client nor open clients. The batch writers and the
+        spool likewise start with the first live write (or failed write).
+
         Args:
             websocket_url (str): URL for WebSocket InfluxDB bucket.
             ohlc_url (str): URL for OHLC InfluxDB bucket.
             token (str): InfluxDB authentication token.
             org (str): The organization name.
+            batch_size (int): Live trades are written once this many points are buffered.
+            flush_interval (float): Maximum seconds a live trade waits in the buffer.
+            on_batch_success (callable): Called as on_batch_success(bucket, batch) per written batch.
+            on_batch_error (callable): Called as on_batch_error(bucket, batch, exception) per failed batch.
+            spool_dir (str): Directory of the on-disk spool that keeps failed writes until InfluxDB
+                is reachable again. Failed writes are dropped when not set.
+            spool_max_bytes (int): Disk budget of the spool; the oldest data is evicted beyond it.
+            replay_rate (float): Maximum spooled batches replayed per second after recovery.
+            metrics (Metrics): Optional metrics recording write latency and trades written per pair.
+            query_cache_size (int): Query results kept for queries run with cache=True.
+            query_cache_ttl (float): Seconds a cached result for a relative time range is served.
+        """
+        if not websocket_url or not ohlc_url:
+            raise ValueError("InfluxDB URL is not set")
+        self.websocket_url = websocket_url
+        self.ohlc_url = ohlc_url
+        self.token = token
+        self.org = org
+        self._clients = {}  # url -> InfluxDBClient
+        self._clients_lock = threading.Lock()
+        self.client_init_seconds = 0.0  # Time spent importing influxdb_client and creating clients
+
+        # Separate write APIs for two buckets, unless both are on the same server
+        self.ws_write_api = LazyWriteApi(lambda: self.ws_client)
+        self.ohlc_write_api = self.ws_write_api if ohlc_url == websocket_url else \
+            LazyWriteApi(lambda: self.ohlc_client)
+
+        self.metrics = metrics
+        if metrics:
+            from metrics import TimedWriteApi
+            write_api = self.ws_write_api
+            self.ws_write_api = TimedWriteApi(write_api, metrics.write_latency)
+            self.ohlc_write_api = self.ws_write_api if self.ohlc_write_api is write_api else \
+                TimedWriteApi(self.ohlc_write_api, metrics.write_latency)
+
+        # Repeated dashboard-style queries can be answered from memory
+        self.query_cache = QueryCache(max_entries=query_cache_size, ttl=query_cache_ttl)
+
+        # Hot write paths serialize straight to line protocol instead of building Points
+        self.serializer = LineProtocolSerializer()
+
+        # Failed writes are kept on disk and replayed in order once InfluxDB recovers. The spool
+        # and the batch writers (and their threads) are only started by the first write that
+        # needs them, so one-shot commands never create them
+        self.spool_dir = spool_dir
+        self.spool_max_bytes = spool_max_bytes
+        self.replay_rate = replay_rate
+        self.spool_replayer = None
+        self._write_spool = None
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._writers = {}  # bucket -> BatchWriter
+        self._start_lock = threading.RLock()
+
+        self.on_batch_success = on_batch_success or self._log_batch_success
+        self.on_batch_error = on_batch_error or self._log_batch_error
+
+    def _client(self, url):
+        """
+        InfluxDB client for a URL, created on first use and shared by all buckets on it.
+        """
+        client = self._clients.get(url)
+        if client is None:
+            with self._clients_lock:
+                client = self._clients.get(url)
+                if client is None:
+                    started = time.perf_counter()
+                    import influxdb_client
+                    client = self._clients[url] = influxdb_client.InfluxDBClient(
+                        url=url, token=self.token, org=self.org)
+                    self.client_init_seconds += time.perf_counter() - started
+        return client
+
+    @property
+    def spool(self):
+        """
+        On-disk spool of failed writes, created and replayed from on first use; None when no
+        spool_dir is set.
+        """
+        return self._start_spool()
+
+    def _start_spool(self):
+        if self._write_spool is None and self.spool_dir:
+            with self._start_lock:
+                if self._write_spool is None:
+                    spool = WriteSpool(self.spool_dir, max_bytes=self.spool_max_bytes)
+                    self.spool_replayer = SpoolReplayer(spool, {
+                        "crypto_portfolio": self.ws_write_api,
+                        "crypto_history": self.ohlc_write_api,
+                        "crypto_ticker": self.ohlc_write_api,
+                        "crypto_snapshots": self.ohlc_write_api,
+                    }, rate=self.replay_rate, metrics=self.metrics)
+                    self._write_spool = spool
+        return self._write_spool
+
+    def _writer(self, bucket, write_api):
+        """
+        Batch writer of a bucket, started on first use together with the spool, so writes
+        left over from an earlier run replay as soon as live writing begins.
+        """
+        writer = self._writers.get(bucket)
+        if writer is None:
+            with self._start_lock:
+                writer = self._writers.get(bucket)
+                if writer is None:
+                    self._start_spool()
+                    writer = self._writers[bucket] = BatchWriter(
+                        write_api,
+                        bucket=bucket,
+                        batch_size=self.batch_size,
+                        flush_interval=self.flush_interval,
+                        on_success=self._handle_batch_success,
+                        on_error=self._handle_batch_error,
+                    )
+        return writer
+
+    @property
+    def ws_writer(self):
+        """
+        Live trades, conflated prices and the portfolio, buffered and written in batches off
+        the event loop.
+        """
+        return self._writer("crypto_portfolio", self.ws_write_api)
+
+    @property
+    def ohlc_writer(self):
+        """
+        Candles built from the live stream, batched the same way into the OHLC bucket.
+        """
+        return self._writer("crypto_history", self.ohlc_write_api)
+
+    @property
+    def snapshot_writer(self):
+        """
+        Hourly snapshots, batched into their own long-retention bucket.
+        """
+        return self._writer("crypto_snapshots", self.ohlc_write_api)
+
+    @property
+    def ws_client(self):
+        return self._client(self.websocket_url)
+
+    @property
+    def ohlc_client(self):
+        return self._client(self.ohlc_url)
+
+    @staticmethod
+    def _log_batch_success(bucket, batch):
+        print(f"Batch written to {bucket}: {len(batch)} points")
+
+    @staticmethod
+    def _log_batch_error(bucket, batch, error):
+        print(
+            f"Failed to write batch of {len(batch)} points to {bucket}: {error}")
+
+    def _handle_batch_success(self, bucket, batch):
+        if self.metrics:
+            self.metrics.batch_written(bucket, batch)
+        self.on_batch_success(bucket, batch)
+
+    def _handle_batch_error(self, bucket, batch, error):
+        self.on_batch_error(bucket, batch, error)
+        lines = [r if isinstance(r, str) else r.to_line_protocol() for r in batch]
+        self._spool(bucket, "\n".join(lines))
+
+    def _spool(self, bucket, payload):
         """
-        # Separate clients for WebSocket and OHLC buckets
-        self.ws_client = influxdb_client.InfluxDBClient(
-            url=websocket_url, token=token, org=org
-        )
-        self.ohlc_client = influxdb_client.InfluxDBClient(
-            url=ohlc_url, token=token, org=org
-        )
+        Keep a failed write on disk for later replay.
 
-        # Separate write APIs for two buckets
-        self.ws_write_api = self.ws_client.write_api(write_options=SYNCHRONOUS)
-        self.ohlc_write_api = self.ohlc_client.write_api(
-            write_options=SYNCHRONOUS)
+        Returns:
+            bool: True if the data was spooled.
+        """
+        if self.spool is None:
+            return False
+        try:
+            self.spool.append(bucket, payload)
+            print(f"Spooled failed write to {bucket} for replay")
+            return True
+        except Exception as e:
+            print(f"Failed to spool write for {bucket}, data lost: {e}")
+            return False
 
     # WebSocket Price Updates
     def write_data(self, currency_pair, price, timestamp):
         """
-        Write real-time WebSocket price data to InfluxDB (WebSocket bucket).
+        Queue real-time WebSocket price data for the next batch write (WebSocket bucket).
         """
         try:
-            point = influxdb_client.Point("crypto_data") \
-                .tag("currency_pair", currency_pair) \
-                .field("price", price) \
-                .time(timestamp)
+            # Buffered; the batch writer sends it to the WebSocket bucket
+            self.ws_writer.write(
+                self.serializer.trade(currency_pair, price, timestamp))
+        except Exception as e:
+            print(f"Failed to queue WebSocket data for InfluxDB: {e}")
 
-            # Write to WebSocket bucket
-            self.ws_write_api.write(bucket="crypto_portfolio", record=point)
-            print(
-                f"Real-time WebSocket data written: {currency_pair} = {price} USD")
+    def write_conflated_trade(self, currency_pair, price, low, high, count, timestamp):
+        """
+        Queue a conflated live price for the next batch write (WebSocket bucket).
+
+        Args:
+            count (int): Number of trades the point stands for.
+            timestamp (int): Time of the latest trade in nanoseconds, unique per pair (see
+                TickConflator).
+        """
+        try:
+            self.ws_writer.write(self.serializer.conflated_trade(
+                currency_pair, price, low, high, count, timestamp))
         except Exception as e:
-            print(f"Failed to write WebSocket data to InfluxDB: {e}")
+            print(f"Failed to queue conflated trade for InfluxDB: {e}")
+
+    def flush(self, timeout=None):
+        """
+        Write all buffered live trades and candles now and wait for the batches to complete.
+        """
+        flushed = [writer.flush(timeout) for writer in list(self._writers.values())]
+        return all(flushed)
+
+    def close(self):
+        """
+        Flush buffered writes and close the InfluxDB clients.
+        """
+        # Only writers and a spool that were actually started
+        for writer in list(self._writers.values()):
+            writer.close()
+        if self._write_spool is not None:
+            self.spool_replayer.stop()
+            self._write_spool.close()
+        # Only clients that were actually created
+        for client in self._clients.values():
+            client.close()
 
     # OHLC Writing Logic
     def write_ohlc_data(self, currency_pair, open_, high, low, close, volume, timestamp):
         """
         Write OHLC data into InfluxDB (OHLC bucket).
         """
+        line = None
         try:
-            point = influxdb_client.Point("crypto_history") \
-                .tag("currency_pair", currency_pair) \
-                .field("open", open_) \
-                .field("high", high) \
-                .field("low", low) \
-                .field("close", close) \
-                .field("volume", volume) \
-                .time(timestamp)
+            line = self.serializer.ohlc(
+                currency_pair, open_, high, low, close, volume, timestamp)
+            if line is None:
+                print(f"[WARNING] Skipping OHLC data for {currency_pair} without finite values")
+                return
 
             # Write to OHLC bucket
-            self.ohlc_write_api.write(bucket="crypto_history", record=point)
+            self.ohlc_write_api.write(bucket="crypto_history", record=line)
             print(f"OHLC data written for {currency_pair}: {timestamp}")
         except Exception as e:
             print(f"Error writing OHLC data to InfluxDB: {e}")
+            if line:
+                self._spool("crypto_history", line)
+
+    def write_ohlc_batch(self, currency_pair, candles):
+        """
+        Write many Bitstamp OHLC candles for one pair in a single request (OHLC bucket).
+
+        Args:
+            currency_pair (str): The currency pair, e.g., "btcusd".
+            candles (list): Candle dicts as returned by HTTPHandler.fetch_ohlc.
+
+        Returns:
+            bool: True only if InfluxDB accepted the batch. A failed batch is still spooled for
+                replay, but False keeps the backfill watermark before it, so the candles are
+                fetched again even if the spool evicts them.
+        """
+        lines = []
+        try:
+            ohlc = self.serializer.ohlc
+            lines = [
+                ohlc(currency_pair, candle["open"], candle["high"], candle["low"],
+                     candle["close"], candle["volume"],
+                     int(candle["timestamp"]) * 1_000_000_000)
+                for candle in candles
+            ]
+            lines = [line for line in lines if line is not None]
+            if lines:
+                # One line protocol payload for the whole batch
+                self.ohlc_write_api.write(bucket="crypto_history", record="\n".join(lines))
+            print(f"OHLC batch written for {currency_pair}: {len(lines)} candles")
+            return True
+        except Exception as e:
+            print(f"Error writing OHLC batch to InfluxDB: {e}")
+            if lines:
+                self._spool("crypto_history", "\n".join(lines))
+            return False
+
+    def write_candle(self, currency_pair, resolution, start, open_, high, low, close, volume, trades):
+        """
+        Queue a candle aggregated from live trades for the next batch write (crypto_candles
+        measurement of the OHLC bucket).
+
+        Args:
+            currency_pair (str): The currency pair, e.g., "btcusd".
+            resolution (str): Candle size tag, e.g., "1m" or "1h".
+            start (int): Candle open time in Unix seconds.
+            trades (int): Number of trades folded into the candle.
+        """
+        try:
+            self.ohlc_writer.write(self.serializer.ohlc(
+                currency_pair, open_, high, low, close, volume, start * 1_000_000_000,
+                resolution=resolution, trades=trades))
+        except Exception as e:
+            print(f"Failed to queue candle for InfluxDB: {e}")
+
+    def write_snapshot(self, currency_pair, timestamp, open_, high, low, last, vwap, volume,
+                       trades=None):
+        """
+        Queue an hourly snapshot for the next batch write (snapshots bucket).
+
+        Args:
+            currency_pair (str): The currency pair, e.g., "btcusd".
+            timestamp (int): Snapshot time (end of the hour) in Unix seconds.
+            trades (int): Number of trades in the hour, or None when rebuilt from candles.
+        """
+        try:
+            self.snapshot_writer.write(self.serializer.snapshot(
+                currency_pair, timestamp * 1_000_000_000, open_, high, low, last, vwap, volume,
+                trades))
+        except Exception as e:
+            print(f"Failed to queue snapshot for InfluxDB: {e}")
+
+    def write_portfolio(self, timestamp, total, assets, accounts):
+        """
+        Queue a portfolio valuation for the next batch write (WebSocket bucket).
+
+        Args:
+            timestamp (int): Valuation time in Unix seconds.
+            total (float): Total value in the quote currency.
+            assets (dict): {asset: (units, price, value)}.
+            accounts (dict): {account: value}.
+        """
+        try:
+            self.ws_writer.write_many(self.serializer.portfolio(
+                timestamp * 1_000_000_000, total, assets, accounts))
+        except Exception as e:
+            print(f"Failed to queue portfolio valuation for InfluxDB: {e}")
+
+    def ensure_bucket(self, bucket, retention_seconds=0):
+        """
+        Create a bucket if it does not exist yet (retention 0 keeps data forever).
+
+        Returns:
+            bool: True if the bucket exists or was created.
+        """
+        try:
+            buckets_api = self.ohlc_client.buckets_api()
+            if buckets_api.find_bucket_by_name(bucket) is not None:
+                return True
+            from influxdb_client import BucketRetentionRules
+            retention = BucketRetentionRules(
+                type="expire", every_seconds=retention_seconds)
+            buckets_api.create_bucket(bucket_name=bucket, retention_rules=retention,
+                                      org=self.ohlc_client.org)
+            print(f"Created InfluxDB bucket {bucket}")
+            return True
+        except Exception as e:
+            print(f"Failed to ensure InfluxDB bucket {bucket}: {e}")
+            return False
 
     # Ticker Data Storage
     def write_ticker_data(self, currency_pair, ticker_data, timestamp, metadata=None):
@@ -77,43 +420,42 @@ class InfluxDBHandler:
             timestamp (int): The UNIX timestamp in nanoseconds.
             metadata (dict): Additional metadata for the currency (e.g., name, logo, etc.)
         """
+        line = None
         try:
-            # Build a point for the ticker data
-            point = influxdb_client.Point("crypto_ticker") \
-                .tag("currency_pair", currency_pair) \
-                .field("open", float(ticker_data["open"])) \
-                .field("high", float(ticker_data["high"])) \
-                .field("low", float(ticker_data["low"])) \
-                .field("last", float(ticker_data["last"])) \
-                .field("volume", float(ticker_data["volume"])) \
-                .time(timestamp)
-
-            # Add metadata as tags if provided
-            if metadata:
-                if "name" in metadata:
-                    point = point.tag("name", metadata["name"])
-                if "symbol" in metadata:
-                    point = point.tag("symbol", metadata["symbol"])
-                if "logo" in metadata:
-                    point = point.tag("logo_url", metadata["logo"])
-                if "type" in metadata:
-                    point = point.tag("type", metadata["type"])
-                if "available_supply" in metadata:
-                    point = point.field("available_supply", float(
-                        metadata["available_supply"]))
+            line = self.serializer.ticker(
+                currency_pair, ticker_data, timestamp, metadata)
+            if line is None:
+                print(f"[WARNING] Skipping ticker data for {currency_pair} without finite values")
+                return
 
             # Write the point to the OHLC bucket
-            self.ohlc_write_api.write(bucket="crypto_ticker", record=point)
+            self.ohlc_write_api.write(bucket="crypto_ticker", record=line)
             print(f"Ticker data written for {currency_pair}: {timestamp}")
         except Exception as e:
             print(f"Error writing ticker data to InfluxDB: {e}")
+            if line:
+                self._spool("crypto_ticker", line)
     # highlight-end
 
     # Query Logic (Unmodified for Historical Data)
-    def query(self, query_string):
+    def query(self, query_string, cache=False):
         """
         Query InfluxDB using Flux and return the results.
+
+        Args:
+            query_string (str): Flux query.
+            cache (bool): Serve repeated queries from the LRU query cache. Cached results are
+                shared between callers and must not be modified.
+
+        Returns:
+            list: One dict per record, or an empty list on error.
         """
+        key = None
+        if cache:
+            key = self.query_cache.key(query_string, "records")
+            results = self.query_cache.get(key)
+            if results is not None:
+                return results
         try:
             # Perform the query using the OHLC client
             query_api = self.ohlc_client.query_api()
@@ -127,7 +469,191 @@ class InfluxDBHandler:
                     results.append(
                         {"_time": record.get_time(), **record.values})
 
+            if key:
+                self.query_cache.put(key, results)
             return results
         except Exception as e:
             print(f"Error querying InfluxDB: {e}")
             return []  # Return an empty list on error
+
+    def query_stream(self, query_string):
+        """
+        Query InfluxDB using Flux and yield the records one at a time as they are parsed,
+        so large results never have to fit in memory.
+
+        Yields:
+            dict: The values of each record, including "_time".
+
+        Raises:
+            Exception: The query error, so a failed query is never mistaken for a shorter
+                complete result.
+        """
+        try:
+            for record in self.ohlc_client.query_api().query_stream(query_string):
+                yield record.values
+        except Exception as e:
+            print(f"Error streaming query from InfluxDB: {e}")
+            raise
+
+    def query_columns(self, query_string, by="_field", cache=False):
+        """
+        Query InfluxDB using Flux and return the results as NumPy columns.
+
+        The CSV response is read row by row into typed arrays without building a record object
+        per row, and "_time" comes back as datetime64[ns]. Use keep() or pivot() in the query
+        to control which columns are returned.
+
+        Args:
+            query_string (str): Flux query.
+            by (str): Column to group the arrays by, e.g. "_field" for one set of arrays per
+                field; None returns everything under the key None.
+            cache (bool): Serve repeated queries from the LRU query cache. Cached arrays are
+                read-only.
+
+        Returns:
+            dict: {group value: {column: array}}, or an empty dict on error.
+        """
+        key = None
+        if cache:
+            key = self.query_cache.key(query_string, "columns", by)
+            columns = self.query_cache.get(key)
+            if columns is not None:
+                return columns
+        try:
+            query_api = self.ohlc_client.query_api()
+            from influxdb_client import Dialect
+            from flux_columns import read_columns
+            rows = query_api.query_csv(
+                query_string, dialect=Dialect(header=True, annotations=["datatype"]))
+            columns = read_columns(rows, by=by)
+        except Exception as e:
+            print(f"Error querying columns from InfluxDB: {e}")
+            return {}
+
+        if key:
+            for group in columns.values():
+                for array in group.values():
+                    array.flags.writeable = False
+            self.query_cache.put(key, columns)
+        return columns
+
+    def query_candles(self, currency_pairs, start, stop, bucket="crypto_history"):
+        """
+        Fetch stored hourly REST candles for many pairs with a single Flux query.
+
+        Args:
+            currency_pairs (list): Pairs to fetch.
+            start (int): Earliest candle open time, Unix seconds (inclusive).
+            stop (int): Latest candle open time, Unix seconds (exclusive).
+            bucket (str): Bucket to query.
+
+        Returns:
+            dict: {pair: [{"timestamp", "open", "high", "low", "close", "volume"}, ...]},
+                or None if the query failed.
+        """
+        query = f"""
+    from(bucket: "{bucket}")
+      |> range(start: {int(start)}, stop: {int(stop)})
+      |> filter(fn: (r) => r._measurement == "crypto_history")
+      |> filter(fn: (r) => contains(value: r.currency_pair, set: {json.dumps(list(currency_pairs))}))
+      |> filter(fn: (r) => contains(value: r._field, set: ["open", "high", "low", "close", "volume"]))
+      |> pivot(rowKey: ["_time"], columnKey: ["_field"], valueColumn: "_value")
+    """
+        try:
+            tables = self.ohlc_client.query_api().query(query)
+        except Exception as e:
+            print(f"Error querying candles from InfluxDB: {e}")
+            return None
+
+        candles = {}
+        for table in tables:
+            for record in table.records:
+                values = record.values
+                candles.setdefault(values.get("currency_pair"), []).append({
+                    "timestamp": int(record.get_time().timestamp()),
+                    **{field: values.get(field) for field in ("open", "high", "low", "close", "volume")},
+                })
+        return candles
+
+    def point_times(self, currency_pairs, measurement, start, bucket="crypto_history",
+                    field="close"):
+        """
+        Fetch the time of every stored point of a measurement for many pairs, e.g., to find
+        the hours that have no snapshot.
+
+        Args:
+            currency_pairs (list): Pairs to look up.
+            measurement (str): Measurement name.
+            start (int): Earliest point time, Unix seconds.
+            bucket (str): Bucket to query.
+            field (str): A field every point has.
+
+        Returns:
+            dict: {pair: set of Unix-second timestamps}, or None if the query failed.
+        """
+        query = f"""
+    from(bucket: "{bucket}")
+      |> range(start: {int(start)})
+      |> filter(fn: (r) => r._measurement == "{measurement}" and r._field == "{field}")
+      |> filter(fn: (r) => contains(value: r.currency_pair, set: {json.dumps(list(currency_pairs))}))
+      |> keep(columns: ["_time", "currency_pair"])
+    """
+        try:
+            tables = self.ohlc_client.query_api().query(query)
+        except Exception as e:
+            print(f"Error querying point times from InfluxDB: {e}")
+            return None
+
+        times = {}
+        for table in tables:
+            for record in table.records:
+                times.setdefault(record.values.get("currency_pair"), set()).add(
+                    int(record.get_time().timestamp()))
+        return times
+
+    def last_timestamps(self, currency_pairs, measurements="crypto_history", bucket="crypto_history",
+                        fields=("close",), start="-1y", with_value=False):
+        """
+        Fetch the latest point time for many pairs (and measurements) with a single Flux query.
+
+        Args:
+            currency_pairs (list): Pairs to look up, e.g., ["btcusd", "xrpusd"].
+            measurements (str or list): Measurement name, or several names to check at once.
+            bucket (str): Bucket to query.
+            fields (tuple): Fields considered when picking the latest point (e.g., ("close",)).
+            start (str): Flux range start bounding the lookup.
+            with_value (bool): Also return the value of the latest point (e.g., the last close).
+
+        Returns:
+            dict: {pair: timestamp} with Unix-second timestamps, or {pair: (timestamp, value)}
+                when with_value is set. Keys are (measurement, pair) tuples when a list of
+                measurements is given. Pairs without data are omitted. None if the query failed.
+        """
+        measurement_list = [measurements] if isinstance(
+            measurements, str) else list(measurements)
+        # last() runs per series inside the storage engine; the max() picks the newest field per pair
+        query = f"""
+    from(bucket: "{bucket}")
+      |> range(start: {start})
+      |> filter(fn: (r) => contains(value: r._measurement, set: {json.dumps(measurement_list)}))
+      |> filter(fn: (r) => contains(value: r._field, set: {json.dumps(list(fields))}))
+      |> filter(fn: (r) => contains(value: r.currency_pair, set: {json.dumps(list(currency_pairs))}))
+      |> last()
+      |> group(columns: ["_measurement", "currency_pair"])
+      |> max(column: "_time")
+    """
+        try:
+            tables = self.ohlc_client.query_api().query(query)
+        except Exception as e:
+            print(f"Error querying last timestamps from InfluxDB: {e}")
+            return None
+
+        latest = {}
+        for table in tables:
+            for record in table.records:
+                pair = record.values.get("currency_pair")
+                key = pair if isinstance(measurements, str) else (
+                    record.get_measurement(), pair)
+                timestamp = int(record.get_time().timestamp())
+                latest[key] = (timestamp, record.get_value()) if with_value else timestamp
+        return latest
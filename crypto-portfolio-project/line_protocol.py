@@ -0,0 +1,172 @@
+from math import isfinite
+
+_ESCAPE_MEASUREMENT = str.maketrans({
+    ",": r"\,",
+    " ": r"\ ",
+    "\n": r"\n",
+    "\t": r"\t",
+    "\r": r"\r",
+})
+
+_ESCAPE_KEY = str.maketrans({
+    ",": r"\,",
+    "=": r"\=",
+    " ": r"\ ",
+    "\n": r"\n",
+    "\t": r"\t",
+    "\r": r"\r",
+})
+
+
+def format_float(value):
+    """
+    Format a float field value the way influxdb_client.Point does (no trailing ".0").
+
+    Returns:
+        str: The value, or None for NaN and infinities, which Point leaves out (InfluxDB
+            rejects the whole write if one gets through).
+    """
+    value = float(value)
+    if not isfinite(value):
+        return None
+    s = repr(value)
+    return s[:-2] if s.endswith(".0") else s
+
+
+def join_fields(fields):
+    """
+    Join (key, formatted value) pairs into a field set, leaving out None values.
+    """
+    return ",".join(f"{key}={value}" for key, value in fields if value is not None)
+
+
+class LineProtocolSerializer:
+    def __init__(self):
+        """
+        Build InfluxDB line protocol directly for the hot write paths.
+
+        The escaped "measurement,tag=value " prefix of every series is computed once and cached,
+        so serializing a point is a single string concatenation instead of building a Point.
+        Tags and fields are emitted in sorted order, exactly like influxdb_client.Point, and
+        non-finite float fields are left out like Point does. A point left without fields is
+        not written: its method returns None (portfolio drops it from the list).
+        """
+        self._prefixes = {}
+
+    def prefix(self, measurement, tags):
+        """
+        Cached, escaped series prefix, e.g. "crypto_data,currency_pair=btcusd ".
+
+        Args:
+            measurement (str): Measurement name.
+            tags (tuple): (key, value) tag pairs; pairs with a None value are skipped.
+        """
+        key = (measurement, tags)
+        prefix = self._prefixes.get(key)
+        if prefix is None:
+            parts = [measurement.translate(_ESCAPE_MEASUREMENT)]
+            for tag_key, tag_value in sorted(tags):
+                if tag_value is None or tag_value == "":
+                    continue
+                parts.append(f"{tag_key.translate(_ESCAPE_KEY)}={str(tag_value).translate(_ESCAPE_KEY)}")
+            prefix = ",".join(parts) + " "
+            self._prefixes[key] = prefix
+        return prefix
+
+    def trade(self, currency_pair, price, timestamp):
+        """
+        Line for a live trade in the crypto_data measurement.
+        """
+        prefix = self._prefixes.get(currency_pair)
+        if prefix is None:
+            prefix = self._prefixes[currency_pair] = self.prefix(
+                "crypto_data", (("currency_pair", currency_pair),)) + "price="
+        price = format_float(price)
+        return f"{prefix}{price} {timestamp}" if price is not None else None
+
+    def _line(self, prefix, fields, timestamp):
+        field_set = join_fields(fields)
+        return f"{prefix}{field_set} {timestamp}" if field_set else None
+
+    def conflated_trade(self, currency_pair, price, low, high, count, timestamp):
+        """
+        Line for a conflated live price in the crypto_data measurement: the latest price plus
+        the range and number of trades it stands for.
+        """
+        prefix = self.prefix("crypto_data", (("currency_pair", currency_pair),))
+        price = format_float(price)
+        if price is None:
+            return None  # A range and count without a price mean nothing
+        return self._line(prefix, (("high", format_float(high)), ("low", format_float(low)),
+                                   ("price", price), ("tick_count", f"{int(count)}i")),
+                          timestamp)
+
+    def ohlc(self, currency_pair, open_, high, low, close, volume, timestamp, resolution=None,
+             trades=None):
+        """
+        Line for a candle: REST candles go to the crypto_history measurement, candles built
+        from live trades (those with a resolution) to crypto_candles, so queries on
+        crypto_history keep seeing one series per pair.
+        """
+        measurement = "crypto_candles" if resolution else "crypto_history"
+        prefix = self.prefix(measurement, (("currency_pair", currency_pair),
+                                           ("resolution", resolution)))
+        return self._line(prefix, (
+            ("close", format_float(close)),
+            ("high", format_float(high)),
+            ("low", format_float(low)),
+            ("open", format_float(open_)),
+            ("trade_count", f"{int(trades)}i" if trades is not None else None),
+            ("volume", format_float(volume)),
+        ), timestamp)
+
+    def snapshot(self, currency_pair, timestamp, open_, high, low, last, vwap, volume, trades=None):
+        """
+        Line for an hourly snapshot in the crypto_snapshot measurement.
+        """
+        prefix = self.prefix("crypto_snapshot", (("currency_pair", currency_pair),))
+        return self._line(prefix, (
+            ("high", format_float(high)),
+            ("last", format_float(last)),
+            ("low", format_float(low)),
+            ("open", format_float(open_)),
+            ("trade_count", f"{int(trades)}i" if trades is not None else None),
+            ("volume", format_float(volume)),
+            ("vwap", format_float(vwap)),
+        ), timestamp)
+
+    def portfolio(self, timestamp, total, assets, accounts):
+        """
+        Lines for one valuation in the portfolio_value measurement: the total, one line per
+        asset (units, price and value) and one per account, told apart by the scope tag.
+        """
+        lines = [self._line(self.prefix("portfolio_value", (("scope", "total"),)),
+                            (("value", format_float(total)),), timestamp)]
+        for asset, (units, price, value) in assets.items():
+            prefix = self.prefix("portfolio_value", (("asset", asset), ("scope", "asset")))
+            lines.append(self._line(prefix, (("price", format_float(price)),
+                                             ("units", format_float(units)),
+                                             ("value", format_float(value))), timestamp))
+        for account, value in accounts.items():
+            prefix = self.prefix("portfolio_value", (("account", account), ("scope", "account")))
+            lines.append(self._line(prefix, (("value", format_float(value)),), timestamp))
+        return [line for line in lines if line is not None]
+
+    def ticker(self, currency_pair, ticker_data, timestamp, metadata=None):
+        """
+        Line for ticker data (plus optional currency metadata) in the crypto_ticker measurement.
+        """
+        metadata = metadata or {}
+        prefix = self.prefix("crypto_ticker", (
+            ("currency_pair", currency_pair),
+            ("logo_url", metadata.get("logo")),
+            ("name", metadata.get("name")),
+            ("symbol", metadata.get("symbol")),
+            ("type", metadata.get("type")),
+        ))
+        fields = []
+        if "available_supply" in metadata:
+            fields.append(("available_supply", format_float(metadata["available_supply"])))
+        for key in ("high", "last", "low", "open", "volume"):
+            fields.append((key, format_float(ticker_data[key])))
+        return self._line(prefix, fields, timestamp)
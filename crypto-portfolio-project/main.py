@@ -1,12 +1,28 @@
+import time
+STARTUP_BEGAN = time.perf_counter()  # Taken before the other imports for --startup-profile
 import asyncio
-import json
 import os
 import argparse
-import time
 from dotenv import load_dotenv
 from influxdb_handler import InfluxDBHandler
-from websocket_client import WebSocketClient
-from http_handler import HTTPHandler
+from http_handler import AsyncHTTPHandler
+from message_pipeline import MessagePipeline
+from ohlc_backfill import OHLCBackfiller
+from candle_aggregator import CandleAggregator
+from snapshot_rollup import SnapshotRollup, snapshots_from_candles
+from tick_conflator import TickConflator
+from message_decoder import TradeDecoder
+from gap_repair import GapRepairer
+from pair_registry import PairRegistry
+from metadata_cache import MetadataCache
+from capture import CaptureWriter, replay_capture
+from watermark_store import WatermarkStore
+from metrics import Metrics
+from price_service import LatestPrices, PriceServer
+# Heavy modules (websockets, numpy, influxdb_client, requests) are imported where first used,
+# so one-shot commands such as --fetch-ticker only load what they need
+
+IMPORTS_DONE = time.perf_counter()
 
 # --- ENVIRONMENT AND CONFIGURATION ---
 
@@ -20,82 +36,193 @@ INFLUXDB_TOKEN = os.getenv('INFLUXDB_TOKEN')
 INFLUXDB_ORG = os.getenv('INFLUXDB_ORG')
 
 # Bitstamp Configuration
-CURRENCY_PAIRS = ["btcusd", "xrpusd", "xlmusd",
-                  "hbarusd", "vetusd", "csprusd", "xdcusd"]
+# Tracked pairs come from pairs.json (see README), reloaded without a restart; without it
+# every enabled pair in Bitstamp's trading pairs info is tracked
+PAIR_CONFIG = os.path.join(os.path.dirname(__file__), "pairs.json")
+PAIR_REFRESH_INTERVAL = 3600  # Seconds between reloads of the config and trading pairs info
 WS_URL = "wss://ws.bitstamp.net"
+WS_SHARDS = 1  # WebSocket connections to spread pairs over; raise when tracking many pairs
+WS_REBALANCE_INTERVAL = 3600  # Seconds between checks of the per-shard trade rate balance
 HTTP_BASE_URL = "https://www.bitstamp.net/api/v2"
+METADATA_CACHE = os.path.join(os.path.dirname(__file__), "metadata_cache.json")
+METADATA_TTL = 24 * 3600  # Currency metadata is re-validated with Bitstamp at most daily
+TICKER_INTERVAL = 15 * 60  # Seconds between ticker refreshes (a single bulk request each)
+
+# OHLC backfill: hourly candles, fetched in 1000-candle windows
+OHLC_STEP = 3600
+BACKFILL_DAYS = 5 * 365  # How far back to go for pairs with no stored history
+BACKFILL_CONCURRENCY = 8
+WATERMARK_DB = os.path.join(os.path.dirname(__file__), "watermarks.db")
+
+# Candles built from the live trade stream (written to crypto_candles with a resolution tag)
+CANDLE_RESOLUTIONS = ("1m", "5m", "1h")
+# Trades recovered after a WebSocket outage amend live candles and snapshots up to this old
+CANDLE_AMEND_WINDOW = 3600
+SNAPSHOT_AMEND_WINDOW = 24 * 3600
+
+# Live price writes: "raw" writes every trade to crypto_data, "conflate" writes at most one
+# point per pair and CONFLATE_INTERVAL (latest price plus low/high/tick_count since the last)
+TICK_MODE = "raw"
+TICK_MODES = {}  # Per-pair overrides, e.g. {"btcusd": "conflate"}
+CONFLATE_INTERVAL = 0.25
+CONFLATE_THRESHOLD = None  # Relative move written at once, e.g. 0.001; None waits for the interval
+
+# Hourly snapshots rolled up from the live stream into a bucket kept forever
+SNAPSHOT_BUCKET = "crypto_snapshots"
+SNAPSHOT_PERIOD = 3600
+SNAPSHOT_BACKFILL_DAYS = 30  # How far back missed snapshots are rebuilt from stored candles
+
+# Portfolio valuation from a holdings file (see README), reloaded when it changes
+HOLDINGS_PATH = os.path.join(os.path.dirname(__file__), "holdings.json")
+HOLDINGS_RELOAD_INTERVAL = 10  # Seconds between checks of the holdings file
+PORTFOLIO_INTERVAL = 1.0  # Minimum seconds between portfolio valuation points
+
+# On-disk spool for writes that fail while InfluxDB is unavailable
+SPOOL_DIR = os.path.join(os.path.dirname(__file__), "spool")
+SPOOL_MAX_BYTES = 512 * 1024 * 1024
+SPOOL_REPLAY_RATE = 5  # Spooled batches replayed per second once InfluxDB is back
 
-# Initialize InfluxDB and HTTP Handlers
+# Receive pipeline: frames queued between the socket reader and handler workers
+PIPELINE_QUEUE_SIZE = 10000
+PIPELINE_WORKERS = 1  # >1 handles a pair's trades out of order
+# "block", "drop_oldest" or "conflate"; when the queue is full, "conflate" keeps only the
+# newest queued trade per pair, so candle and snapshot volumes miss the replaced trades
+PIPELINE_OVERFLOW = "block"
+PIPELINE_STATS_INTERVAL = 60
+
+# Multi-process ingest (--processes N): N parser processes feed writer processes over
+# shared-memory rings; 0 runs everything on one event loop in this process
+INGEST_PROCESSES = 0
+INGEST_WRITERS = 1  # The portfolio is only valued with a single writer
+RING_CAPACITY = 65536  # Trade records buffered per parser process
+
+# Prometheus metrics endpoint, off unless METRICS_PORT is set (e.g. METRICS_PORT=9108)
+METRICS_PORT = int(os.getenv('METRICS_PORT') or 0)
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+
+# Latest price service: live per-pair state over HTTP/JSON (e.g. PRICE_PORT=9109) and/or a
+# Unix socket (PRICE_SOCKET=/run/crypto/prices.sock), off unless one of them is set
+PRICE_PORT = int(os.getenv('PRICE_PORT') or 0)
+PRICE_HOST = os.getenv('PRICE_HOST', '127.0.0.1')
+PRICE_SOCKET = os.getenv('PRICE_SOCKET')
+
+# Initialize InfluxDB and HTTP Handlers (their clients and sessions are created on first use)
+metrics = Metrics() if METRICS_PORT else None
 influxdb_handler = InfluxDBHandler(
     websocket_url=INFLUXDB_URL,
     ohlc_url=INFLUXDB_URL,
     token=INFLUXDB_TOKEN,
     org=INFLUXDB_ORG,
+    spool_dir=SPOOL_DIR,
+    spool_max_bytes=SPOOL_MAX_BYTES,
+    replay_rate=SPOOL_REPLAY_RATE,
+    metrics=metrics,
 )
-http_handler = HTTPHandler(base_url=HTTP_BASE_URL,
-                           tracked_currency_pairs=CURRENCY_PAIRS)
+http_handler = AsyncHTTPHandler(base_url=HTTP_BASE_URL,
+                                tracked_currency_pairs=[],
+                                metrics=metrics,
+                                metadata_cache=MetadataCache(METADATA_CACHE, ttl=METADATA_TTL))
+pair_registry = PairRegistry(http_handler, config_path=PAIR_CONFIG)
+trade_decoder = TradeDecoder()
+candle_aggregator = CandleAggregator(resolutions=CANDLE_RESOLUTIONS,
+                                     on_bar=influxdb_handler.write_candle,
+                                     amend_window=CANDLE_AMEND_WINDOW)
+tick_conflator = TickConflator(on_tick=influxdb_handler.write_conflated_trade,
+                               interval=CONFLATE_INTERVAL, threshold=CONFLATE_THRESHOLD,
+                               default_mode=TICK_MODE, modes=TICK_MODES)
+snapshot_rollup = SnapshotRollup(period=SNAPSHOT_PERIOD,
+                                 on_snapshot=influxdb_handler.write_snapshot,
+                                 amend_window=SNAPSHOT_AMEND_WINDOW)
+watermarks = WatermarkStore(WATERMARK_DB)
+ohlc_backfiller = OHLCBackfiller(http_handler, influxdb_handler, watermarks,
+                                 step=OHLC_STEP,
+                                 concurrency=BACKFILL_CONCURRENCY)
+portfolio = None  # Created by load_portfolio once a holdings file exists
+latest_prices = LatestPrices()
+# Trades missed during a WebSocket outage are recovered over REST and de-duplicated
+gap_repairer = GapRepairer(http_handler,
+                           on_trade=lambda pair, data: record_trade(pair, data),
+                           metrics=metrics)
+
+INIT_DONE = time.perf_counter()
 
 # --- FUNCTIONS ---
 
-# Fetch the last recorded timestamp from InfluxDB
+# Process WebSocket trade messages and write to InfluxDB
 
 
-async def get_last_influx_timestamp(currency_pair):
+def record_trade(currency_pair, data):
     """
-    Query InfluxDB for the last recorded timestamp for a specified currency pair.
+    Write one live (or recovered) trade, fold it into the live candles and snapshots, update
+    the latest prices and revalue the portfolio.
     """
-    query = f"""
-    from(bucket: "crypto_history")
-      |> range(start: -1y)
-      |> filter(fn: (r) => r._measurement == "crypto_history" and r["currency_pair"] == "{currency_pair}")
-      |> keep(columns: ["_time"])
-      |> sort(desc: true)
-      |> limit(n: 1)
-    """
-    try:
-        result = influxdb_handler.query(query)
-        if result:
-            last_time = result[0]["_time"]
-            return int(time.mktime(last_time.timetuple()))
-        return None
-    except Exception as e:
-        print(
-            f"Error querying last InfluxDB timestamp for {currency_pair}: {e}")
-        return None
-
-# Process WebSocket trade messages and write to InfluxDB
+    price = float(data["price"])
+    trade_time = int(data["timestamp"])
+    # Conflated pairs keep every trade in memory but write at a bounded rate
+    if not tick_conflator.add(currency_pair, price, trade_time * 1_000_000_000):
+        influxdb_handler.write_data(
+            currency_pair, price, trade_time * 1_000_000_000)
+    amount = float(data["amount"])
+    candle_aggregator.add_trade(currency_pair, price, amount, trade_time)
+    snapshot_rollup.add_trade(currency_pair, price, amount, trade_time)
+    latest_prices.on_trade(currency_pair, price, trade_time)
+    if portfolio is not None:
+        portfolio.on_trade(currency_pair, price, trade_time)
 
 
 async def process_message(message):
     try:
-        message_json = json.loads(message)
-        if message_json.get("event") == "trade":
-            data = message_json.get("data", {})
-            currency_pair = message_json["channel"].split("_")[2]
-            price = float(data["price"])
-            timestamp = int(data["timestamp"]) * 1_000_000_000
-            influxdb_handler.write_data(currency_pair, price, timestamp)
+        started = time.perf_counter() if metrics else 0
+        trade = trade_decoder.decode(message)
+        if metrics:
+            metrics.frame_decoded(time.perf_counter() - started, trade and trade[0])
+        if trade:
+            currency_pair, data = trade
+            if gap_repairer.observe(currency_pair, data):
+                record_trade(currency_pair, data)
     except Exception as e:
         print(f"Failed to process WebSocket message: {e}")
 
 
+async def close_candles():
+    """
+    Emit live candles and snapshots as soon as their period ends, even if no further trade
+    arrives.
+    """
+    while True:
+        await asyncio.sleep(1)
+        now = time.time()
+        candle_aggregator.close_due(now)
+        # No flat carried-forward snapshots for pairs whose stream is down
+        snapshot_rollup.close_due(now, hold=gap_repairer.pending())
+
+
+async def flush_conflated():
+    """
+    Write the pending price of conflated pairs once their interval has passed.
+    """
+    while True:
+        await asyncio.sleep(CONFLATE_INTERVAL)
+        tick_conflator.flush_due()
+
+
 async def fetch_and_write_ticker_data():
     """
     Fetch ticker data for all configured pairs and write to InfluxDB.
     """
     print("[INFO] Fetching ticker data and metadata for configured pairs...")
-    tracked_metadata, _, unmatched_pairs = http_handler.fetch_currencies_with_logo()
+    # Base currency -> metadata, served from the metadata cache in the common case
+    metadata_map = await http_handler.fetch_currency_metadata()
 
     # Warn about unmatched pairs
+    unmatched_pairs = [
+        pair for pair in pair_registry.pairs if pair[:-3].upper() not in metadata_map]
     if unmatched_pairs:
         print(f"[WARNING] Unmatched currency pairs: {unmatched_pairs}")
 
-    # Map base currencies to their metadata
-    metadata_map = {currency["currency"].upper(
-    ): currency for currency in tracked_metadata}
-
     # Fetch ticker data
-    ticker_info = http_handler.fetch_ticker_info(CURRENCY_PAIRS)
+    # One /ticker/ request for all markets; per-pair requests only for pairs missing from it
+    ticker_info = await http_handler.fetch_ticker_info(pair_registry.pairs, bulk=True)
     if not ticker_info:
         print("[ERROR] No ticker data fetched. Exiting.")
         return  # Exit if no ticker data is retrieved
@@ -104,6 +231,7 @@ async def fetch_and_write_ticker_data():
         try:
             # Log data before writing to InfluxDB
             print(f"[DEBUG] Writing ticker data for {pair}: {data}")
+            latest_prices.on_ticker(pair, data)
 
             timestamp = int(time.time() * 1e9)  # Current time in nanoseconds
             base_currency = pair[:-3].upper()
@@ -113,54 +241,334 @@ async def fetch_and_write_ticker_data():
             print(f"[ERROR] Failed to process ticker data for {pair}: {e}")
 
 
-async def backfill_ohlc(currency_pair):
-    try:
-        start = await get_last_influx_timestamp(currency_pair)
-        if start is None:
+async def rebuild_watermarks(currency_pairs):
+    """
+    Seed a newly created watermark store from the last candles stored in InfluxDB.
+    """
+    print("[INFO] Watermark store missing, rebuilding it from InfluxDB...")
+    last_timestamps = await asyncio.to_thread(
+        influxdb_handler.last_timestamps, currency_pairs)
+    if last_timestamps is None:
+        return  # Try again on the next run rather than backfilling everything from scratch
+    for pair in currency_pairs:
+        if pair not in last_timestamps:
             print(
-                f"[INFO] No previous data found for {currency_pair}, backfilling from the start.")
-        end = int(time.time())
-        ohlc_data = http_handler.fetch_ohlc(
-            currency_pair, step=3600, limit=1000, start=start, end=end
-        )
-        for candle in ohlc_data:
-            influxdb_handler.write_ohlc_data(
-                currency_pair=currency_pair,
-                open_=float(candle["open"]),
-                high=float(candle["high"]),
-                low=float(candle["low"]),
-                close=float(candle["close"]),
-                volume=float(candle["volume"]),
-                timestamp=int(candle["timestamp"]) * 1_000_000_000,
-            )
+                f"[INFO] No previous data found for {pair}, backfilling from the start.")
+    watermarks.advance_many(OHLC_STEP, last_timestamps)
+    watermarks.created = False
+
+
+async def backfill_ohlc(currency_pairs):
+    """
+    Backfill hourly OHLC candles for the given pairs up to the last closed hour.
+    """
+    try:
+        if watermarks.created:
+            await rebuild_watermarks(currency_pairs)
+            if watermarks.created:
+                print("[ERROR] Could not rebuild watermarks from InfluxDB, skipping backfill.")
+                return
+
+        now = int(time.time())
+        end = now - now % OHLC_STEP - OHLC_STEP  # Open time of the last closed candle
+        start = now - BACKFILL_DAYS * 86400
+        written = await ohlc_backfiller.run(currency_pairs, start, end)
+        print(f"[INFO] OHLC backfill complete: {written}")
     except Exception as e:
-        print(f"[ERROR] Failed to backfill OHLC data for {currency_pair}: {e}")
+        print(f"[ERROR] Failed to backfill OHLC data: {e}")
 
 
-async def scheduled_fetch():
+async def backfill_snapshots(currency_pairs):
     """
-    Periodically fetch ticker data and backfill historical OHLC data.
+    Rebuild hourly snapshots missing from stored candles: hours while the script was down
+    and hours the live rollup skipped while the WebSocket was disconnected.
+    """
+    try:
+        now = int(time.time())
+        end = now - now % SNAPSHOT_PERIOD  # Snapshots are stamped with the end of their hour
+        start = end - SNAPSHOT_BACKFILL_DAYS * 86400
+        stored = await asyncio.to_thread(
+            influxdb_handler.point_times, currency_pairs, "crypto_snapshot", start,
+            bucket=SNAPSHOT_BUCKET, field="last")
+        if stored is None:
+            print("[ERROR] Could not read the stored snapshots, skipping snapshot backfill.")
+            return
+
+        # Candles open one period before the snapshot they stand in for
+        candles = await asyncio.to_thread(
+            influxdb_handler.query_candles, currency_pairs, start - SNAPSHOT_PERIOD,
+            end - SNAPSHOT_PERIOD + 1)
+        if candles is None:
+            print("[ERROR] Could not read candles, skipping snapshot backfill.")
+            return
+
+        written = {}
+        for pair in currency_pairs:
+            times = stored.get(pair, set())
+            missing = [candle for candle in candles.get(pair, [])
+                       if candle["timestamp"] + SNAPSHOT_PERIOD not in times]
+            for snapshot in snapshots_from_candles(pair, missing, SNAPSHOT_PERIOD):
+                influxdb_handler.write_snapshot(*snapshot)
+            if missing:
+                written[pair] = len(missing)
+        print(f"[INFO] Snapshot backfill complete: {written}")
+    except Exception as e:
+        print(f"[ERROR] Failed to backfill snapshots: {e}")
+
+
+def load_portfolio():
+    """
+    The portfolio valued from the holdings file. It is created once the file exists, so
+    numpy is only imported when there are holdings to value.
+    """
+    global portfolio
+    if portfolio is None and os.path.exists(HOLDINGS_PATH):
+        from portfolio import Portfolio
+        portfolio = Portfolio(HOLDINGS_PATH, on_valuation=influxdb_handler.write_portfolio,
+                              min_interval=PORTFOLIO_INTERVAL)
+    return portfolio
+
+
+async def load_holdings():
+    """
+    Load the holdings file if it changed and price new holdings from the latest candles.
+    """
+    if load_portfolio() is None or not portfolio.reload():
+        return
+    untracked = [pair for pair in portfolio.pairs if pair not in pair_registry.pairs]
+    if untracked:
+        print(f"[WARNING] Holdings pairs not tracked, valued from stored candles only: {untracked}")
+    unpriced = portfolio.unpriced_pairs()
+    if unpriced:
+        closes = await asyncio.to_thread(influxdb_handler.last_timestamps, unpriced,
+                                         with_value=True)
+        portfolio.set_prices({pair: close for pair, (_, close) in (closes or {}).items()})
+
+
+async def watch_holdings():
+    """
+    Apply edits to the holdings file without a restart.
+    """
+    while True:
+        await asyncio.sleep(HOLDINGS_RELOAD_INTERVAL)
+        await load_holdings()
+
+
+async def rebuild_portfolio_history(days):
+    """
+    Recompute portfolio value for the current holdings over the stored hourly candles.
+    """
+    await load_holdings()
+    if portfolio is None or not portfolio.pairs:
+        print(f"[ERROR] No holdings found in {HOLDINGS_PATH}")
+        return
+    now = int(time.time())
+    candles = await asyncio.to_thread(influxdb_handler.query_candles, portfolio.pairs,
+                                      now - days * 86400, now)
+    if candles is None:
+        print("[ERROR] Could not read candles, skipping portfolio history.")
+        return
+
+    timestamps, prices, totals, asset_values, account_values = portfolio.history(candles)
+    for row, timestamp in enumerate(timestamps):
+        assets = {
+            asset: (float(portfolio.units[i]), float(prices[row, i]), float(asset_values[row, i]))
+            for i, asset in enumerate(portfolio.assets) if prices[row, i]
+        }
+        accounts = dict(zip(portfolio.accounts, account_values[row].tolist()))
+        # Valued at the candle close, i.e. the end of the hour
+        influxdb_handler.write_portfolio(int(timestamp) + OHLC_STEP, float(totals[row]),
+                                         assets, accounts)
+    await asyncio.to_thread(influxdb_handler.flush)
+    print(f"[INFO] Portfolio history rebuilt: {len(timestamps)} points over {days} days")
+
+
+async def scheduled_ticker():
+    """
+    Periodically fetch and write ticker data.
     """
     while True:
         print("[INFO] Running scheduled ticker data fetch...")
-        await fetch_and_write_ticker_data()  # Fetch and write ticker data
+        try:
+            await fetch_and_write_ticker_data()  # Fetch and write ticker data
+        except Exception as e:
+            # A failed fetch must not take the ingest tasks gathered alongside down with it
+            print(f"[ERROR] Scheduled ticker fetch failed: {e}")
+        await asyncio.sleep(TICKER_INTERVAL)
 
+
+async def scheduled_fetch():
+    """
+    Periodically backfill historical OHLC data.
+    """
+    while True:
         print("[INFO] Running scheduled OHLC backfill...")
-        for pair in CURRENCY_PAIRS:
-            await backfill_ohlc(pair)
+        await backfill_ohlc(pair_registry.pairs)
+        await backfill_snapshots(pair_registry.pairs)
 
         print("[INFO] Scheduled fetch completed. Sleeping for 12 hours.")
         await asyncio.sleep(43200)  # 12-hour interval
 
 
-async def main(manual_backfill, fetch_ticker):
+async def report_pipeline_stats(pipeline):
+    """
+    Periodically log the receive pipeline queue depth and counters.
+    """
+    while True:
+        await asyncio.sleep(PIPELINE_STATS_INTERVAL)
+        print(f"[INFO] Pipeline stats: {pipeline.stats()}")
+        if tick_conflator.ticks_in:
+            print(f"[INFO] Conflation stats: {tick_conflator.stats()}")
+
+
+async def load_pairs():
+    """
+    Refresh the tracked pair list from the registry.
+
+    Returns:
+        tuple: (added, removed) pair lists.
+    """
+    added, removed = await pair_registry.refresh()
+    http_handler.tracked_currency_pairs = pair_registry.pairs
+    # Replayed frames are decoded without a subscription registering their pairs
+    for pair in added:
+        trade_decoder.register(pair)
+    if not pair_registry.pairs:
+        print(f"[ERROR] No currency pairs to track, check {PAIR_CONFIG}")
+    return added, removed
+
+
+async def refresh_pairs(ws_client):
+    """
+    Periodically reload the pair universe and apply changes to the running stream.
+    """
+    while True:
+        await asyncio.sleep(PAIR_REFRESH_INTERVAL)
+        added, removed = await load_pairs()
+        if removed:
+            await ws_client.remove_pairs(removed)
+            for pair in removed:
+                snapshot_rollup.discard(pair)
+                tick_conflator.discard(pair)
+                latest_prices.discard(pair)
+        if added:
+            await ws_client.add_pairs(added)
+            # Only the new pairs need history; the others are covered by the scheduled backfill
+            await backfill_ohlc(added)
+
+
+async def rebalance_shards(ws_client):
+    """
+    Periodically re-split pairs over WebSocket shards by observed trade rate.
+    """
+    ws_client.trade_rates()  # Start the observation window now
+    while True:
+        await asyncio.sleep(WS_REBALANCE_INTERVAL)
+        ws_client.rebalance()
+
+
+def writer_settings(writers):
+    """
+    Write path settings for writer processes, mirroring this module's configuration.
+    """
+    return {
+        "spool_dir": SPOOL_DIR,
+        "spool_max_bytes": SPOOL_MAX_BYTES,
+        "candle_resolutions": list(CANDLE_RESOLUTIONS),
+        "candle_amend_window": CANDLE_AMEND_WINDOW,
+        "snapshot_period": SNAPSHOT_PERIOD,
+        "snapshot_amend_window": SNAPSHOT_AMEND_WINDOW,
+        "tick_mode": TICK_MODE,
+        "tick_modes": TICK_MODES,
+        "conflate_interval": CONFLATE_INTERVAL,
+        "conflate_threshold": CONFLATE_THRESHOLD,
+        # Each writer only sees its own pairs, so a split portfolio would be undervalued
+        "holdings_path": HOLDINGS_PATH if writers == 1 else None,
+        "portfolio_interval": PORTFOLIO_INTERVAL,
+        "holdings_reload_interval": HOLDINGS_RELOAD_INTERVAL,
+    }
+
+
+async def report_supervisor_stats(supervisor):
+    """
+    Periodically log ring depths and process restarts.
+    """
+    while True:
+        await asyncio.sleep(PIPELINE_STATS_INTERVAL)
+        print(f"[INFO] Ingest process stats: {supervisor.stats()}")
+
+
+async def run_multiprocess(processes, writers):
+    """
+    Ingest with parser and writer processes while this process supervises them and runs the
+    scheduled backfills and ticker fetches, away from the ingest path.
+    """
+    from multiprocess_ingest import IngestSupervisor
+
+    if writers > 1 and os.path.exists(HOLDINGS_PATH):
+        print("[WARNING] Portfolio valuation needs a single writer process and is disabled.")
+    if PRICE_PORT or PRICE_SOCKET:
+        print("[WARNING] The latest price service only runs in single-process mode.")
+    supervisor = IngestSupervisor(WS_URL, pair_registry.pairs, parsers=processes,
+                                  writers=writers, capacity=RING_CAPACITY,
+                                  http_base_url=HTTP_BASE_URL,
+                                  writer_settings=writer_settings(writers),
+                                  metrics_port=METRICS_PORT or None, metrics_host=METRICS_HOST)
+    if metrics:
+        # Backfills and ticker fetches; each child serves its own metrics on the next ports
+        metrics.start_server(METRICS_PORT, METRICS_HOST)
+        metrics.add_gauge("ingest_ring_depth", "Records waiting in all trade rings.",
+                          lambda: sum(supervisor.stats()["ring_depths"]))
+        metrics.add_gauge("ingest_process_restarts_total", "Ingest process restarts.",
+                          lambda: sum(supervisor.restarts.values()))
+    supervisor.start()
+    try:
+        await asyncio.gather(supervisor.supervise(), scheduled_fetch(), scheduled_ticker(),
+                             report_supervisor_stats(supervisor))
+    finally:
+        supervisor.stop()
+
+
+async def replay(path, speed):
+    """
+    Re-ingest a recorded capture file through process_message.
+    """
+    print(f"[INFO] Replaying {path} at {'max' if not speed else f'{speed}x'} speed...")
+    count = await replay_capture(path, process_message, speed=speed)
+    # Replayed trades are in the past, so close the remaining candles explicitly
+    candle_aggregator.close_due(float("inf"))
+    snapshot_rollup.close_due(float("inf"))
+    tick_conflator.flush()
+    await asyncio.to_thread(influxdb_handler.flush)
+    print(f"[INFO] Replayed {count} frames from {path}")
+
+
+async def main(manual_backfill, fetch_ticker, record=None, replay_path=None, speed=1.0,
+               portfolio_history=None, processes=INGEST_PROCESSES, writers=INGEST_WRITERS):
     """
     Main function for periodic tasks or manual commands.
     """
+    if portfolio_history:
+        await load_pairs()
+        await rebuild_portfolio_history(portfolio_history)
+        return
+
+    if replay_path:
+        await load_pairs()
+        if load_portfolio():
+            portfolio.reload()
+        await replay(replay_path, speed)
+        return
+
+    await load_pairs()
+    if manual_backfill or not fetch_ticker:
+        # Every remaining mode but the ticker fetch writes snapshots
+        await asyncio.to_thread(influxdb_handler.ensure_bucket, SNAPSHOT_BUCKET)
+
     if manual_backfill:
         print("[INFO] Manual backfill mode activated...")
-        for pair in CURRENCY_PAIRS:
-            await backfill_ohlc(pair)
+        await backfill_ohlc(pair_registry.pairs)
+        await backfill_snapshots(pair_registry.pairs)
         return
 
     if fetch_ticker:
@@ -168,12 +576,86 @@ async def main(manual_backfill, fetch_ticker):
         await fetch_and_write_ticker_data()
         return
 
+    if processes:
+        # Pair changes from pairs.json are picked up on the next start in this mode
+        await run_multiprocess(processes, writers)
+        return
+
     # Default: Run WebSocket + Scheduled Fetch (OHLC + Ticker)
+    from websocket_client import WebSocketClient
+    from sharded_client import ShardedWebSocketClient
+
+    await load_holdings()
     print("[INFO] Starting WebSocket listener and scheduled tasks...")
-    ws_client = WebSocketClient(url=WS_URL, currency_pairs=CURRENCY_PAIRS)
-    websocket_task = asyncio.create_task(ws_client.listen(process_message))
-    scheduled_task = asyncio.create_task(scheduled_fetch())
-    await asyncio.gather(websocket_task, scheduled_task)
+    pipeline = MessagePipeline(maxsize=PIPELINE_QUEUE_SIZE,
+                               workers=PIPELINE_WORKERS,
+                               overflow=PIPELINE_OVERFLOW)
+    tasks = []
+    if metrics:
+        metrics.start_server(METRICS_PORT, METRICS_HOST)
+        metrics.add_gauge("ingest_pipeline_queue_depth",
+                          "Frames waiting in the receive pipeline.", pipeline.depth)
+        metrics.add_gauge("ingest_pipeline_dropped_total",
+                          "Frames dropped by the receive pipeline overflow policy.",
+                          lambda: pipeline.dropped)
+        if influxdb_handler.spool_dir:
+            metrics.add_gauge("ingest_spool_pending",
+                              "1 while failed writes are waiting in the on-disk spool.",
+                              lambda: int(influxdb_handler.spool.pending()))
+        tasks.append(asyncio.create_task(metrics.monitor_loop_lag()))
+    price_server = None
+    if PRICE_PORT or PRICE_SOCKET:
+        price_server = PriceServer(latest_prices)
+        price_server.start(PRICE_PORT or None, PRICE_HOST, unix_socket=PRICE_SOCKET)
+
+    recorder = CaptureWriter(record) if record else None
+    if recorder:
+        print(f"[INFO] Recording raw WebSocket frames to {record}")
+    if WS_SHARDS > 1:
+        ws_client = ShardedWebSocketClient(url=WS_URL, currency_pairs=pair_registry.pairs,
+                                           shards=WS_SHARDS, pipeline=pipeline,
+                                           decoder=trade_decoder, recorder=recorder,
+                                           metrics=metrics, gap_repairer=gap_repairer)
+        tasks.append(asyncio.create_task(rebalance_shards(ws_client)))
+    else:
+        ws_client = WebSocketClient(url=WS_URL, currency_pairs=pair_registry.pairs,
+                                    pipeline=pipeline, decoder=trade_decoder,
+                                    recorder=recorder, metrics=metrics,
+                                    gap_repairer=gap_repairer)
+    try:
+        websocket_task = asyncio.create_task(ws_client.listen(process_message))
+        scheduled_task = asyncio.create_task(scheduled_fetch())
+        stats_task = asyncio.create_task(report_pipeline_stats(pipeline))
+        candles_task = asyncio.create_task(close_candles())
+        tasks.append(asyncio.create_task(scheduled_ticker()))
+        tasks.append(asyncio.create_task(refresh_pairs(ws_client)))
+        tasks.append(asyncio.create_task(watch_holdings()))
+        if TICK_MODE == "conflate" or "conflate" in TICK_MODES.values():
+            tasks.append(asyncio.create_task(flush_conflated()))
+        await asyncio.gather(websocket_task, scheduled_task, stats_task, candles_task, *tasks)
+    finally:
+        if recorder:
+            recorder.close()
+        if price_server:
+            price_server.stop()
+
+
+def startup_profile(finished=False):
+    """
+    Print how long imports and module initialization took and, once finished, the time spent
+    creating clients on first use and the total run time.
+    """
+    def ms(seconds):
+        return f"{seconds * 1000:.1f} ms"
+
+    if not finished:
+        print(f"[INFO] Startup profile: imports {ms(IMPORTS_DONE - STARTUP_BEGAN)}, "
+              f"initialization {ms(INIT_DONE - IMPORTS_DONE)}, "
+              f"ready after {ms(time.perf_counter() - STARTUP_BEGAN)}")
+        return
+    print(f"[INFO] Startup profile: InfluxDB clients {ms(influxdb_handler.client_init_seconds)}, "
+          f"Bitstamp HTTP session {ms(http_handler.session_init_seconds)} (created on first use), "
+          f"total run time {ms(time.perf_counter() - STARTUP_BEGAN)}")
 
 # --- ENTRY POINT ---
 
@@ -183,6 +665,37 @@ if __name__ == "__main__":
                         help="Trigger manual OHLC data backfill.")
     parser.add_argument("--fetch-ticker", action="store_true",
                         help="Manually fetch ticker data.")
+    parser.add_argument("--record", metavar="FILE",
+                        help="Append raw WebSocket frames to a gzip capture file while running.")
+    parser.add_argument("--replay", metavar="FILE",
+                        help="Re-ingest a capture file through the message pipeline and exit.")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="Replay speed multiplier; 0 replays as fast as possible.")
+    parser.add_argument("--portfolio-history", type=int, metavar="DAYS",
+                        help="Recompute portfolio value over the last DAYS of hourly candles and exit.")
+    parser.add_argument("--processes", type=int, default=INGEST_PROCESSES,
+                        help="Ingest with this many WebSocket parser processes (0: single process).")
+    parser.add_argument("--writers", type=int, default=INGEST_WRITERS,
+                        help="Writer processes draining the parsers when --processes is set.")
+    parser.add_argument("--startup-profile", action="store_true",
+                        help="Report import, initialization and client setup time.")
     args = parser.parse_args()
-    asyncio.run(main(manual_backfill=args.manual_backfill,
-                fetch_ticker=args.fetch_ticker))
+    if args.startup_profile:
+        startup_profile()
+    try:
+        asyncio.run(main(manual_backfill=args.manual_backfill,
+                    fetch_ticker=args.fetch_ticker,
+                    record=args.record,
+                    replay_path=args.replay,
+                    speed=args.speed,
+                    portfolio_history=args.portfolio_history,
+                    processes=args.processes,
+                    writers=args.writers))
+    finally:
+        # Send any live trades still buffered in the conflator and the batch writer
+        tick_conflator.flush()
+        influxdb_handler.close()
+        http_handler.close()
+        watermarks.close()
+        if args.startup_profile:
+            startup_profile(finished=True)
@@ -0,0 +1,66 @@
+import json
+
+try:
+    # orjson parses Bitstamp frames several times faster than the standard library
+    import orjson
+    loads = orjson.loads
+except ImportError:
+    loads = json.loads
+
+# Only trade events contain this token; channel names use "live_trades_" without quotes
+TRADE_MARKER = '"trade"'
+TRADE_MARKER_BYTES = b'"trade"'
+
+
+class TradeDecoder:
+    def __init__(self, currency_pairs=()):
+        """
+        Decode Bitstamp live trade frames, skipping everything that is not a trade.
+
+        Args:
+            currency_pairs (list): Pairs to register up front. WebSocketClient registers
+                each pair again when it subscribes.
+        """
+        self.channel_pairs = {}
+        self.skipped = 0
+        self.trade_counts = {}  # pair -> trades decoded, used to balance connection shards
+        for pair in currency_pairs:
+            self.register(pair)
+
+    def register(self, currency_pair):
+        """
+        Map the live trades channel of a pair to the pair symbol.
+        """
+        self.channel_pairs[f"live_trades_{currency_pair}"] = currency_pair
+
+    def unregister(self, currency_pair):
+        self.channel_pairs.pop(f"live_trades_{currency_pair}", None)
+
+    def decode(self, frame):
+        """
+        Decode a raw frame.
+
+        Args:
+            frame (str or bytes): Raw WebSocket message.
+
+        Returns:
+            tuple: (currency_pair, data) for trade events, otherwise None.
+        """
+        # Heartbeats, subscription acks and reconnect requests are dropped without parsing
+        if (TRADE_MARKER if isinstance(frame, str) else TRADE_MARKER_BYTES) not in frame:
+            self.skipped += 1
+            return None
+
+        message = loads(frame)
+        if message.get("event") != "trade":
+            self.skipped += 1
+            return None
+
+        channel = message["channel"]
+        currency_pair = self.channel_pairs.get(channel)
+        if currency_pair is None:
+            # Channel we never subscribed to (e.g., replayed data); remember it for next time
+            currency_pair = channel.rsplit("_", 1)[-1]
+            self.channel_pairs[channel] = currency_pair
+        self.trade_counts[currency_pair] = self.trade_counts.get(currency_pair, 0) + 1
+        return currency_pair, message["data"]
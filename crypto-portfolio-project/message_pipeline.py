@@ -0,0 +1,146 @@
+import asyncio
+
+OVERFLOW_POLICIES = ("block", "drop_oldest", "conflate")
+
+
+def channel_of(frame):
+    """
+    Cheaply pull the channel name (e.g., "live_trades_btcusd") out of a raw frame without parsing JSON.
+
+    Returns:
+        str: The channel name, or None if the frame has no channel.
+    """
+    start = frame.find('"channel"')
+    if start < 0:
+        return None
+    start = frame.find('"', start + 9)
+    end = frame.find('"', start + 1)
+    if start < 0 or end < 0:
+        return None
+    return frame[start + 1:end]
+
+
+class MessagePipeline:
+    def __init__(self, maxsize=10000, workers=1, overflow="block"):
+        """
+        Bounded queue between the WebSocket reader and a pool of message handler tasks.
+
+        Args:
+            maxsize (int): Maximum number of frames waiting to be handled.
+            workers (int): Number of consumer tasks draining the queue. With more than one
+                worker, frames of the same pair may be handled out of order.
+            overflow (str): What the reader does when the queue is full:
+                "block" waits for space, "drop_oldest" discards the oldest queued frame,
+                "conflate" replaces a channel's trade frame that is still queued from an
+                earlier overflow with the newer one (and otherwise waits for space). Only
+                the latest price is kept exact: replaced trades never reach the handler, so
+                candle and snapshot volume and trade counts are short by them, and a
+                replaced extreme price can be missing from a bar's high or low.
+        """
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(
+                f"Unknown overflow policy {overflow!r}, expected one of {OVERFLOW_POLICIES}")
+        self.maxsize = maxsize
+        self.workers = workers
+        self.overflow = overflow
+
+        self.received = 0
+        self.dropped = 0
+        self.conflated = 0
+        self.processed = 0
+        self.handler_errors = 0
+
+        self._queue = asyncio.Queue(maxsize=maxsize)
+        self._latest = {}  # channel -> queued [channel, frame] slot open for replacement (conflate mode)
+        self._tasks = []
+
+    def depth(self):
+        """
+        Number of frames currently waiting in the queue.
+        """
+        return self._queue.qsize()
+
+    def stats(self):
+        """
+        Snapshot of the queue depth and counters.
+        """
+        return {
+            "depth": self.depth(),
+            "received": self.received,
+            "dropped": self.dropped,
+            "conflated": self.conflated,
+            "processed": self.processed,
+            "handler_errors": self.handler_errors,
+        }
+
+    def start(self, message_handler):
+        """
+        Start the consumer tasks. Calling start again while running is a no-op.
+        """
+        if self._tasks:
+            return
+        self._tasks = [
+            asyncio.create_task(self._worker(message_handler))
+            for _ in range(self.workers)
+        ]
+
+    async def stop(self, drain=True):
+        """
+        Stop the consumer tasks, optionally after the queue has been drained.
+        """
+        if drain:
+            await self._queue.join()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def put(self, frame):
+        """
+        Hand a raw frame to the pipeline according to the overflow policy.
+        """
+        self.received += 1
+
+        if self.overflow == "conflate" and self._queue.full() and '"trade"' in frame:
+            channel = channel_of(frame)
+            if channel is not None:
+                slot = self._latest.get(channel)
+                if slot is not None:
+                    # A trade for this channel is still queued from this overflow; replace it
+                    slot[1] = frame
+                    self.conflated += 1
+                    return
+                frame = self._latest[channel] = [channel, frame]
+        elif self.overflow == "conflate" and self._latest and '"trade"' in frame:
+            # Queued behind an open slot of its channel: close the slot so that a later
+            # replacement cannot put a newer trade ahead of this one
+            self._latest.pop(channel_of(frame), None)
+
+        if self.overflow == "drop_oldest" and self._queue.full():
+            try:
+                self._queue.get_nowait()
+                self._queue.task_done()
+                self.dropped += 1
+            except asyncio.QueueEmpty:
+                pass
+            self._queue.put_nowait(frame)
+            return
+
+        await self._queue.put(frame)
+
+    async def _worker(self, message_handler):
+        while True:
+            item = await self._queue.get()
+            try:
+                if isinstance(item, list):
+                    channel, frame = item
+                    if self._latest.get(channel) is item:
+                        del self._latest[channel]
+                    item = frame
+                await message_handler(item)
+                self.processed += 1
+            except Exception as e:
+                self.handler_errors += 1
+                print(f"[ERROR] Message handler failed: {e}")
+            finally:
+                self._queue.task_done()
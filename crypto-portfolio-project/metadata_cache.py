@@ -0,0 +1,117 @@
+import json
+import os
+import threading
+import time
+
+
+class MetadataCache:
+    def __init__(self, path=None, ttl=86400):
+        """
+        Cache for slow-changing API responses (e.g., /currencies/), kept in memory and on disk.
+
+        Entries younger than `ttl` are served without a request. Older entries are revalidated
+        with If-None-Match / If-Modified-Since when the server sent an ETag or Last-Modified,
+        so an unchanged response costs a 304 instead of a full download.
+
+        Args:
+            path (str): JSON file the cache is persisted to, so a restart starts warm.
+                The cache is memory-only when not set.
+            ttl (float): Seconds an entry is served without contacting the server.
+        """
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = {}  # url -> {"fetched_at", "etag", "last_modified", "data"}
+        self._indexes = {}  # (url, key) -> {KEY VALUE: item}
+        if path and os.path.exists(path):
+            try:
+                with open(path) as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"[WARNING] Ignoring unreadable metadata cache {path}: {e}")
+
+    def fresh(self, url):
+        """
+        Cached data for a URL if it is within the TTL, otherwise None.
+        """
+        entry = self._entries.get(url)
+        if entry and time.time() - entry["fetched_at"] < self.ttl:
+            return entry["data"]
+        return None
+
+    def stale(self, url):
+        """
+        Cached data for a URL regardless of age (e.g., to ride out an API outage), or None.
+        """
+        entry = self._entries.get(url)
+        return entry["data"] if entry else None
+
+    def validators(self, url):
+        """
+        Conditional request headers for revalidating a cached URL.
+
+        Returns:
+            dict: If-None-Match / If-Modified-Since headers, possibly empty.
+        """
+        entry = self._entries.get(url)
+        headers = {}
+        if entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def store(self, url, data, headers=None):
+        """
+        Cache a full response body along with its validators.
+        """
+        headers = headers or {}
+        with self._lock:
+            self._entries[url] = {
+                "fetched_at": time.time(),
+                "etag": headers.get("ETag"),
+                "last_modified": headers.get("Last-Modified"),
+                "data": data,
+            }
+            self._indexes = {key: index for key, index in self._indexes.items() if key[0] != url}
+            self._save()
+
+    def revalidated(self, url):
+        """
+        Mark a cached URL as fresh again after a 304 Not Modified.
+
+        Returns:
+            The cached data, or None if the URL was not cached.
+        """
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is None:
+                return None
+            entry["fetched_at"] = time.time()
+            self._save()
+            return entry["data"]
+
+    def index(self, url, key):
+        """
+        Cached list response for a URL indexed by one field, e.g. {"BTC": {...}} for key
+        "currency". Built once per stored response.
+        """
+        index = self._indexes.get((url, key))
+        if index is None:
+            data = self.stale(url) or []
+            index = {str(item[key]).upper(): item for item in data if key in item}
+            self._indexes[(url, key)] = index
+        return index
+
+    def _save(self):
+        if not self.path:
+            return
+        # Write to a temporary file first so a crash never leaves a truncated cache behind
+        temporary = f"{self.path}.tmp"
+        try:
+            with open(temporary, "w") as f:
+                json.dump(self._entries, f)
+            os.replace(temporary, self.path)
+        except OSError as e:
+            print(f"[WARNING] Failed to persist metadata cache {self.path}: {e}")
@@ -0,0 +1,294 @@
+import asyncio
+import threading
+import time
+from bisect import bisect_left
+
+# Bucket upper bounds in seconds
+DECODE_BUCKETS = (5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 5e-3, 0.025)
+WRITE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 10)
+LOOP_LAG_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5)
+HTTP_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _labels(name, value, extra=""):
+    if name is None:
+        return "{" + extra + "}" if extra else ""
+    escaped = str(value).replace("\\", "\\\\").replace('"', '\\"')
+    return "{" + f'{name}="{escaped}"' + ("," + extra if extra else "") + "}"
+
+
+class Counter:
+    def __init__(self, name, help, label=None):
+        """
+        Monotonic counter, optionally split by one label (e.g., currency_pair).
+        """
+        self.name = name
+        self.help = help
+        self.label = label
+        self._values = {} if label else {None: 0}
+        self._lock = threading.Lock()
+
+    def inc(self, label_value=None, amount=1):
+        with self._lock:
+            self._values[label_value] = self._values.get(label_value, 0) + amount
+
+    def value(self, label_value=None):
+        return self._values.get(label_value, 0)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = sorted(self._values.items(), key=lambda item: str(item[0]))
+        for label_value, value in values:
+            lines.append(f"{self.name}{_labels(self.label, label_value)} {_format_value(value)}")
+        return lines
+
+
+class _HistogramSeries:
+    __slots__ = ("bounds", "counts", "sum", "_lock")
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # Last slot is the +Inf bucket
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        # Find the bucket up front so the update itself is two in-place additions
+        index = bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def snapshot(self):
+        with self._lock:
+            return list(self.counts), self.sum
+
+
+class Histogram:
+    def __init__(self, name, help, buckets, label=None):
+        """
+        Histogram with fixed, pre-allocated buckets, optionally split by one label.
+
+        Args:
+            name (str): Metric name, e.g., "ingest_decode_seconds".
+            help (str): Description shown in the exposition.
+            buckets (tuple): Sorted bucket upper bounds.
+            label (str): Label name for per-series histograms (e.g., "bucket"), or None.
+        """
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.label = label
+        self._series = {}
+
+    def labels(self, label_value):
+        """
+        Series for one label value. Hold on to it in hot paths to skip the lookup.
+        """
+        series = self._series.get(label_value)
+        if series is None:
+            series = self._series.setdefault(label_value, _HistogramSeries(self.buckets))
+        return series
+
+    def observe(self, value, label_value=None):
+        self.labels(label_value).observe(value)
+
+    def count(self, label_value=None):
+        series = self._series.get(label_value)
+        return sum(series.snapshot()[0]) if series else 0
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for label_value, series in sorted(self._series.items(), key=lambda item: str(item[0])):
+            counts, total = series.snapshot()
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(
+                    f"{self.name}_bucket{_labels(self.label, label_value, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label, label_value)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_labels(self.label, label_value)} {cumulative}")
+        return lines
+
+
+class TimedWriteApi:
+    def __init__(self, write_api, histogram):
+        """
+        Wrap an influxdb_client WriteApi and record how long each write takes, per bucket.
+        """
+        self.write_api = write_api
+        self.histogram = histogram
+
+    def write(self, bucket, record, **kwargs):
+        started = time.perf_counter()
+        try:
+            return self.write_api.write(bucket=bucket, record=record, **kwargs)
+        finally:
+            self.histogram.observe(time.perf_counter() - started, bucket)
+
+    def __getattr__(self, name):
+        return getattr(self.write_api, name)
+
+
+class Metrics:
+    def __init__(self):
+        """
+        Ingest metrics exposed in the Prometheus text format.
+
+        Counters and histograms are created once up front; recording an event only bumps
+        pre-allocated counts, so instrumentation can stay on under full load.
+        """
+        self.frames_received = Counter(
+            "ingest_frames_received_total", "Raw WebSocket frames received.")
+        self.messages_received = Counter(
+            "ingest_messages_received_total", "Trade messages received per pair.",
+            label="currency_pair")
+        self.trades_written = Counter(
+            "ingest_trades_written_total", "Trades written to InfluxDB per pair.",
+            label="currency_pair")
+        self.trades_repaired = Counter(
+            "ingest_trades_repaired_total", "Trades recovered over REST after a reconnect.",
+            label="currency_pair")
+        self.spool_rejected = Counter(
+            "ingest_spool_rejected_batches_total",
+            "Spooled batches InfluxDB rejected for good and that were dropped.", label="bucket")
+        self.reconnects = Counter(
+            "ingest_websocket_reconnects_total", "WebSocket reconnects.")
+        self.decode_latency = Histogram(
+            "ingest_decode_seconds", "Time to decode a WebSocket frame.", DECODE_BUCKETS)
+        self.write_latency = Histogram(
+            "ingest_write_seconds", "InfluxDB write request latency.", WRITE_BUCKETS,
+            label="bucket")
+        self.loop_lag = Histogram(
+            "ingest_event_loop_lag_seconds", "Event loop scheduling delay.", LOOP_LAG_BUCKETS)
+        self.http_latency = Histogram(
+            "ingest_http_request_seconds", "Bitstamp HTTP API request latency.", HTTP_BUCKETS,
+            label="endpoint")
+
+        self.last_trade = {}  # pair -> monotonic time of the last trade message
+        self.gauges = {}  # name -> (help, callable returning the current value)
+        self._decode_series = self.decode_latency.labels(None)
+        self._server = None
+
+    # --- Recording helpers used on hot paths ---
+
+    def frame_decoded(self, decode_seconds, currency_pair=None):
+        """
+        Record one decoded frame, and the trade it carried for currency_pair if any.
+        """
+        self._decode_series.observe(decode_seconds)
+        if currency_pair is not None:
+            self.messages_received.inc(currency_pair)
+            self.last_trade[currency_pair] = time.monotonic()
+
+    def batch_written(self, bucket, batch, prefix="crypto_data,currency_pair="):
+        """
+        Count the trades of a successfully written batch per pair (called on the writer thread).
+        A conflated line counts as the trades in its tick_count field.
+        """
+        if bucket != "crypto_portfolio":
+            return
+        start = len(prefix)
+        counts = {}
+        for line in batch:
+            if isinstance(line, str) and line.startswith(prefix):
+                end = line.find(" ", start)
+                pair = line[start:end]
+                ticks = line.find("tick_count=", end)
+                trades = int(line[ticks + 11:line.index("i", ticks + 11)]) if ticks >= 0 else 1
+                counts[pair] = counts.get(pair, 0) + trades
+        for pair, count in counts.items():
+            self.trades_written.inc(pair, count)
+
+    def add_gauge(self, name, help, read):
+        """
+        Expose a value read at scrape time, e.g., the pipeline queue depth.
+        """
+        self.gauges[name] = (help, read)
+
+    async def monitor_loop_lag(self, interval=0.5):
+        """
+        Measure how late the event loop wakes up a sleeping task, forever.
+        """
+        loop = asyncio.get_running_loop()
+        series = self.loop_lag.labels(None)
+        while True:
+            expected = loop.time() + interval
+            await asyncio.sleep(interval)
+            series.observe(max(0.0, loop.time() - expected))
+
+    # --- Exposition ---
+
+    def render(self):
+        """
+        Current metrics in the Prometheus text exposition format.
+        """
+        lines = []
+        for metric in (self.frames_received, self.messages_received, self.trades_written,
+                       self.trades_repaired, self.reconnects, self.decode_latency, self.write_latency,
+                       self.loop_lag, self.http_latency):
+            lines.extend(metric.render())
+
+        now = time.monotonic()
+        name = "ingest_seconds_since_last_trade"
+        lines.append(f"# HELP {name} Seconds since the last trade message per pair.")
+        lines.append(f"# TYPE {name} gauge")
+        for pair, last in sorted(self.last_trade.items()):
+            lines.append(f"{name}{_labels('currency_pair', pair)} {now - last:.3f}")
+
+        for name, (help, read) in sorted(self.gauges.items()):
+            try:
+                value = read()
+            except Exception as e:
+                print(f"[ERROR] Failed to read gauge {name}: {e}")
+                continue
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def start_server(self, port, host="127.0.0.1"):
+        """
+        Serve GET /metrics on a background thread.
+        """
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                body = metrics.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="metrics-server",
+                         daemon=True).start()
+        print(f"[INFO] Metrics available at http://{host}:{self._server.server_port}/metrics")
+        return self._server.server_port
+
+    def stop_server(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
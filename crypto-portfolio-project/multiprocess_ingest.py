@@ -0,0 +1,443 @@
+"""
+Multi-process ingest: parser processes feed writer processes over shared-memory rings.
+
+Each parser process owns a share of the pairs, reads their WebSocket stream, decodes trades
+(and repairs gaps after reconnects) and pushes fixed-width records into its own TradeRing.
+Writer processes pop records from their rings and run the usual write path: live prices,
+candles, snapshots and the portfolio. Parsers also push control records when a pair's stream
+goes down or comes back, so writers hold that pair's snapshots like the single-process path
+does, and a parser whose ring is full stops reading its socket (without blocking its event
+loop) until the writer catches up. IngestSupervisor, running in the main process, creates
+the rings, starts the children as separate interpreters and restarts any that exit.
+
+Children ignore SIGINT, so a Ctrl+C in the terminal (sent to the whole process group) only
+reaches the supervisor, which then stops parsers before writers and lets writers drain their
+rings. With metrics enabled, every child serves its own Prometheus endpoint on the ports
+after the supervisor's: writers first, then parsers.
+
+Children are started as:
+    python multiprocess_ingest.py parser '<json config>'
+    python multiprocess_ingest.py writer '<json config>'
+"""
+import asyncio
+import collections
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+from sharded_client import balance_pairs
+from trade_ring import FLAG_DISCONNECTED, FLAG_RECONNECTED, TradeRing
+
+
+class IngestSupervisor:
+    def __init__(self, url, currency_pairs, parsers=2, writers=1, capacity=65536,
+                 http_base_url=None, writer_settings=None, restart_delay=1.0, restart_max=30.0,
+                 output=None, metrics_port=None, metrics_host="127.0.0.1"):
+        """
+        Start and supervise the parser and writer processes.
+
+        Every parser gets its own ring (rings are single-producer, single-consumer); ring i is
+        drained by writer i % writers. Pairs are split over parsers by balance_pairs.
+
+        Args:
+            url (str): WebSocket server URL.
+            currency_pairs (list): Pairs to ingest; their order defines the pair ids in records.
+            parsers (int): Number of WebSocket reader/parser processes.
+            writers (int): Number of writer processes.
+            capacity (int): Records per ring (a power of two).
+            http_base_url (str): Bitstamp REST URL used by parsers for gap repair (None skips it).
+            writer_settings (dict): Write path settings passed to every writer (see run_writer).
+            restart_delay (float): Delay before restarting a process that exited; doubles for
+                processes that keep failing within a minute of starting.
+            restart_max (float): Upper bound of the restart delay.
+            output: Where the children's stdout and stderr go (subprocess.Popen semantics);
+                inherited from this process by default.
+            metrics_port (int): Port of the supervisor's metrics endpoint; writer i serves its
+                metrics on metrics_port + 1 + i and parser i on metrics_port + 1 + writers + i.
+                None turns metrics off in the children.
+            metrics_host (str): Bind address of the children's metrics endpoints.
+        """
+        self.url = url
+        self.currency_pairs = list(currency_pairs)
+        self.parsers = max(1, min(parsers, len(self.currency_pairs)))
+        self.writers = max(1, min(writers, self.parsers))
+        self.capacity = capacity
+        self.http_base_url = http_base_url
+        self.writer_settings = dict(writer_settings or {})
+        self.restart_delay = restart_delay
+        self.restart_max = restart_max
+        self.output = output
+        self.metrics_port = metrics_port
+        self.metrics_host = metrics_host
+
+        self.rings = []
+        self.restarts = {}
+        self._children = {}  # name -> {"command", "process", "started_at", "delay", "next_start"}
+
+    def _command(self, role, config, offset):
+        if self.metrics_port:
+            config = dict(config, metrics_port=self.metrics_port + 1 + offset,
+                          metrics_host=self.metrics_host)
+        return [sys.executable, os.path.abspath(__file__), role, json.dumps(config)]
+
+    def start(self):
+        """
+        Create the rings and start every process.
+        """
+        self.rings = [TradeRing.create(self.capacity) for _ in range(self.parsers)]
+        for index, pairs in enumerate(balance_pairs(self.currency_pairs, self.parsers)):
+            self._add_child(f"parser-{index}", self._command("parser", {
+                "url": self.url,
+                "pairs": pairs,
+                "pair_table": self.currency_pairs,
+                "ring": self.rings[index].name,
+                "http_base_url": self.http_base_url,
+            }, self.writers + index))
+        for index in range(self.writers):
+            rings = [ring.name for i, ring in enumerate(self.rings) if i % self.writers == index]
+            self._add_child(f"writer-{index}", self._command("writer", {
+                "index": index,
+                "rings": rings,
+                "pair_table": self.currency_pairs,
+                "settings": self.writer_settings,
+            }, index))
+        print(f"[INFO] Started {self.parsers} parser and {self.writers} writer processes "
+              f"for {len(self.currency_pairs)} pairs")
+
+    def _add_child(self, name, command):
+        self._children[name] = {"command": command, "process": None, "started_at": 0.0,
+                                "delay": self.restart_delay, "next_start": 0.0}
+        self._spawn(name)
+
+    def _spawn(self, name):
+        child = self._children[name]
+        child["process"] = subprocess.Popen(child["command"], stdout=self.output,
+                                            stderr=self.output)
+        child["started_at"] = time.monotonic()
+
+    def check(self):
+        """
+        Restart processes that exited, with a growing delay for those that keep failing.
+
+        Returns:
+            list: Names of the processes restarted by this call.
+        """
+        restarted = []
+        now = time.monotonic()
+        for name, child in self._children.items():
+            process = child["process"]
+            if process is not None and process.poll() is None:
+                continue
+            if process is not None:
+                print(f"[ERROR] Ingest process {name} exited with code {process.returncode}")
+                # A process that ran for a while gets the short delay again
+                if now - child["started_at"] > 60:
+                    child["delay"] = self.restart_delay
+                child["next_start"] = now + child["delay"]
+                child["delay"] = min(child["delay"] * 2, self.restart_max)
+                child["process"] = None
+            if now >= child["next_start"]:
+                print(f"[INFO] Restarting ingest process {name}")
+                self._spawn(name)
+                self.restarts[name] = self.restarts.get(name, 0) + 1
+                restarted.append(name)
+        return restarted
+
+    async def supervise(self, interval=0.5):
+        """
+        Check the processes every `interval` seconds until cancelled.
+        """
+        while True:
+            await asyncio.sleep(interval)
+            self.check()
+
+    def stats(self):
+        """
+        Records waiting in each ring and restarts per process, for logging.
+        """
+        return {
+            "ring_depths": [ring.depth() for ring in self.rings],
+            "restarts": dict(self.restarts),
+        }
+
+    def stop(self, timeout=10.0):
+        """
+        Stop parsers first, then let writers drain their rings and flush, then free the rings.
+        Children ignore SIGINT, so this order holds after a Ctrl+C as well.
+        """
+        for role in ("parser", "writer"):
+            processes = [child["process"] for name, child in self._children.items()
+                         if name.startswith(role) and child["process"] is not None]
+            for process in processes:
+                process.terminate()
+            for process in processes:
+                try:
+                    process.wait(timeout)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+                    process.wait()
+        self._children.clear()
+        for ring in self.rings:
+            ring.close()
+        self.rings = []
+
+
+# --- CHILD PROCESSES ---
+
+def start_metrics(config):
+    """
+    Metrics of a child process, served on the port the supervisor assigned, or None when
+    metrics are off.
+    """
+    if not config.get("metrics_port"):
+        return None
+    from metrics import Metrics
+    metrics = Metrics()
+    metrics.start_server(config["metrics_port"], config.get("metrics_host", "127.0.0.1"))
+    return metrics
+
+
+class RingFeeder:
+    def __init__(self, ring, held=()):
+        """
+        Producer side of a parser's ring that never blocks the event loop. Records that do not
+        fit wait, in order, in a local backlog until drain() moves them into the ring.
+
+        Args:
+            ring (TradeRing): The parser's ring.
+            held (iterable): Pair ids the writer may still hold from an earlier parser; the
+                first sync_holds releases those not disconnected.
+        """
+        self.ring = ring
+        self.backlog = collections.deque()
+        self.held = set(held)
+
+    def push(self, pair_id, timestamp, price, amount, trade_id=0, flags=0):
+        record = (pair_id, timestamp, price, amount, trade_id, flags)
+        if self.backlog or not self.ring.push(*record):
+            self.backlog.append(record)
+
+    def push_trade(self, pair_id, data):
+        """
+        Push one decoded trade.
+        """
+        self.push(pair_id, int(data["timestamp"]), float(data["price"]), float(data["amount"]),
+                  int(data.get("id") or 0))
+
+    async def drain(self, pause=0.0005):
+        """
+        Move the backlog into the ring, yielding to the event loop while the ring is full.
+        """
+        while self.backlog:
+            if self.ring.push(*self.backlog[0]):
+                self.backlog.popleft()
+            else:
+                await asyncio.sleep(pause)
+
+    def sync_holds(self, pair_ids):
+        """
+        Push a control record for every pair whose stream went down or came back since the
+        last call, so the writer holds snapshots the way close_candles does in one process.
+
+        Args:
+            pair_ids (iterable): Ids of the pairs whose stream is down now.
+        """
+        pair_ids = set(pair_ids)
+        for pair_id in sorted(pair_ids - self.held):
+            self.push(pair_id, 0, 0.0, 0.0, flags=FLAG_DISCONNECTED)
+        for pair_id in sorted(self.held - pair_ids):
+            self.push(pair_id, 0, 0.0, 0.0, flags=FLAG_RECONNECTED)
+        self.held = pair_ids
+
+
+async def run_parser(config):
+    """
+    Read and decode the WebSocket stream of a share of the pairs into a ring.
+    """
+    from http_handler import AsyncHTTPHandler
+    from gap_repair import GapRepairer
+    from message_decoder import TradeDecoder
+    from websocket_client import WebSocketClient
+
+    ring = TradeRing.attach(config["ring"])
+    pair_ids = {pair: index for index, pair in enumerate(config["pair_table"])}
+
+    def ids_of(pairs):
+        return [pair_ids[pair] for pair in pairs if pair in pair_ids]
+
+    feeder = RingFeeder(ring, held=ids_of(config["pairs"]))
+    decoder = TradeDecoder(config["pairs"])
+    metrics = start_metrics(config)
+    loop_lag = None
+    if metrics:
+        metrics.add_gauge("ingest_ring_depth", "Records waiting in this parser's ring.",
+                          ring.depth)
+        loop_lag = asyncio.create_task(metrics.monitor_loop_lag())
+
+    def on_trade(pair, data):
+        pair_id = pair_ids.get(pair)
+        if pair_id is not None:
+            feeder.push_trade(pair_id, data)
+
+    gap_repairer = None
+    if config.get("http_base_url"):
+        http_handler = AsyncHTTPHandler(base_url=config["http_base_url"],
+                                        tracked_currency_pairs=config["pairs"], metrics=metrics)
+        gap_repairer = GapRepairer(http_handler, on_trade=on_trade, metrics=metrics)
+
+    async def handle(message):
+        started = time.perf_counter() if metrics else 0
+        trade = decoder.decode(message)
+        if metrics:
+            metrics.frame_decoded(time.perf_counter() - started, trade and trade[0])
+        if trade and (gap_repairer is None or gap_repairer.observe(*trade)):
+            on_trade(*trade)
+        if feeder.backlog:
+            # Back-pressure: stop reading the socket until the writer catches up
+            await feeder.drain()
+
+    async def forward(interval=0.1):
+        # Recovered trades can fill the backlog between frames, and pairs go down without any
+        while True:
+            if gap_repairer:
+                feeder.sync_holds(ids_of(gap_repairer.pending()))
+            await feeder.drain()
+            await asyncio.sleep(interval)
+
+    client = WebSocketClient(url=config["url"], currency_pairs=config["pairs"], decoder=decoder,
+                             metrics=metrics, gap_repairer=gap_repairer)
+    forwarder = asyncio.create_task(forward())
+    try:
+        await client.listen(handle)
+    finally:
+        forwarder.cancel()
+        if loop_lag:
+            loop_lag.cancel()
+        ring.close()
+
+
+def run_writer(config):
+    """
+    Drain rings into InfluxDB through the live write path until SIGTERM.
+
+    The InfluxDB connection comes from the INFLUXDB_URL, INFLUXDB_TOKEN and INFLUXDB_ORG
+    environment variables (inherited from the supervisor, so the token never appears on a
+    command line). Optional settings: spool_dir, spool_max_bytes, candle_resolutions,
+    candle_amend_window, snapshot_period, snapshot_amend_window, tick_mode, tick_modes,
+    conflate_interval, conflate_threshold, holdings_path, portfolio_interval and
+    holdings_reload_interval.
+    """
+    from candle_aggregator import CandleAggregator
+    from influxdb_handler import InfluxDBHandler
+    from portfolio import Portfolio
+    from snapshot_rollup import SnapshotRollup
+    from tick_conflator import TickConflator
+
+    settings = config["settings"]
+    stopping = []
+    signal.signal(signal.SIGTERM, lambda signum, frame: stopping.append(signum))
+
+    spool_dir = settings.get("spool_dir")
+    metrics = start_metrics(config)
+    handler = InfluxDBHandler(
+        websocket_url=os.getenv("INFLUXDB_URL"),
+        ohlc_url=os.getenv("INFLUXDB_URL"),
+        token=os.getenv("INFLUXDB_TOKEN"),
+        org=os.getenv("INFLUXDB_ORG"),
+        # Spools are not shared between processes
+        spool_dir=spool_dir and os.path.join(spool_dir, f"writer-{config['index']}"),
+        spool_max_bytes=settings.get("spool_max_bytes", 512 * 1024 * 1024),
+        metrics=metrics,
+    )
+    candles = CandleAggregator(resolutions=settings.get("candle_resolutions", ("1m", "5m", "1h")),
+                               on_bar=handler.write_candle,
+                               amend_window=settings.get("candle_amend_window", 0))
+    snapshots = SnapshotRollup(period=settings.get("snapshot_period", 3600),
+                               on_snapshot=handler.write_snapshot,
+                               amend_window=settings.get("snapshot_amend_window", 0))
+    conflator = TickConflator(on_tick=handler.write_conflated_trade,
+                              interval=settings.get("conflate_interval", 0.25),
+                              threshold=settings.get("conflate_threshold"),
+                              default_mode=settings.get("tick_mode", "raw"),
+                              modes=settings.get("tick_modes"))
+    portfolio = None
+    if settings.get("holdings_path"):
+        portfolio = Portfolio(settings["holdings_path"], on_valuation=handler.write_portfolio,
+                              min_interval=settings.get("portfolio_interval", 1.0))
+
+    rings = [TradeRing.attach(name) for name in config["rings"]]
+    if metrics:
+        metrics.add_gauge("ingest_ring_depth", "Records waiting in this writer's rings.",
+                          lambda: sum(ring.depth() for ring in rings))
+        if handler.spool_dir:
+            metrics.add_gauge("ingest_spool_pending",
+                              "1 while failed writes are waiting in the on-disk spool.",
+                              lambda: int(handler.spool.pending()))
+    pair_table = config["pair_table"]
+    held = set()  # Pairs whose parser reported their stream down
+    reload_interval = settings.get("holdings_reload_interval", 10)
+    next_close = next_reload = 0.0
+    try:
+        while True:
+            taken = 0
+            for ring in rings:
+                records = ring.pop()
+                if not len(records):
+                    continue
+                taken += len(records)
+                for pair_id, flags, trade_time, price, amount in zip(
+                        records["pair"].tolist(), records["flags"].tolist(),
+                        records["timestamp"].tolist(), records["price"].tolist(),
+                        records["amount"].tolist()):
+                    pair = pair_table[pair_id]
+                    if flags:
+                        if flags & FLAG_DISCONNECTED:
+                            held.add(pair)
+                        else:
+                            held.discard(pair)
+                        continue
+                    if not conflator.add(pair, price, trade_time * 1_000_000_000):
+                        handler.write_data(pair, price, trade_time * 1_000_000_000)
+                    candles.add_trade(pair, price, amount, trade_time)
+                    snapshots.add_trade(pair, price, amount, trade_time)
+                    if portfolio:
+                        portfolio.on_trade(pair, price, trade_time)
+
+            now = time.time()
+            if now >= next_close:
+                candles.close_due(now)
+                # No flat carried-forward snapshots for pairs whose stream is down
+                snapshots.close_due(now, hold=held)
+                conflator.flush_due()
+                next_close = now + min(1.0, conflator.interval)
+            if portfolio and now >= next_reload:
+                next_reload = now + reload_interval
+                if portfolio.reload() and portfolio.unpriced_pairs():
+                    closes = handler.last_timestamps(portfolio.unpriced_pairs(),
+                                                     with_value=True)
+                    portfolio.set_prices({pair: close for pair, (_, close) in (closes or {}).items()})
+
+            if not taken:
+                # Parsers are stopped before writers, so an empty ring means fully drained
+                if stopping:
+                    break
+                time.sleep(0.001)
+    finally:
+        conflator.flush()
+        handler.close()
+        for ring in rings:
+            ring.close()
+
+
+if __name__ == "__main__":
+    role, child_config = sys.argv[1], json.loads(sys.argv[2])
+    # Only the supervisor reacts to Ctrl+C; it stops the children in order with SIGTERM
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if role == "parser":
+        asyncio.run(run_parser(child_config))
+    elif role == "writer":
+        run_writer(child_config)
+    else:
+        raise SystemExit(f"Unknown ingest process role {role!r}")
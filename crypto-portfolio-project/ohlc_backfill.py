@@ -0,0 +1,119 @@
+import asyncio
+
+
+class OHLCBackfiller:
+    def __init__(self, http_handler, influxdb_handler, watermarks, step=3600, limit=1000,
+                 concurrency=8, chunk_size=5000):
+        """
+        Paginated, concurrent OHLC backfill from Bitstamp into InfluxDB.
+
+        The requested range is split into windows of `limit` candles. Windows for all pairs are
+        fetched concurrently (the http_handler's rate governor keeps us within Bitstamp's limits)
+        and written in bulk. Progress is recorded per pair in the watermark store so a crashed run
+        resumes after the last window that was written.
+
+        Args:
+            http_handler (AsyncHTTPHandler): Client used to fetch OHLC windows.
+            influxdb_handler (InfluxDBHandler): Handler used for bulk candle writes.
+            watermarks (WatermarkStore): Last written candle time per pair and resolution.
+            step (int): Candle size in seconds (e.g., 3600 for 1-hour candles).
+            limit (int): Candles per request (Bitstamp allows up to 1000).
+            concurrency (int): Maximum number of windows in flight at once.
+            chunk_size (int): Maximum candles sent in one write request.
+        """
+        self.http_handler = http_handler
+        self.influxdb_handler = influxdb_handler
+        self.step = step
+        self.limit = limit
+        self.concurrency = concurrency
+        self.chunk_size = chunk_size
+        self.watermarks = watermarks
+
+    def last_completed(self, currency_pair):
+        """
+        Open time (Unix seconds) of the last candle written for a pair, or None.
+        """
+        return self.watermarks.get(currency_pair, self.step)
+
+    def windows(self, start, end):
+        """
+        Split [start, end] into windows of at most `limit` candles, aligned to the step.
+
+        Returns:
+            list: (window_start, window_end) tuples of candle open times, both inclusive.
+        """
+        start -= start % self.step
+        end -= end % self.step
+        span = self.step * self.limit
+        return [(window_start, min(window_start + span - self.step, end))
+                for window_start in range(start, end + 1, span)]
+
+    async def run(self, currency_pairs, start, end, start_overrides=None):
+        """
+        Backfill every pair from its resume point up to `end`.
+
+        Args:
+            currency_pairs (list): Pairs to backfill.
+            start (int): Default start timestamp (Unix seconds) for pairs without progress.
+            end (int): End timestamp (Unix seconds).
+            start_overrides (dict): Optional {pair: start} taking precedence over `start`.
+
+        Returns:
+            dict: {pair: number of candles written}.
+        """
+        start_overrides = start_overrides or {}
+        semaphore = asyncio.Semaphore(self.concurrency)
+        written = {pair: 0 for pair in currency_pairs}
+        tasks = []
+
+        for pair in currency_pairs:
+            pair_start = start_overrides.get(pair) or start
+            last_completed = self.last_completed(pair)
+            if last_completed is not None:
+                pair_start = max(pair_start, last_completed + self.step)
+            if pair_start > end:
+                continue
+
+            windows = self.windows(pair_start, end)
+            print(f"[INFO] Backfilling {pair}: {len(windows)} window(s) from {pair_start} to {end}")
+            progress = {"windows": windows, "done": set(), "next": 0}
+            for window in windows:
+                tasks.append(self._backfill_window(
+                    pair, window, semaphore, progress, written))
+
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        failures = [r for r in results if isinstance(r, Exception)]
+        if failures:
+            print(f"[ERROR] {len(failures)} backfill window(s) failed, first error: {failures[0]}")
+        return written
+
+    async def _backfill_window(self, pair, window, semaphore, progress, written):
+        window_start, window_end = window
+        async with semaphore:
+            count = (window_end - window_start) // self.step + 1
+            # Bitstamp uses `end` over `start` when both are sent, so page backwards from the end
+            candles = await self.http_handler.fetch_ohlc(
+                pair, step=self.step, limit=count, end=window_end)
+
+        candles = [c for c in candles
+                   if window_start <= int(c["timestamp"]) <= window_end]
+        for i in range(0, len(candles), self.chunk_size):
+            chunk = candles[i:i + self.chunk_size]
+            if not await asyncio.to_thread(self.influxdb_handler.write_ohlc_batch, pair, chunk):
+                raise Exception(f"Failed to write {pair} window {window_start}-{window_end}")
+            written[pair] += len(chunk)
+
+        self._complete_window(pair, window, progress)
+
+    def _complete_window(self, pair, window, progress):
+        """
+        Advance the pair's watermark over every contiguous completed window.
+        """
+        progress["done"].add(window)
+        windows = progress["windows"]
+        advanced = False
+        while progress["next"] < len(windows) and windows[progress["next"]] in progress["done"]:
+            progress["next"] += 1
+            advanced = True
+        if advanced:
+            self.watermarks.advance(pair, self.step, windows[progress["next"] - 1][1])
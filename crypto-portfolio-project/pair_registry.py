@@ -0,0 +1,101 @@
+import json
+import os
+
+# The shared pairs config; every script that needs the tracked pairs reads them from here
+PAIR_CONFIG = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pairs.json")
+
+
+class PairRegistry:
+    def __init__(self, http_handler, default_pairs=(), config_path=PAIR_CONFIG):
+        """
+        The set of currency pairs to track, loaded from a config file and Bitstamp's
+        trading-pairs info and refreshed periodically.
+
+        Without a config file every enabled pair in Bitstamp's trading-pairs info is tracked.
+        The config file is a JSON object that is re-read on every refresh, so edits apply
+        without a restart:
+
+            {
+                "pairs": ["btcusd", "ethusd"],       # explicit list (skips the endpoint), or
+                "quote_currencies": ["usd", "eur"],  # every enabled pair quoted in these
+                "min_volume": 100000,                # 24h volume in quote currency
+                "include": ["xdcusd"],               # always tracked
+                "exclude": ["usdcusd"]               # never tracked
+            }
+
+        Args:
+            http_handler (AsyncHTTPHandler): Client used for /trading-pairs-info/ and /ticker/.
+            default_pairs (list): Pairs tracked until the first successful refresh.
+            config_path (str): Location of the JSON config file.
+        """
+        self.http_handler = http_handler
+        self.default_pairs = list(default_pairs)
+        self.config_path = config_path
+        self.pairs = list(default_pairs)
+
+    def load_config(self):
+        """
+        Read the config file.
+
+        Returns:
+            dict: The parsed config, or None if there is no config file.
+        """
+        if not self.config_path or not os.path.exists(self.config_path):
+            return None
+        with open(self.config_path) as f:
+            return json.load(f)
+
+    async def resolve(self, config):
+        """
+        Compute the pair list described by a config (None: every enabled pair).
+        """
+        config = config or {}
+        if "pairs" in config:
+            pairs = [pair.lower() for pair in config["pairs"]]
+        else:
+            pairs_info = await self.http_handler.fetch_trading_pairs()
+            quotes = [quote.lower() for quote in config.get("quote_currencies", [])]
+            pairs = [
+                info["url_symbol"] for info in pairs_info
+                if info.get("trading") == "Enabled"
+                and (not quotes or info["name"].split("/")[-1].lower() in quotes)
+            ]
+            min_volume = config.get("min_volume")
+            if min_volume:
+                tickers = await self.http_handler.fetch_ticker_info(pairs, bulk=True)
+                pairs = [
+                    pair for pair in pairs
+                    if pair in tickers
+                    and float(tickers[pair]["volume"]) * float(tickers[pair]["last"]) >= min_volume
+                ]
+
+        exclude = {pair.lower() for pair in config.get("exclude", [])}
+        resolved = [pair for pair in pairs if pair not in exclude]
+        for pair in config.get("include", []):
+            if pair.lower() not in resolved:
+                resolved.append(pair.lower())
+        return resolved
+
+    async def refresh(self):
+        """
+        Reload the config and the pair list. On any error the current pairs are kept.
+
+        Returns:
+            tuple: (added, removed) pair lists relative to the previous refresh.
+        """
+        try:
+            pairs = await self.resolve(self.load_config())
+        except Exception as e:
+            print(f"[ERROR] Failed to refresh currency pairs, keeping the current list: {e}")
+            return [], []
+        if not pairs:
+            print("[WARNING] Currency pair refresh returned no pairs, keeping the current list")
+            return [], []
+
+        current = set(self.pairs)
+        added = [pair for pair in pairs if pair not in current]
+        removed = [pair for pair in self.pairs if pair not in set(pairs)]
+        self.pairs = pairs
+        if added or removed:
+            print(f"[INFO] Currency pairs updated: +{added} -{removed} ({len(pairs)} tracked)")
+        return added, removed
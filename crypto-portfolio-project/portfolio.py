@@ -0,0 +1,235 @@
+import json
+import os
+import numpy as np
+
+
+class Portfolio:
+    def __init__(self, holdings_path, quote="usd", on_valuation=None, min_interval=1.0):
+        """
+        Portfolio value in the quote currency, updated from the live trade stream.
+
+        Holdings are read from a JSON file of accounts (or wallets) mapping asset to quantity:
+
+            {
+                "accounts": {
+                    "ledger": {"BTC": 0.5, "XRP": 1200},
+                    "bitstamp": {"BTC": 0.1, "USD": 250}
+                }
+            }
+
+        Each asset is valued with its `<asset><quote>` pair (e.g., "btcusd"); the quote
+        currency itself counts as cash. Quantities live in an accounts x pairs NumPy array and
+        the units, last prices and values per pair in arrays indexed by pair, so a trade
+        updates the per-asset value and the running total in constant time.
+
+        Args:
+            holdings_path (str): Location of the holdings JSON file.
+            quote (str): Quote currency the portfolio is valued in.
+            on_valuation (callable): Called as on_valuation(timestamp, total, assets, accounts)
+                with {asset: (units, price, value)} and {account: value} dicts, at most once
+                per `min_interval` seconds of trade time.
+            min_interval (float): Minimum seconds between valuation points.
+        """
+        self.holdings_path = holdings_path
+        self.quote = quote.lower()
+        self.on_valuation = on_valuation
+        self.min_interval = min_interval
+
+        self.accounts = []
+        self.assets = []
+        self.pairs = []
+        self.index = {}  # pair -> column
+        self.quantities = np.zeros((0, 0))  # accounts x pairs
+        self.units = np.zeros(0)  # Total quantity per pair
+        self.prices = np.full(0, np.nan)  # Last price per pair, NaN until the first trade
+        self.times = np.full(0, -np.inf)  # Time of the trade behind each last price
+        self.values = np.zeros(0)  # units * price per pair, 0 while the price is unknown
+        self.cash = np.zeros(0)  # Quote currency held per account
+        self.total = 0.0
+
+        self._mtime = None
+        self._last_emit = None
+
+    def load(self, holdings):
+        """
+        Replace the holdings, keeping the last known prices of pairs still held.
+
+        Args:
+            holdings (dict): Parsed holdings file (see the class docstring).
+        """
+        accounts = holdings.get("accounts", {})
+        assets = sorted({asset.upper() for balances in accounts.values() for asset in balances
+                         if asset.lower() != self.quote})
+        pairs = [f"{asset.lower()}{self.quote}" for asset in assets]
+        index = {pair: i for i, pair in enumerate(pairs)}
+
+        quantities = np.zeros((len(accounts), len(pairs)))
+        cash = np.zeros(len(accounts))
+        for row, balances in enumerate(accounts.values()):
+            for asset, quantity in balances.items():
+                if asset.lower() == self.quote:
+                    cash[row] += float(quantity)
+                else:
+                    quantities[row, index[f"{asset.lower()}{self.quote}"]] += float(quantity)
+
+        prices = np.full(len(pairs), np.nan)
+        times = np.full(len(pairs), -np.inf)
+        for pair, i in index.items():
+            if pair in self.index:
+                prices[i] = self.prices[self.index[pair]]
+                times[i] = self.times[self.index[pair]]
+
+        self.accounts = list(accounts)
+        self.assets = assets
+        self.pairs = pairs
+        self.index = index
+        self.quantities = quantities
+        self.cash = cash
+        self.units = quantities.sum(axis=0)
+        self.prices = prices
+        self.times = times
+        self.values = np.nan_to_num(self.units * prices)
+        self.total = float(self.values.sum() + cash.sum())
+
+    def reload(self):
+        """
+        Re-read the holdings file if it changed since the last load.
+
+        Returns:
+            bool: True if new holdings were loaded.
+        """
+        try:
+            mtime = os.path.getmtime(self.holdings_path)
+        except OSError:
+            return False
+        if mtime == self._mtime:
+            return False
+        try:
+            with open(self.holdings_path) as f:
+                holdings = json.load(f)
+            self.load(holdings)
+        except Exception as e:
+            print(f"[ERROR] Failed to load holdings from {self.holdings_path}, keeping the current ones: {e}")
+            return False
+        self._mtime = mtime
+        print(f"[INFO] Loaded holdings: {len(self.assets)} assets in {len(self.accounts)} accounts")
+        return True
+
+    def set_prices(self, prices):
+        """
+        Seed last prices, e.g. from the latest stored candles at startup.
+
+        Args:
+            prices (dict): {pair: price}. Pairs not held are ignored.
+        """
+        for pair, price in prices.items():
+            i = self.index.get(pair)
+            if i is not None:
+                self.prices[i] = float(price)
+        self.values = np.nan_to_num(self.units * self.prices)
+        self.total = float(self.values.sum() + self.cash.sum())
+
+    def unpriced_pairs(self):
+        """
+        Held pairs that have no price yet.
+        """
+        return [self.pairs[i] for i in np.flatnonzero(np.isnan(self.prices))]
+
+    def on_trade(self, currency_pair, price, timestamp):
+        """
+        Revalue one holding at a new trade price. Trades older than the one behind the last
+        price (e.g., recovered after a reconnect) never replace it.
+
+        Args:
+            currency_pair (str): The currency pair, e.g., "btcusd".
+            price (float): Trade price.
+            timestamp (int): Trade time in Unix seconds.
+        """
+        i = self.index.get(currency_pair)
+        if i is None or timestamp < self.times[i]:
+            return
+        self.times[i] = timestamp
+        value = self.units[i] * price
+        self.total += value - self.values[i]
+        self.values[i] = value
+        self.prices[i] = price
+        if self._last_emit is None or timestamp - self._last_emit >= self.min_interval:
+            self.emit(timestamp)
+
+    def valuation(self):
+        """
+        Current valuation.
+
+        Returns:
+            tuple: (total, {asset: (units, price, value)}, {account: value}). Assets without
+                a price yet are left out.
+        """
+        # Re-sum on emit so rounding from the incremental updates never accumulates
+        self.total = float(self.values.sum() + self.cash.sum())
+        assets = {
+            asset: (float(self.units[i]), float(self.prices[i]), float(self.values[i]))
+            for i, asset in enumerate(self.assets) if not np.isnan(self.prices[i])
+        }
+        account_values = self.quantities @ np.nan_to_num(self.prices) + self.cash
+        accounts = {account: float(value) for account, value in zip(self.accounts, account_values)}
+        return self.total, assets, accounts
+
+    def emit(self, timestamp):
+        """
+        Hand the current valuation to on_valuation.
+        """
+        self._last_emit = timestamp
+        if self.on_valuation is None:
+            return
+        try:
+            self.on_valuation(timestamp, *self.valuation())
+        except Exception as e:
+            print(f"[ERROR] Failed to emit portfolio valuation: {e}")
+
+    def history(self, candles):
+        """
+        Value the current holdings over stored candles in one vectorized pass.
+
+        Candle closes are placed on the union of all candle times and carried forward per pair,
+        so pairs with missing candles keep their previous close.
+
+        Args:
+            candles (dict): {pair: [{"timestamp", "close", ...}, ...]}, e.g. from
+                InfluxDBHandler.query_candles.
+
+        Returns:
+            tuple: (timestamps, prices, totals, asset_values, account_values) NumPy arrays of
+                shape (T,), (T, assets), (T,), (T, assets) and (T, accounts). Prices are 0
+                before a pair's first candle.
+        """
+        columns, times, closes = [], [], []
+        for pair, rows in candles.items():
+            i = self.index.get(pair)
+            if i is None or not rows:
+                continue
+            columns.append(np.full(len(rows), i))
+            times.append(np.fromiter((int(row["timestamp"]) for row in rows), dtype=np.int64,
+                                     count=len(rows)))
+            closes.append(np.fromiter((float(row["close"]) for row in rows), dtype=float,
+                                      count=len(rows)))
+        if not times:
+            empty = np.zeros((0, len(self.pairs)))
+            return (np.zeros(0, dtype=np.int64), empty, np.zeros(0), empty,
+                    np.zeros((0, len(self.accounts))))
+
+        columns = np.concatenate(columns)
+        times = np.concatenate(times)
+        timestamps, rows = np.unique(times, return_inverse=True)
+
+        prices = np.full((len(timestamps), len(self.pairs)), np.nan)
+        prices[rows, columns] = np.concatenate(closes)
+
+        # Forward-fill each column: index of the latest row with a price at or before each row
+        filled = np.where(np.isnan(prices), 0, np.arange(len(timestamps))[:, None])
+        np.maximum.accumulate(filled, axis=0, out=filled)
+        prices = np.nan_to_num(prices[filled, np.arange(len(self.pairs))])
+
+        asset_values = prices * self.units
+        account_values = prices @ self.quantities.T + self.cash
+        totals = asset_values.sum(axis=1) + self.cash.sum()
+        return timestamps, prices, totals, asset_values, account_values
@@ -0,0 +1,283 @@
+import json
+import os
+import threading
+import time
+
+# Positions in the per-pair state list
+(PRICE, TIMESTAMP, OPEN, HIGH, LOW, VOLUME, MINUTE, COUNT, PREVIOUS) = range(9)
+
+
+class LatestPrices:
+    def __init__(self, clock=time.time):
+        """
+        In-memory table of the latest state of every pair, updated by the ingest path and read
+        by the price service without touching InfluxDB.
+
+        Per pair it keeps the last trade price and time, the 24h open, high, low and volume
+        from the latest ticker (widened by live trades in between) and a trades per minute
+        rate. The rate is a sliding window estimate from the counts of the current and the
+        previous minute, so both updates and reads are O(1). The JSON of each pair is kept
+        until the pair changes (or for at most a second, to age the rate), so reads of the
+        whole table only encode the pairs that traded since the last read.
+
+        Args:
+            clock (callable): Wall clock in UNIX seconds, used to age the trade rate on reads.
+        """
+        self.clock = clock
+        self._state = {}  # pair -> [price, timestamp, open, high, low, volume, minute, count, previous]
+        self._encoded = {}  # pair -> (second, JSON bytes of its row)
+        self._lock = threading.Lock()
+
+    def _pair_state(self, currency_pair):
+        state = self._state.get(currency_pair)
+        if state is None:
+            state = self._state[currency_pair] = [None, None, None, None, None, None, 0, 0, 0]
+        return state
+
+    def on_trade(self, currency_pair, price, timestamp):
+        """
+        Take one live (or recovered) trade.
+
+        Args:
+            currency_pair (str): The currency pair, e.g., "btcusd".
+            price (float): Trade price.
+            timestamp (int): Trade time in UNIX seconds.
+        """
+        minute = int(timestamp) // 60
+        with self._lock:
+            self._encoded.pop(currency_pair, None)
+            state = self._pair_state(currency_pair)
+            # Late trades (e.g., recovered after a reconnect) never replace the latest price
+            if state[TIMESTAMP] is None or timestamp >= state[TIMESTAMP]:
+                state[PRICE] = price
+                state[TIMESTAMP] = timestamp
+            if state[HIGH] is not None and price > state[HIGH]:
+                state[HIGH] = price
+            if state[LOW] is not None and price < state[LOW]:
+                state[LOW] = price
+            if minute == state[MINUTE]:
+                state[COUNT] += 1
+            elif minute > state[MINUTE]:
+                state[PREVIOUS] = state[COUNT] if minute == state[MINUTE] + 1 else 0
+                state[COUNT] = 1
+                state[MINUTE] = minute
+
+    def on_ticker(self, currency_pair, ticker):
+        """
+        Take the 24h statistics of a Bitstamp ticker response.
+
+        The ticker's last price only seeds pairs that have not traded since startup.
+        """
+        def number(key):
+            value = ticker.get(key)
+            return float(value) if value not in (None, "") else None
+
+        with self._lock:
+            self._encoded.pop(currency_pair, None)
+            state = self._pair_state(currency_pair)
+            state[OPEN] = number("open_24") if ticker.get("open_24") else number("open")
+            state[HIGH] = number("high")
+            state[LOW] = number("low")
+            state[VOLUME] = number("volume")
+            if state[TIMESTAMP] is None and number("last") is not None:
+                state[PRICE] = number("last")
+                state[TIMESTAMP] = int(number("timestamp") or self.clock())
+
+    def discard(self, currency_pair):
+        with self._lock:
+            self._state.pop(currency_pair, None)
+            self._encoded.pop(currency_pair, None)
+
+    def _trades_per_minute(self, state, now):
+        minute, fraction = divmod(now / 60, 1)
+        if state[MINUTE] == minute:
+            return state[PREVIOUS] * (1 - fraction) + state[COUNT]
+        if state[MINUTE] == minute - 1:
+            return state[COUNT] * (1 - fraction)
+        return 0.0
+
+    def _row(self, state, now):
+        price, open_ = state[PRICE], state[OPEN]
+        return {
+            "price": price,
+            "timestamp": state[TIMESTAMP],
+            "open_24h": open_,
+            "high_24h": state[HIGH],
+            "low_24h": state[LOW],
+            "volume_24h": state[VOLUME],
+            "change_24h": (price - open_) / open_ * 100 if price is not None and open_ else None,
+            "trades_per_minute": round(self._trades_per_minute(state, now), 2),
+        }
+
+    def get(self, currency_pair):
+        """
+        Latest state of one pair as a dict, or None for an unknown pair.
+        """
+        now = self.clock()
+        with self._lock:
+            state = self._state.get(currency_pair)
+            return self._row(state, now) if state is not None else None
+
+    def snapshot(self):
+        """
+        Latest state of every pair: {pair: dict}.
+        """
+        now = self.clock()
+        with self._lock:
+            return {pair: self._row(state, now) for pair, state in self._state.items()}
+
+    def _encode(self, currency_pair, state, now):
+        second = int(now)
+        cached = self._encoded.get(currency_pair)
+        if cached is None or cached[0] != second:
+            cached = self._encoded[currency_pair] = (
+                second, json.dumps(self._row(state, now)).encode())
+        return cached[1]
+
+    def encode(self, currency_pair=None):
+        """
+        JSON of one pair's row (None for an unknown pair), or of the whole table when no
+        pair is given; what the price service sends.
+        """
+        now = self.clock()
+        with self._lock:
+            if currency_pair is not None:
+                state = self._state.get(currency_pair)
+                return self._encode(currency_pair, state, now) if state is not None else None
+            return b"{" + b", ".join(
+                json.dumps(pair).encode() + b": " + self._encode(pair, state, now)
+                for pair, state in self._state.items()) + b"}"
+
+    def pairs(self):
+        with self._lock:
+            return sorted(self._state)
+
+
+class PriceServer:
+    def __init__(self, prices):
+        """
+        Local HTTP/JSON endpoint serving a LatestPrices table.
+
+        Routes:
+            GET /prices: every pair, {pair: {price, timestamp, open_24h, ...}}
+            GET /prices/<pair>: one pair, 404 if unknown
+            GET /, POST /search, POST /metrics, POST /query: the Grafana JSON datasource
+                protocol, one time series per pair holding its latest price
+
+        Connections are kept alive (HTTP/1.1) and Nagle's algorithm is off, so a client that
+        polls over one connection pays neither a TCP handshake nor a send delay per read.
+
+        Args:
+            prices (LatestPrices): The table to serve.
+        """
+        self.prices = prices
+        self._servers = []
+
+    def _handler(self):
+        from http.server import BaseHTTPRequestHandler
+
+        prices = self.prices
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status, body):
+                payload = body if isinstance(body, bytes) else json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _read_json(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                try:
+                    return json.loads(self.rfile.read(length) or b"{}")
+                except ValueError:
+                    return None
+
+            def do_GET(self):
+                path = self.path.split("?")[0].rstrip("/")
+                if path == "":
+                    self._send(200, {"status": "ok"})
+                elif path == "/prices":
+                    self._send(200, prices.encode())
+                elif path.startswith("/prices/"):
+                    row = prices.encode(path[len("/prices/"):].lower())
+                    self._send(200 if row else 404, row or {"error": "unknown currency pair"})
+                else:
+                    self._send(404, {"error": "not found"})
+
+            def do_POST(self):
+                path = self.path.split("?")[0].rstrip("/")
+                body = self._read_json()
+                if body is None:
+                    self._send(400, {"error": "invalid JSON body"})
+                elif path in ("/search", "/metrics"):
+                    self._send(200, prices.pairs())
+                elif path == "/query":
+                    series = []
+                    for target in body.get("targets", []):
+                        pair = str(target.get("target") or "").lower()
+                        row = prices.get(pair)
+                        points = [[row["price"], row["timestamp"] * 1000]] \
+                            if row and row["price"] is not None else []
+                        series.append({"target": pair, "datapoints": points})
+                    self._send(200, series)
+                else:
+                    self._send(404, {"error": "not found"})
+
+        return Handler
+
+    def start(self, port=None, host="127.0.0.1", unix_socket=None):
+        """
+        Serve on a TCP port and/or a Unix socket, each on a background thread.
+
+        Args:
+            port (int): TCP port; 0 picks a free one, None serves no TCP endpoint.
+            host (str): TCP bind address.
+            unix_socket (str): Path of a Unix socket to serve as well (replaced if it exists).
+
+        Returns:
+            int: The TCP port served, or None.
+        """
+        import socketserver
+        from http.server import ThreadingHTTPServer
+
+        handler = self._handler()
+        served_port = None
+        if port is not None:
+            server = ThreadingHTTPServer((host, port), handler)
+            server.daemon_threads = True
+            served_port = server.server_port
+            self._serve(server)
+            print(f"[INFO] Latest prices available at http://{host}:{served_port}/prices")
+        if unix_socket:
+            if os.path.exists(unix_socket):
+                os.unlink(unix_socket)
+            # TCP_NODELAY does not apply to Unix sockets
+            unix_handler = type("UnixHandler", (handler,), {"disable_nagle_algorithm": False})
+            server = socketserver.ThreadingUnixStreamServer(unix_socket, unix_handler)
+            server.daemon_threads = True
+            self._serve(server)
+            print(f"[INFO] Latest prices available on Unix socket {unix_socket}")
+        return served_port
+
+    def _serve(self, server):
+        threading.Thread(target=server.serve_forever, name="price-server", daemon=True).start()
+        self._servers.append(server)
+
+    def stop(self):
+        for server in self._servers:
+            server.shutdown()
+            server.server_close()
+            if isinstance(server.server_address, str):  # A Unix socket path
+                try:
+                    os.unlink(server.server_address)
+                except OSError:
+                    pass
+        self._servers = []
@@ -0,0 +1,110 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+_COMMENT = re.compile(r"(^|\s)//[^\n]*", re.MULTILINE)
+_RANGE = re.compile(r"range\(([^)]*)\)")
+_RFC3339 = re.compile(r"\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(\.\d+)?(Z|[+-]\d{2}:\d{2})")
+
+
+def _literal_time(value):
+    """
+    Unix seconds of a Flux time literal (RFC3339 or an integer), or None for anything else:
+    durations, now(), variables and expressions.
+    """
+    value = value.strip()
+    if value.isdigit():
+        return int(value)
+    if _RFC3339.fullmatch(value):
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    return None
+
+
+class QueryCache:
+    def __init__(self, max_entries=64, ttl=30.0):
+        """
+        Small LRU cache of query results for repeated dashboard-style queries.
+
+        Entries are keyed by the normalized Flux text (comments dropped, whitespace collapsed)
+        and its time range. Results of queries whose ranges all have a literal start and a
+        literal stop in the past stay valid until evicted. Everything else may change as time
+        passes or data arrives, so those results expire after `ttl` seconds: relative ranges
+        such as `start: -1h`, bounds given as variables or expressions, and stops in the
+        future.
+
+        Args:
+            max_entries (int): Results kept before the least recently used one is evicted.
+            ttl (float): Seconds a result for a range that is not fixed in the past is served.
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (expires_at or None, result)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(query_string, *extra):
+        """
+        Cache key of a query: (normalized text, time range, extra), where `extra` tells
+        result formats of the same query apart.
+        """
+        normalized = " ".join(_COMMENT.sub(" ", query_string).split())
+        match = _RANGE.search(normalized)
+        return normalized, match.group(1) if match else None, extra
+
+    @staticmethod
+    def is_relative(key, now=None):
+        """
+        Whether a key's results can still change: False only if every range() of the query
+        has a literal start and a literal stop at or before `now` (Unix seconds).
+        """
+        ranges = _RANGE.findall(key[0])
+        if not ranges:
+            return True
+        now = time.time() if now is None else now
+        for time_range in ranges:
+            bounds = {}
+            for argument in time_range.split(","):
+                name, _, value = argument.partition(":")
+                bounds[name.strip()] = value
+            start = _literal_time(bounds.get("start", ""))
+            stop = _literal_time(bounds.get("stop", ""))
+            if start is None or stop is None or stop > now:
+                return True
+        return False
+
+    def get(self, key):
+        """
+        Cached result for a key, or None.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry[0] is None or entry[0] > time.monotonic()):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, result):
+        """
+        Cache a result, evicting the least recently used entries beyond max_entries.
+        """
+        expires_at = time.monotonic() + self.ttl if self.is_relative(key) else None
+        with self._lock:
+            self._entries[key] = (expires_at, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
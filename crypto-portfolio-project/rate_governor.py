@@ -0,0 +1,53 @@
+import asyncio
+import time
+
+# Bitstamp allows 400 requests per second and 10,000 requests per 10 minutes by default
+BITSTAMP_RATE = 10000 / 600
+BITSTAMP_BURST = 400
+
+
+class RateGovernor:
+    def __init__(self, rate=BITSTAMP_RATE, capacity=BITSTAMP_BURST):
+        """
+        Async token bucket shared by every request to one API.
+
+        Args:
+            rate (float): Tokens added per second (sustained requests per second).
+            capacity (int): Maximum burst size.
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens +
+                           (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, tokens=1):
+        """
+        Wait until a request may be sent.
+        """
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self._refill(now)
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+
+    def pause(self, seconds):
+        """
+        Hold back every caller for the given time, e.g. after an HTTP 429 response.
+        """
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        # Start refilling from an empty bucket once the pause is over
+        self._tokens = 0.0
+        self._updated = self._paused_until
@@ -0,0 +1,205 @@
+import asyncio
+import heapq
+import time
+from websocket_client import WebSocketClient
+
+
+def balance_pairs(currency_pairs, shards, trade_rates=None):
+    """
+    Spread pairs over shards so that every shard carries a similar trade rate.
+
+    Uses longest-processing-time-first: the busiest pair goes to the least loaded shard.
+    Pairs without an observed rate are spread evenly by count.
+
+    Args:
+        currency_pairs (list): Pairs to assign.
+        shards (int): Number of shards.
+        trade_rates (dict): {pair: trades per second}; missing pairs count as 0.
+
+    Returns:
+        list: One list of pairs per shard.
+    """
+    rates = trade_rates or {}
+    assignment = [[] for _ in range(shards)]
+    heap = [(0.0, 0, index) for index in range(shards)]  # (load, pair count, shard)
+    for pair in sorted(currency_pairs, key=lambda p: (-rates.get(p, 0.0), p)):
+        load, count, index = heapq.heappop(heap)
+        assignment[index].append(pair)
+        heapq.heappush(heap, (load + rates.get(pair, 0.0), count + 1, index))
+    return assignment
+
+
+class ShardedWebSocketClient:
+    def __init__(self, url, currency_pairs, shards=4, pipeline=None, decoder=None, recorder=None,
+                 metrics=None, gap_repairer=None, trade_rates=None, rebalance_threshold=1.5):
+        """
+        Spread subscriptions over several WebSocket connections that reconnect independently.
+
+        Every shard is a WebSocketClient running its own reader task; all shards feed the same
+        message handler (and pipeline, if given), so downstream processing is unchanged.
+
+        Args:
+            url (str): WebSocket server URL.
+            currency_pairs (list): List of currency pairs to subscribe to.
+            shards (int): Number of connections.
+            pipeline (MessagePipeline): Optional pipeline shared by all shards.
+            decoder (TradeDecoder): Decoder shared by all shards. Its per-pair trade counts
+                provide the observed trade rates used by rebalance().
+            recorder (CaptureWriter): Optional capture file shared by all shards.
+            metrics (Metrics): Optional metrics shared by all shards.
+            gap_repairer (GapRepairer): Optional repairer shared by all shards; only the pairs
+                of a shard that reconnects are repaired.
+            trade_rates (dict): Initial {pair: trades per second} estimate for the first split.
+            rebalance_threshold (float): rebalance() only reshuffles pairs when the busiest
+                shard carries more than this multiple of the average load.
+        """
+        self.url = url
+        self.currency_pairs = list(currency_pairs)
+        self.shards = max(1, min(shards, len(self.currency_pairs)))
+        self.pipeline = pipeline
+        self.decoder = decoder
+        self.recorder = recorder
+        self.metrics = metrics
+        self.gap_repairer = gap_repairer
+        self.rebalance_threshold = rebalance_threshold
+
+        self.assignment = balance_pairs(self.currency_pairs, self.shards, trade_rates)
+        self.clients = [None] * self.shards
+        self._tasks = [None] * self.shards
+        self._message_handler = None
+        self._counts_snapshot = {}
+        self._snapshot_time = time.monotonic()
+
+    def _start_shard(self, index, repair=False):
+        client = WebSocketClient(url=self.url, currency_pairs=self.assignment[index],
+                                 pipeline=self.pipeline, decoder=self.decoder,
+                                 recorder=self.recorder, metrics=self.metrics,
+                                 gap_repairer=self.gap_repairer, repair_on_connect=repair)
+        self.clients[index] = client
+        self._tasks[index] = asyncio.create_task(client.listen(self._message_handler))
+        print(f"[INFO] Shard {index} listening for {len(self.assignment[index])} pairs")
+
+    async def listen(self, message_handler):
+        """
+        Start one reader per shard and run until cancelled.
+        """
+        self._message_handler = message_handler
+        for index in range(self.shards):
+            self._start_shard(index)
+        try:
+            while True:
+                # Shard tasks are replaced by rebalance(), so wait on whatever is current
+                await asyncio.wait(self._tasks, return_when=asyncio.FIRST_COMPLETED)
+                for index, task in enumerate(self._tasks):
+                    if task.done() and not task.cancelled():
+                        print(f"[ERROR] Shard {index} stopped: {task.exception()}. Restarting...")
+                        if self.gap_repairer:
+                            self.gap_repairer.disconnected(self.assignment[index])
+                        self._start_shard(index, repair=True)
+        finally:
+            for task in self._tasks:
+                if task:
+                    task.cancel()
+            await asyncio.gather(*[t for t in self._tasks if t], return_exceptions=True)
+
+    async def add_pairs(self, currency_pairs):
+        """
+        Start tracking more pairs, each on the shard with the fewest pairs. Only those shards
+        send new subscriptions; no connection is restarted.
+
+        Returns:
+            list: The pairs that were not tracked before.
+        """
+        added = [pair for pair in currency_pairs if pair not in self.currency_pairs]
+        by_shard = {}
+        for pair in added:
+            index = min(range(self.shards), key=lambda i: len(self.assignment[i]))
+            self.assignment[index].append(pair)
+            by_shard.setdefault(index, []).append(pair)
+        self.currency_pairs.extend(added)
+        await asyncio.gather(*(self.clients[index].add_pairs(pairs)
+                               for index, pairs in by_shard.items() if self.clients[index]))
+        return added
+
+    async def remove_pairs(self, currency_pairs):
+        """
+        Stop tracking pairs on whichever shards carry them.
+
+        Returns:
+            list: The pairs that were tracked before.
+        """
+        removed = [pair for pair in currency_pairs if pair in self.currency_pairs]
+        by_shard = {}
+        for index, pairs in enumerate(self.assignment):
+            dropped = [pair for pair in pairs if pair in removed]
+            if dropped:
+                self.assignment[index] = [pair for pair in pairs if pair not in dropped]
+                by_shard[index] = dropped
+        self.currency_pairs = [pair for pair in self.currency_pairs if pair not in removed]
+        await asyncio.gather(*(self.clients[index].remove_pairs(pairs)
+                               for index, pairs in by_shard.items() if self.clients[index]))
+        return removed
+
+    def trade_rates(self):
+        """
+        Trades per second per pair observed by the decoder since the previous call.
+        """
+        if self.decoder is None:
+            return {}
+        now = time.monotonic()
+        elapsed = max(now - self._snapshot_time, 1e-9)
+        counts = dict(self.decoder.trade_counts)
+        rates = {pair: (count - self._counts_snapshot.get(pair, 0)) / elapsed
+                 for pair, count in counts.items()}
+        self._counts_snapshot = counts
+        self._snapshot_time = now
+        return rates
+
+    def imbalance(self, trade_rates):
+        """
+        Load of the busiest shard relative to the average shard load (1.0 is perfectly even).
+        """
+        loads = [sum(trade_rates.get(pair, 0.0) for pair in pairs) for pairs in self.assignment]
+        average = sum(loads) / len(loads)
+        return max(loads) / average if average else 1.0
+
+    def rebalance(self, trade_rates=None):
+        """
+        Re-split pairs by observed trade rate if the shards have drifted out of balance.
+
+        Only shards whose pair set changes are reconnected; the others keep streaming.
+
+        Returns:
+            int: Number of shards that were restarted.
+        """
+        rates = self.trade_rates() if trade_rates is None else trade_rates
+        imbalance = self.imbalance(rates)
+        if imbalance <= self.rebalance_threshold:
+            return 0
+
+        assignment = balance_pairs(self.currency_pairs, self.shards, rates)
+        # Keep shard slots stable: match each new group to the old shard it overlaps most
+        unused = list(range(self.shards))
+        ordered = [None] * self.shards
+        for pairs in sorted(assignment, key=len, reverse=True):
+            best = max(unused, key=lambda i: len(set(pairs) & set(self.assignment[i])))
+            unused.remove(best)
+            ordered[best] = pairs
+
+        restarted = 0
+        for index, pairs in enumerate(ordered):
+            if set(pairs) == set(self.assignment[index]):
+                continue
+            if self._tasks[index]:
+                # Trades sent during the switchover are recovered by the new connection
+                if self.gap_repairer:
+                    self.gap_repairer.disconnected(self.assignment[index])
+                self._tasks[index].cancel()
+                self.assignment[index] = pairs
+                self._start_shard(index, repair=True)
+            else:
+                self.assignment[index] = pairs
+            restarted += 1
+        print(f"[INFO] Rebalanced WebSocket shards (imbalance {imbalance:.2f}), "
+              f"restarted {restarted} of {self.shards}")
+        return restarted
@@ -0,0 +1,246 @@
+import math
+
+# Positions in the per-pair state list; the trade times after TRADES are never emitted
+START, OPEN, HIGH, LOW, LAST, VOLUME, NOTIONAL, TRADES, FIRST_AT, LAST_AT = range(10)
+
+
+class SnapshotRollup:
+    def __init__(self, period=3600, on_snapshot=None, max_fill=24, amend_window=0):
+        """
+        Roll the live trade stream up into one compact snapshot per pair and period.
+
+        Each trade updates the pair's running state (open, high, low, last price, volume and
+        traded notional for the VWAP) in constant time. At every period boundary the state is
+        emitted as a snapshot stamped with the boundary time. Quiet pairs keep producing
+        snapshots with the last price carried forward, so the snapshot series has no holes
+        while the stream is up.
+
+        Trades for periods that were already emitted (e.g., recovered by GapRepairer after
+        live trades resumed) amend those snapshots when they are at most `amend_window`
+        seconds older than the newest period; the next close_due() emits the amended snapshots
+        again, along with the carried-forward snapshots after them, which take the new last
+        price. Older late trades are dropped and counted.
+
+        Args:
+            period (int): Snapshot interval in seconds.
+            on_snapshot (callable): Called as on_snapshot(currency_pair, timestamp, open, high,
+                low, last, vwap, volume, trades) per snapshot; `timestamp` is the end of the
+                period in Unix seconds.
+            max_fill (int): Most carried-forward snapshots emitted for a gap in one go; longer
+                gaps are left to the candle-based rebuild.
+            amend_window (int): How far back, in seconds, emitted snapshots are kept for
+                amending (0 drops every late trade).
+        """
+        self.period = period
+        self.on_snapshot = on_snapshot
+        self.max_fill = max_fill
+        self.amend_window = amend_window
+        self.late_trades = 0
+        self.amended_trades = 0
+        self._state = {}  # pair -> [start, open, high, low, last, volume, notional, trades, ...]
+        self._emitted_until = {}  # pair -> end of the last emitted period
+        self._history = {}  # pair -> {start: state} of emitted periods open to amends
+        self._amended = {}  # pair -> starts of the periods to emit again
+
+    def add_trade(self, currency_pair, price, amount, timestamp):
+        """
+        Fold one trade into the pair's running state.
+
+        Args:
+            currency_pair (str): The currency pair, e.g., "btcusd".
+            price (float): Trade price.
+            amount (float): Traded quantity.
+            timestamp (int): Trade time in Unix seconds.
+        """
+        start = timestamp - timestamp % self.period
+        state = self._state.get(currency_pair)
+
+        if state is not None and start == state[START]:
+            # A carried-forward period opens at the previous last price
+            _fold(state, price, amount, timestamp)
+        elif state is not None and start > state[START]:
+            self._roll(currency_pair, state, start)
+            self._state[currency_pair] = [start, price, price, price, price, amount,
+                                          price * amount, 1, timestamp, timestamp]
+        elif state is None and start >= self._emitted_until.get(currency_pair, start):
+            self._state[currency_pair] = [start, price, price, price, price, amount,
+                                          price * amount, 1, timestamp, timestamp]
+        else:
+            # Trade for a period that was already emitted or skipped while disconnected
+            self._late(currency_pair, start, price, amount, timestamp)
+
+    def close_due(self, now, hold=()):
+        """
+        Emit the snapshot of every pair whose period ended at or before `now` (Unix seconds)
+        and start the next period from its last price. With now=inf every open period is
+        emitted and nothing is carried forward (e.g., at the end of a replay).
+
+        Args:
+            now (float): Current time in Unix seconds.
+            hold (set): Pairs whose stream is down. Their finished period is emitted but the
+                last price is not carried forward, so an outage leaves a gap for recovered
+                trades and the candle-based rebuild instead of flat snapshots.
+        """
+        if self._amended:
+            self._emit_amended()
+        if math.isinf(now):
+            for pair, state in list(self._state.items()):
+                self._emit(pair, state)
+            self._state.clear()
+            return
+
+        boundary = int(now - now % self.period)
+        for pair, state in list(self._state.items()):
+            if state[START] + self.period <= now:
+                if pair in hold:
+                    self._emit(pair, state)
+                    del self._state[pair]
+                    continue
+                self._roll(pair, state, boundary)
+                self._state[pair] = _carried(boundary, state[LAST])
+
+    def discard(self, currency_pair):
+        """
+        Stop producing snapshots for a pair that is no longer tracked.
+        """
+        self._state.pop(currency_pair, None)
+        self._history.pop(currency_pair, None)
+        self._amended.pop(currency_pair, None)
+
+    def open_snapshots(self):
+        """
+        Copy of the running state per pair, as {pair: state list}.
+        """
+        return {pair: state[:TRADES + 1] for pair, state in self._state.items()}
+
+    def _late(self, currency_pair, start, price, amount, timestamp):
+        emitted_until = self._emitted_until.get(currency_pair)
+        if (not self.amend_window or emitted_until is None
+                or emitted_until - self.period - start > self.amend_window):
+            self.late_trades += 1
+            return
+        history = self._history.setdefault(currency_pair, {})
+        state = history.get(start)
+        if state is None:
+            # A period past the carry-forward limit, e.g., after a long outage
+            history[start] = [start, price, price, price, price, amount, price * amount, 1,
+                              timestamp, timestamp]
+        else:
+            _fold(state, price, amount, timestamp)
+        self._amended.setdefault(currency_pair, set()).add(start)
+        self.amended_trades += 1
+
+    def _emit_amended(self):
+        """
+        Emit amended periods again; the carried-forward periods after them take the new last
+        price, up to the first period with trades of its own.
+        """
+        for pair, amended in self._amended.items():
+            history = self._history.get(pair, {})
+            oldest = min(amended)
+            last = None  # New last price to carry forward, if any
+            for start in sorted(history):
+                state = history[start]
+                if start < oldest:
+                    continue
+                if start in amended:
+                    last = state[LAST]
+                elif state[TRADES] == 0 and last is not None:
+                    state[OPEN] = state[HIGH] = state[LOW] = state[LAST] = last
+                else:
+                    last = None
+                    continue
+                self._send(pair, state)
+            state = self._state.get(pair)
+            if last is not None and state is not None and state[TRADES] == 0:
+                state[OPEN] = state[HIGH] = state[LOW] = state[LAST] = last
+        self._amended.clear()
+
+    def _roll(self, currency_pair, state, next_start):
+        """
+        Emit a finished period plus carried-forward snapshots for the empty periods after it.
+        """
+        self._emit(currency_pair, state)
+        last = state[LAST]
+        start = state[START] + self.period
+        filled = 0
+        while start < next_start and filled < self.max_fill:
+            self._emit(currency_pair, _carried(start, last))
+            start += self.period
+            filled += 1
+        self._emitted_until[currency_pair] = next_start
+
+    def _emit(self, currency_pair, state):
+        self._emitted_until[currency_pair] = state[START] + self.period
+        if self.amend_window:
+            history = self._history.setdefault(currency_pair, {})
+            history[state[START]] = state
+            # Periods are emitted in time order, so the oldest are at the front
+            cutoff = state[START] - self.amend_window
+            while next(iter(history)) < cutoff:
+                del history[next(iter(history))]
+        self._send(currency_pair, state)
+
+    def _send(self, currency_pair, state):
+        if self.on_snapshot is None:
+            return
+        vwap = state[NOTIONAL] / state[VOLUME] if state[VOLUME] else state[LAST]
+        try:
+            self.on_snapshot(currency_pair, state[START] + self.period, state[OPEN],
+                             state[HIGH], state[LOW], state[LAST], vwap, state[VOLUME],
+                             state[TRADES])
+        except Exception as e:
+            print(f"[ERROR] Failed to emit snapshot for {currency_pair}: {e}")
+
+
+def _carried(start, last):
+    """
+    State of a period without trades yet; it opens at the previous last price, and trades
+    (which are all at or after `start`) never replace that open.
+    """
+    return [start, last, last, last, last, 0.0, 0.0, 0, start - 1, start - 1]
+
+
+def _fold(state, price, amount, timestamp):
+    """
+    Fold a trade into a period; its time decides whether it becomes the open or the last.
+    """
+    if price > state[HIGH]:
+        state[HIGH] = price
+    elif price < state[LOW]:
+        state[LOW] = price
+    if timestamp >= state[LAST_AT]:
+        state[LAST] = price
+        state[LAST_AT] = timestamp
+    elif timestamp < state[FIRST_AT]:
+        state[OPEN] = price
+        state[FIRST_AT] = timestamp
+    state[VOLUME] += amount
+    state[NOTIONAL] += price * amount
+    state[TRADES] += 1
+
+
+def snapshots_from_candles(currency_pair, candles, period=3600):
+    """
+    Rebuild snapshots from stored candles of the same period.
+
+    Candles carry no traded notional, so the VWAP is approximated by the typical price
+    (high + low + close) / 3 and the trade count is unknown (None).
+
+    Args:
+        currency_pair (str): The currency pair, e.g., "btcusd".
+        candles (list): Dicts with "timestamp" (open time, Unix seconds), "open", "high",
+            "low", "close" and "volume".
+        period (int): Candle and snapshot interval in seconds.
+
+    Returns:
+        list: (currency_pair, timestamp, open, high, low, last, vwap, volume, trades) tuples
+            in time order, stamped with the end of each candle.
+    """
+    snapshots = []
+    for candle in sorted(candles, key=lambda c: int(c["timestamp"])):
+        high, low, close = float(candle["high"]), float(candle["low"]), float(candle["close"])
+        snapshots.append((currency_pair, int(candle["timestamp"]) + period,
+                          float(candle["open"]), high, low, close, (high + low + close) / 3,
+                          float(candle["volume"]), None))
+    return snapshots
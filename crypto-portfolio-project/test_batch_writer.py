@@ -0,0 +1,96 @@
+import threading
+import time
+from batch_writer import BatchWriter
+
+
+class FakeWriteApi:
+    def __init__(self, fail=False, delay=0.0):
+        self.fail = fail
+        self.delay = delay
+        self.batches = []
+        self.lock = threading.Lock()
+
+    def write(self, bucket, record):
+        time.sleep(self.delay)
+        if self.fail:
+            raise ConnectionError("influx down")
+        with self.lock:
+            lines = record.split("\n") if isinstance(record, str) else list(record)
+            self.batches.append((bucket, lines))
+
+
+def test_flush_by_size():
+    """
+    A full batch is written without waiting for the flush interval.
+    """
+    write_api = FakeWriteApi()
+    writer = BatchWriter(write_api, "crypto_portfolio",
+                         batch_size=3, flush_interval=60)
+    for i in range(3):
+        writer.write(f"line {i}")
+
+    deadline = time.monotonic() + 2
+    while not write_api.batches and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert write_api.batches == [
+        ("crypto_portfolio", ["line 0", "line 1", "line 2"])]
+    writer.close()
+
+
+def test_flush_by_interval():
+    """
+    A partial batch is written once the flush interval elapses.
+    """
+    write_api = FakeWriteApi()
+    writer = BatchWriter(write_api, "crypto_portfolio",
+                         batch_size=1000, flush_interval=0.05)
+    writer.write("line")
+    time.sleep(0.3)
+
+    assert write_api.batches == [("crypto_portfolio", ["line"])]
+    writer.close()
+
+
+def test_flush_and_close_drain_buffer():
+    """
+    flush() waits for in-flight records and close() sends whatever remains.
+    """
+    write_api = FakeWriteApi(delay=0.01)
+    writer = BatchWriter(write_api, "crypto_portfolio",
+                         batch_size=10, flush_interval=60)
+    writer.write_many(f"line {i}" for i in range(25))
+    assert writer.flush(timeout=2)
+    assert writer.pending() == 0
+
+    writer.write("last")
+    writer.close()
+
+    written = [line for _, batch in write_api.batches for line in batch]
+    assert written == [f"line {i}" for i in range(25)] + ["last"]
+
+
+def test_callbacks():
+    """
+    Success and error callbacks receive the bucket and the batch.
+    """
+    successes, errors = [], []
+    writer = BatchWriter(FakeWriteApi(), "ok", batch_size=2, flush_interval=60,
+                         on_success=lambda bucket, batch: successes.append((bucket, len(batch))))
+    writer.write_many(["a", "b"])
+    writer.close()
+
+    failing = BatchWriter(FakeWriteApi(fail=True), "down", batch_size=2, flush_interval=60,
+                          on_error=lambda bucket, batch, e: errors.append((bucket, len(batch), type(e))))
+    failing.write_many(["a", "b"])
+    failing.close()
+
+    assert successes == [("ok", 2)]
+    assert errors == [("down", 2, ConnectionError)]
+
+
+if __name__ == "__main__":
+    test_flush_by_size()
+    test_flush_by_interval()
+    test_flush_and_close_drain_buffer()
+    test_callbacks()
@@ -0,0 +1,100 @@
+from candle_aggregator import CandleAggregator
+
+
+def collect():
+    bars = []
+
+    def on_bar(*bar):
+        bars.append(bar)
+
+    return bars, on_bar
+
+
+def test_bars_close_when_next_period_starts():
+    """
+    Trades are folded into OHLCV bars and a bar is emitted once the next period begins.
+    """
+    bars, on_bar = collect()
+    aggregator = CandleAggregator(resolutions=("1m",), on_bar=on_bar)
+    aggregator.add_trade("btcusd", 100.0, 1.0, 60)
+    aggregator.add_trade("btcusd", 105.0, 0.5, 70)
+    aggregator.add_trade("btcusd", 95.0, 2.0, 80)
+    aggregator.add_trade("btcusd", 101.0, 1.5, 119)
+    assert bars == []
+
+    aggregator.add_trade("btcusd", 102.0, 1.0, 120)
+    assert bars == [("btcusd", "1m", 60, 100.0, 105.0, 95.0, 101.0, 5.0, 4)]
+
+
+def test_resolutions_and_pairs_are_independent():
+    """
+    Each pair keeps its own bar for every configured resolution.
+    """
+    bars, on_bar = collect()
+    aggregator = CandleAggregator(resolutions=("1m", "5m"), on_bar=on_bar)
+    aggregator.add_trade("btcusd", 100.0, 1.0, 0)
+    aggregator.add_trade("xrpusd", 0.5, 10.0, 30)
+    aggregator.add_trade("btcusd", 110.0, 1.0, 61)
+
+    assert bars == [("btcusd", "1m", 0, 100.0, 100.0, 100.0, 100.0, 1.0, 1)]
+    assert set(aggregator.open_bars()) == {
+        ("btcusd", "1m"), ("btcusd", "5m"), ("xrpusd", "1m"), ("xrpusd", "5m")}
+    assert aggregator.open_bars()[("btcusd", "5m")] == [0, 100.0, 110.0, 100.0, 110.0, 2.0, 2]
+
+
+def test_close_due_and_late_trades():
+    """
+    close_due() emits finished bars without a new trade; later trades for them are ignored.
+    """
+    bars, on_bar = collect()
+    aggregator = CandleAggregator(resolutions=("1m", "1h"), on_bar=on_bar)
+    aggregator.add_trade("btcusd", 100.0, 1.0, 10)
+    aggregator.close_due(59)
+    assert bars == []
+
+    aggregator.close_due(60)
+    assert bars == [("btcusd", "1m", 0, 100.0, 100.0, 100.0, 100.0, 1.0, 1)]
+
+    aggregator.add_trade("btcusd", 90.0, 1.0, 30)
+    assert aggregator.late_trades == 1
+    assert ("btcusd", "1m") not in aggregator.open_bars()
+    assert aggregator.open_bars()[("btcusd", "1h")][6] == 2
+
+
+def test_recovered_trades_amend_emitted_bars():
+    """
+    Trades recovered after live trades resumed amend the bars they belong to, which are
+    emitted again; trades older than the amend window are still dropped.
+    """
+    bars, on_bar = collect()
+    aggregator = CandleAggregator(resolutions=("1m",), on_bar=on_bar, amend_window=600)
+    aggregator.add_trade("btcusd", 100.0, 1.0, 10)
+    aggregator.add_trade("btcusd", 104.0, 1.0, 190)  # Live again after an outage
+    assert bars == [("btcusd", "1m", 0, 100.0, 100.0, 100.0, 100.0, 1.0, 1)]
+
+    # Replayed oldest first: the end of the first bar and a minute without live trades
+    aggregator.add_trade("btcusd", 101.0, 2.0, 50)
+    aggregator.add_trade("btcusd", 99.0, 1.0, 5)
+    aggregator.add_trade("btcusd", 102.0, 1.0, 70)
+    aggregator.add_trade("btcusd", 103.0, 1.0, 130)
+    aggregator.add_trade("btcusd", 90.0, 1.0, 185)  # Same bar as the live trade, but earlier
+    assert aggregator.amended_trades == 4 and aggregator.late_trades == 0
+
+    aggregator.close_due(200)
+    assert bars[1:] == [
+        ("btcusd", "1m", 0, 99.0, 101.0, 99.0, 101.0, 4.0, 3),
+        ("btcusd", "1m", 60, 102.0, 102.0, 102.0, 102.0, 1.0, 1),
+        ("btcusd", "1m", 120, 103.0, 103.0, 103.0, 103.0, 1.0, 1),
+    ]
+    assert aggregator.open_bars()[("btcusd", "1m")] == [180, 90.0, 104.0, 90.0, 104.0, 2.0, 2]
+
+    aggregator.add_trade("btcusd", 105.0, 1.0, 900)
+    aggregator.add_trade("btcusd", 95.0, 1.0, 20)
+    assert aggregator.late_trades == 1
+
+
+if __name__ == "__main__":
+    test_bars_close_when_next_period_starts()
+    test_resolutions_and_pairs_are_independent()
+    test_close_due_and_late_trades()
+    test_recovered_trades_amend_emitted_bars()
@@ -0,0 +1,78 @@
+import asyncio
+import gzip
+import os
+import tempfile
+from capture import CaptureWriter, read_capture, replay_capture
+
+
+def test_capture_round_trip_and_append():
+    """
+    Frames are read back in order, and a second session appends to the same file.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "capture.jsonl.gz")
+        writer = CaptureWriter(path)
+        writer.record('{"event": "trade", "data": {"price": 1}}')
+        writer.record(b'{"event": "trade", "data": {"price": 2}}')
+        writer.close()
+
+        writer = CaptureWriter(path)
+        writer.record('{"event": "bts:heartbeat",\n "data": {}}')
+        writer.close()
+
+        frames = [frame for _, frame in read_capture(path)]
+        assert frames == ['{"event": "trade", "data": {"price": 1}}',
+                          '{"event": "trade", "data": {"price": 2}}',
+                          '{"event": "bts:heartbeat",  "data": {}}']
+
+
+def test_truncated_capture_is_readable():
+    """
+    A capture cut off mid-write still yields the complete records before the cut.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "capture.jsonl.gz")
+        with gzip.open(path, "wt") as f:
+            for i in range(200):
+                f.write(f"{1700000000 + i}.000000\t{{\"n\": {i}}}\n")
+        with open(path, "rb") as f:
+            data = f.read()
+        with open(path, "wb") as f:
+            f.write(data[:len(data) - 20])
+
+        frames = list(read_capture(path))
+        assert frames and frames[0] == (1700000000.0, '{"n": 0}')
+
+
+def test_replay_speed():
+    """
+    Replay honours the recorded spacing scaled by speed, and speed 0 does not wait.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "capture.jsonl.gz")
+        with gzip.open(path, "wt") as f:
+            f.write("100.0\ta\n100.5\tb\n101.0\tc\n")
+
+        received = []
+
+        async def handler(frame):
+            received.append(frame)
+
+        loop = asyncio.new_event_loop()
+        try:
+            started = loop.time()
+            assert loop.run_until_complete(replay_capture(path, handler, speed=10)) == 3
+            assert 0.09 <= loop.time() - started < 1.0
+
+            started = loop.time()
+            assert loop.run_until_complete(replay_capture(path, handler, speed=0)) == 3
+            assert loop.time() - started < 0.05
+        finally:
+            loop.close()
+        assert received == ["a", "b", "c"] * 2
+
+
+if __name__ == "__main__":
+    test_capture_round_trip_and_append()
+    test_truncated_capture_is_readable()
+    test_replay_speed()
@@ -0,0 +1,169 @@
+import asyncio
+import json
+import time
+from websockets.asyncio.server import serve
+from gap_repair import GapRepairer
+from websocket_client import WebSocketClient
+
+
+def live_trade(trade_id, timestamp):
+    return {"id": trade_id, "timestamp": str(timestamp), "price": 1.0, "amount": 1.0, "type": 0}
+
+
+class FakeHTTPHandler:
+    def __init__(self, transactions):
+        self.transactions = transactions
+        self.requests = []
+
+    async def fetch_transactions(self, currency_pair, interval="hour"):
+        self.requests.append((currency_pair, interval))
+        return self.transactions
+
+
+def test_repair_recovers_missed_trades_once():
+    """
+    Only trades after the disconnect that the live stream has not delivered are recovered.
+    """
+    now = int(time.time())
+    recovered = []
+    # Newest first, as returned by Bitstamp
+    http = FakeHTTPHandler([
+        {"date": str(now), "tid": "14", "price": "5", "amount": "1", "type": "0"},
+        {"date": str(now - 5), "tid": "13", "price": "4", "amount": "1", "type": "1"},
+        {"date": str(now - 10), "tid": "12", "price": "3", "amount": "1", "type": "0"},
+        {"date": str(now - 20), "tid": "11", "price": "2", "amount": "1", "type": "0"},
+        {"date": str(now - 30), "tid": "10", "price": "1", "amount": "1", "type": "0"},
+    ])
+    repairer = GapRepairer(http, on_trade=lambda pair, data: recovered.append(data["id"]))
+
+    assert repairer.observe("btcusd", live_trade(10, now - 30))
+    repairer.disconnected(["btcusd", "xrpusd"])
+    # The live stream is back before the repair runs
+    assert repairer.observe("btcusd", live_trade(14, now))
+
+    assert asyncio.run(repairer.repair(["btcusd", "xrpusd"])) == 3
+    assert recovered == [11, 12, 13]
+    assert http.requests == [("btcusd", "minute")]
+
+    # A late live copy of a recovered trade is dropped
+    assert not repairer.observe("btcusd", live_trade(12, now - 10))
+    assert repairer.duplicates == 2
+
+
+def test_reconnect_is_fast_and_triggers_repair():
+    """
+    A dropped connection is re-established within milliseconds and the gap is repaired.
+    """
+    async def run():
+        connections = []
+
+        async def server_handler(connection):
+            connections.append(time.monotonic())
+            async for message in connection:
+                if len(connections) == 1:
+                    await connection.close()  # Drop the first connection right after subscribing
+                    return
+
+        class RecordingRepairer:
+            def __init__(self):
+                self.disconnects = []
+                self.repairs = []
+
+            def disconnected(self, pairs):
+                self.disconnects.append(list(pairs))
+
+            async def repair(self, pairs):
+                self.repairs.append(list(pairs))
+
+        repairer = RecordingRepairer()
+        async with serve(server_handler, "127.0.0.1", 0) as server:
+            port = server.sockets[0].getsockname()[1]
+            client = WebSocketClient(f"ws://127.0.0.1:{port}", ["btcusd"],
+                                     gap_repairer=repairer)
+
+            async def handler(message):
+                pass
+
+            listener = asyncio.create_task(client.listen(handler))
+            deadline = time.monotonic() + 5
+            while not repairer.repairs and time.monotonic() < deadline:
+                await asyncio.sleep(0.01)
+            listener.cancel()
+            await asyncio.gather(listener, return_exceptions=True)
+        return connections, repairer
+
+    connections, repairer = asyncio.run(run())
+    assert len(connections) >= 2
+    assert connections[1] - connections[0] < 1.0
+    assert repairer.disconnects[0] == ["btcusd"]
+    assert repairer.repairs[0] == ["btcusd"]
+
+
+def test_stale_stream_watchdog_reconnects():
+    """
+    A connection that stays open but goes silent is dropped and re-established.
+    """
+    async def run():
+        connections = []
+
+        async def server_handler(connection):
+            connections.append(time.monotonic())
+            await connection.wait_closed()  # Never send anything
+
+        async with serve(server_handler, "127.0.0.1", 0) as server:
+            port = server.sockets[0].getsockname()[1]
+            client = WebSocketClient(f"ws://127.0.0.1:{port}", ["btcusd"], stale_timeout=0.2)
+
+            async def handler(message):
+                pass
+
+            listener = asyncio.create_task(client.listen(handler))
+            deadline = time.monotonic() + 5
+            while len(connections) < 2 and time.monotonic() < deadline:
+                await asyncio.sleep(0.01)
+            listener.cancel()
+            await asyncio.gather(listener, return_exceptions=True)
+        return connections
+
+    assert len(asyncio.run(run())) >= 2
+
+
+def test_quiet_connection_answering_heartbeats_is_kept():
+    """
+    A connection without trades stays up while the server answers heartbeat requests.
+    """
+    async def run():
+        connections = []
+        heartbeats = []
+
+        async def server_handler(connection):
+            connections.append(time.monotonic())
+            async for message in connection:
+                if json.loads(message)["event"] == "bts:heartbeat":
+                    heartbeats.append(message)
+                    await connection.send(json.dumps({
+                        "event": "bts:heartbeat", "channel": "", "data": {"status": "success"}}))
+
+        async with serve(server_handler, "127.0.0.1", 0) as server:
+            port = server.sockets[0].getsockname()[1]
+            client = WebSocketClient(f"ws://127.0.0.1:{port}", ["hbarusd"], stale_timeout=0.2)
+
+            async def handler(message):
+                pass
+
+            listener = asyncio.create_task(client.listen(handler))
+            await asyncio.sleep(1.0)
+            listener.cancel()
+            await asyncio.gather(listener, return_exceptions=True)
+        return connections, heartbeats
+
+    connections, heartbeats = asyncio.run(run())
+    assert len(connections) == 1
+    assert heartbeats
+
+
+if __name__ == "__main__":
+    test_repair_recovers_missed_trades_once()
+    test_reconnect_is_fast_and_triggers_repair()
+    test_stale_stream_watchdog_reconnects()
+    test_quiet_connection_answering_heartbeats_is_kept()
@@ -1,7 +1,13 @@
 from influxdb_client.client.write_api import SYNCHRONOUS
 import influxdb_client
-from http_handler import HTTPHandler
+from http_handler import HTTPHandler, AsyncHTTPHandler
 from influxdb_handler import InfluxDBHandler
+from rate_governor import RateGovernor
+from metadata_cache import MetadataCache
+from pair_registry import PairRegistry
+import asyncio
+import os
+import tempfile
 import time
 
 # Test the fetch method for OHLC data from the Bitstamp API
@@ -11,9 +17,8 @@ def test_fetch_currencies_with_logo():
     """
     Test the fetch_currencies_with_logo method to filter only tracked coins with logos.
     """
-    # Define tracked currency pairs (this should match your CURRENCY_PAIRS list)
-    tracked_currency_pairs = ["btcusd", "xrpusd",
-                              "xlmusd", "hbarusd", "vetusd", "csprusd", "xdcusd"]
+    # Tracked currency pairs from the shared pairs.json
+    tracked_currency_pairs = (PairRegistry(None).load_config() or {}).get("pairs", [])
 
     # Instantiate the HTTP handler
     http_handler = HTTPHandler(
@@ -36,8 +41,144 @@ def test_fetch_currencies_with_logo():
         print(f"{pair} (Base symbol: {pair[:-3].upper()})")
 
 
+class FakeResponse:
+    def __init__(self, status_code, payload=None, headers=None):
+        self.status_code = status_code
+        self.payload = payload
+        self.headers = headers or {}
+        self.text = str(payload)
+
+    def json(self):
+        return self.payload
+
+
+class FakeSession:
+    def __init__(self, responses):
+        self.responses = responses
+        self.calls = []
+        self.headers = []
+
+    def get(self, url, params=None, headers=None, timeout=None):
+        self.calls.append(url)
+        self.headers.append(headers)
+        response = self.responses[url].pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+def test_async_ticker_fetch_retries_rate_limited_pair():
+    """
+    Tickers are fetched concurrently and a 429 response is retried after Retry-After.
+    """
+    base_url = "https://example.test/api/v2"
+    http_handler = AsyncHTTPHandler(
+        base_url=base_url, tracked_currency_pairs=["btcusd", "xrpusd"],
+        governor=RateGovernor(rate=1000, capacity=10))
+    http_handler.session = FakeSession({
+        f"{base_url}/ticker/btcusd/": [FakeResponse(429, headers={"Retry-After": "0.05"}),
+                                        FakeResponse(200, {"last": "27200.00"})],
+        f"{base_url}/ticker/xrpusd/": [FakeResponse(200, {"last": "0.52"})],
+    })
+
+    tickers = asyncio.run(http_handler.fetch_ticker_info(["btcusd", "xrpusd"]))
+
+    assert tickers == {"btcusd": {"last": "27200.00"}, "xrpusd": {"last": "0.52"}}
+    assert len(http_handler.session.calls) == 3
+
+
+def test_bulk_ticker_fetch_falls_back_for_missing_pairs():
+    """
+    Bulk mode makes one /ticker/ request and only asks for missing pairs individually.
+    """
+    base_url = "https://example.test/api/v2"
+    http_handler = AsyncHTTPHandler(
+        base_url=base_url, tracked_currency_pairs=["btcusd", "xrpusd", "xdcusd"],
+        governor=RateGovernor(rate=1000, capacity=10))
+    http_handler.session = FakeSession({
+        f"{base_url}/ticker/": [FakeResponse(200, [
+            {"pair": "BTC/USD", "last": "27200.00"},
+            {"pair": "XRP/USD", "last": "0.52"},
+            {"pair": "ETH/USD", "last": "1600.00"},
+        ])],
+        f"{base_url}/ticker/xdcusd/": [FakeResponse(200, {"last": "0.04"})],
+    })
+
+    tickers = asyncio.run(http_handler.fetch_ticker_info(
+        ["btcusd", "xrpusd", "xdcusd"], bulk=True))
+
+    assert sorted(tickers) == ["btcusd", "xdcusd", "xrpusd"]
+    assert tickers["xrpusd"]["last"] == "0.52"
+    assert http_handler.session.calls == [f"{base_url}/ticker/", f"{base_url}/ticker/xdcusd/"]
+
+
+def test_currency_metadata_is_cached_and_revalidated():
+    """
+    Currency metadata is served from the cache within the TTL, survives a restart through
+    the cache file, and is revalidated with the ETag afterwards.
+    """
+    base_url = "https://example.test/api/v2"
+    url = f"{base_url}/currencies/"
+    currencies = [{"currency": "BTC", "logo": "btc.svg"}, {"currency": "XRP", "logo": "xrp.svg"}]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "metadata_cache.json")
+        http_handler = AsyncHTTPHandler(
+            base_url=base_url, tracked_currency_pairs=["btcusd", "xlmusd"],
+            governor=RateGovernor(rate=1000, capacity=10),
+            metadata_cache=MetadataCache(path, ttl=3600))
+        http_handler.session = FakeSession({url: [FakeResponse(200, currencies, {"ETag": '"v1"'})]})
+
+        filtered, _, unmatched = asyncio.run(http_handler.fetch_currencies_with_logo())
+        assert filtered == [currencies[0]] and unmatched == ["xlmusd"]
+        metadata = asyncio.run(http_handler.fetch_currency_metadata())
+        assert metadata["XRP"]["logo"] == "xrp.svg"
+        assert http_handler.session.calls == [url]
+
+        # Restart with an expired TTL: one conditional request, answered with 304
+        restarted = AsyncHTTPHandler(
+            base_url=base_url, tracked_currency_pairs=["btcusd"],
+            governor=RateGovernor(rate=1000, capacity=10),
+            metadata_cache=MetadataCache(path, ttl=0))
+        restarted.session = FakeSession({url: [FakeResponse(304)]})
+        assert asyncio.run(restarted.fetch_currency_metadata())["BTC"]["logo"] == "btc.svg"
+        assert restarted.session.headers == [{"If-None-Match": '"v1"'}]
+
+
+def test_currency_metadata_served_stale_when_unreachable():
+    """
+    When Bitstamp cannot be reached, the expired cached list is served instead of raising,
+    in both the blocking and the async client.
+    """
+    import requests
+
+    base_url = "https://example.test/api/v2"
+    url = f"{base_url}/currencies/"
+    currencies = [{"currency": "BTC", "logo": "btc.svg"}]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = MetadataCache(os.path.join(tmp, "metadata_cache.json"), ttl=0)
+        cache.store(url, currencies, {})
+
+        http_handler = HTTPHandler(base_url=base_url, tracked_currency_pairs=["btcusd"],
+                                   metadata_cache=cache)
+        http_handler.session = FakeSession({url: [requests.ConnectionError("unreachable")]})
+        assert http_handler.fetch_currency_metadata()["BTC"]["logo"] == "btc.svg"
+
+        async_handler = AsyncHTTPHandler(base_url=base_url, tracked_currency_pairs=["btcusd"],
+                                         governor=RateGovernor(rate=1000, capacity=10),
+                                         metadata_cache=cache)
+        async_handler.session = FakeSession({url: [requests.Timeout("timed out")]})
+        filtered, _, _ = asyncio.run(async_handler.fetch_currencies_with_logo())
+        assert filtered == currencies
+
+
 if __name__ == "__main__":
     test_fetch_currencies_with_logo()
+    test_async_ticker_fetch_retries_rate_limited_pair()
+    test_bulk_ticker_fetch_falls_back_for_missing_pairs()
+    test_currency_metadata_is_cached_and_revalidated()
+    test_currency_metadata_served_stale_when_unreachable()
 
 # Test the write method for OHLC data to InfluxDB
 
@@ -1,3 +1,8 @@
+from datetime import datetime, timezone
+import numpy as np
+import tempfile
+import threading
+from influxdb_client.client.flux_table import FluxRecord, FluxTable
 from http_handler import HTTPHandler
 from influxdb_handler import InfluxDBHandler
 import time
@@ -64,5 +69,226 @@ def test_ticker_to_influxdb():
             pair, data, timestamp, metadata=metadata)
 
 
+class FakeQueryApi:
+    def __init__(self, rows, csv_rows=None):
+        self.rows = rows
+        self.csv_rows = csv_rows or []
+        self.queries = []
+
+    def query_csv(self, query_string, dialect=None):
+        self.queries.append(query_string)
+        return iter(self.csv_rows)
+
+    def query_stream(self, query_string):
+        self.queries.append(query_string)
+        for table in self.query(query_string):
+            yield from table.records
+
+    def query(self, query_string):
+        self.queries.append(query_string)
+        table = FluxTable()
+        for measurement, pair, when, value in self.rows:
+            table.records.append(FluxRecord(0, {
+                "_measurement": measurement, "currency_pair": pair,
+                "_time": when, "_value": value}))
+        return [table]
+
+
+def test_last_timestamps_single_query():
+    """
+    The latest point for every pair comes back from one Flux query as a compact mapping.
+    """
+    influxdb_handler = InfluxDBHandler(
+        websocket_url="http://localhost:8086", ohlc_url="http://localhost:8086",
+        token="token", org="org")
+    query_api = FakeQueryApi([
+        ("crypto_history", "btcusd", datetime(2024, 1, 1, tzinfo=timezone.utc), 42000.0),
+        ("crypto_history", "xrpusd", datetime(2024, 1, 2, tzinfo=timezone.utc), 0.6),
+    ])
+    influxdb_handler.ohlc_client.query_api = lambda: query_api
+
+    assert influxdb_handler.last_timestamps(["btcusd", "xrpusd", "xlmusd"]) == {
+        "btcusd": 1704067200, "xrpusd": 1704153600}
+    assert influxdb_handler.last_timestamps(["btcusd"], with_value=True)["btcusd"] == (
+        1704067200, 42000.0)
+    assert influxdb_handler.last_timestamps(
+        ["btcusd"], measurements=["crypto_history"])[("crypto_history", "btcusd")] == 1704067200
+    assert len(query_api.queries) == 3
+    assert '["btcusd", "xrpusd", "xlmusd"]' in query_api.queries[0]
+    influxdb_handler.close()
+
+
+def test_point_times_per_pair():
+    """
+    Stored point times come back as one set of Unix seconds per pair, e.g., to find the hours
+    without a snapshot.
+    """
+    influxdb_handler = InfluxDBHandler(
+        websocket_url="http://localhost:8086", ohlc_url="http://localhost:8086",
+        token="token", org="org")
+    query_api = FakeQueryApi([
+        ("crypto_snapshot", "btcusd", datetime(2024, 1, 1, 1, tzinfo=timezone.utc), 42000.0),
+        ("crypto_snapshot", "btcusd", datetime(2024, 1, 1, 3, tzinfo=timezone.utc), 42100.0),
+    ])
+    influxdb_handler.ohlc_client.query_api = lambda: query_api
+
+    assert influxdb_handler.point_times(["btcusd", "xrpusd"], "crypto_snapshot", 1704067200,
+                                        bucket="crypto_snapshots", field="last") == {
+        "btcusd": {1704070800, 1704078000}}
+    assert 'r._measurement == "crypto_snapshot" and r._field == "last"' in query_api.queries[0]
+    influxdb_handler.close()
+
+
+# Flux annotated CSV as returned with Dialect(header=True, annotations=["datatype"])
+CSV_ROWS = [
+    ["#datatype", "string", "long", "dateTime:RFC3339", "dateTime:RFC3339", "dateTime:RFC3339",
+     "double", "string", "string"],
+    ["", "result", "table", "_start", "_stop", "_time", "_value", "_field", "currency_pair"],
+    ["", "_result", "0", "2024-01-01T00:00:00Z", "2024-01-02T00:00:00Z",
+     "2024-01-01T00:00:00Z", "42000.5", "close", "btcusd"],
+    ["", "_result", "0", "2024-01-01T00:00:00Z", "2024-01-02T00:00:00Z",
+     "2024-01-01T01:00:00.5Z", "", "close", "btcusd"],
+    [],
+    ["#datatype", "string", "long", "dateTime:RFC3339", "dateTime:RFC3339", "dateTime:RFC3339",
+     "long", "string", "string"],
+    ["", "result", "table", "_start", "_stop", "_time", "_value", "_field", "currency_pair"],
+    ["", "_result", "1", "2024-01-01T00:00:00Z", "2024-01-02T00:00:00Z",
+     "2024-01-01T00:00:00Z", "12", "trade_count", "btcusd"],
+]
+
+
+def test_query_columns_and_stream():
+    """
+    Columnar queries return typed NumPy arrays per field; streaming yields record values and
+    raises on errors.
+    """
+    influxdb_handler = InfluxDBHandler(
+        websocket_url="http://localhost:8086", ohlc_url="http://localhost:8086",
+        token="token", org="org")
+    query_api = FakeQueryApi([
+        ("crypto_history", "btcusd", datetime(2024, 1, 1, tzinfo=timezone.utc), 42000.0),
+    ], csv_rows=CSV_ROWS)
+    influxdb_handler.ohlc_client.query_api = lambda: query_api
+
+    columns = influxdb_handler.query_columns("from(bucket: \"crypto_history\")")
+    assert sorted(columns) == ["close", "trade_count"]
+    close = columns["close"]
+    assert sorted(close) == ["_field", "_time", "_value", "currency_pair"]
+    assert str(close["_time"].dtype) == "datetime64[ns]"
+    assert close["_time"][1] == np.datetime64("2024-01-01T01:00:00.500000000")
+    assert close["_value"][0] == 42000.5 and np.isnan(close["_value"][1])
+    assert columns["trade_count"]["_value"].tolist() == [12]
+
+    records = list(influxdb_handler.query_stream("from(bucket: \"crypto_history\")"))
+    assert records[0]["currency_pair"] == "btcusd" and records[0]["_value"] == 42000.0
+
+    # A query failing part way raises instead of ending like a shorter result
+    def failing_stream(query_string):
+        yield from query_api.query(query_string)[0].records
+        raise ConnectionError("connection reset")
+
+    query_api.query_stream = failing_stream
+    stream = influxdb_handler.query_stream("from(bucket: \"crypto_history\")")
+    assert next(stream)["_value"] == 42000.0
+    try:
+        next(stream)
+        assert False, "query_stream ended without raising"
+    except ConnectionError:
+        pass
+    influxdb_handler.close()
+
+
+def test_query_cache():
+    """
+    Cached queries are answered from memory when only whitespace or comments differ.
+    """
+    influxdb_handler = InfluxDBHandler(
+        websocket_url="http://localhost:8086", ohlc_url="http://localhost:8086",
+        token="token", org="org")
+    query_api = FakeQueryApi([
+        ("crypto_history", "btcusd", datetime(2024, 1, 1, tzinfo=timezone.utc), 42000.0),
+    ], csv_rows=CSV_ROWS)
+    influxdb_handler.ohlc_client.query_api = lambda: query_api
+
+    query = 'from(bucket: "crypto_history")\n  |> range(start: 0, stop: 3600)'
+    first = influxdb_handler.query(query, cache=True)
+    assert influxdb_handler.query("// latest\n" + query.replace("\n  ", " "), cache=True) is first
+    assert influxdb_handler.query(query) is not first
+    columns = influxdb_handler.query_columns(query, cache=True)
+    assert influxdb_handler.query_columns(query, cache=True) is columns
+    assert not columns["close"]["_value"].flags.writeable
+    assert len(query_api.queries) == 3
+    influxdb_handler.close()
+
+
+def test_clients_created_on_first_use():
+    """
+    No InfluxDB client exists until one is needed, and buckets on the same URL share one.
+    """
+    influxdb_handler = InfluxDBHandler(websocket_url="http://localhost:8086",
+                                       ohlc_url="http://localhost:8086", token="test", org="test")
+    assert influxdb_handler._clients == {}
+    assert influxdb_handler.ohlc_write_api is influxdb_handler.ws_write_api
+    assert influxdb_handler.ws_client is influxdb_handler.ohlc_client
+    assert len(influxdb_handler._clients) == 1
+    influxdb_handler.close()
+
+    influxdb_handler = InfluxDBHandler(websocket_url="http://localhost:8086",
+                                       ohlc_url="http://localhost:8087", token="test", org="test")
+    assert influxdb_handler.ws_client is not influxdb_handler.ohlc_client
+    influxdb_handler.close()
+
+
+class DownWriteApi:
+    def write(self, bucket, record):
+        raise ConnectionError("influx down")
+
+
+def test_spooled_ohlc_batch_is_not_reported_written():
+    """
+    A backfill batch that only reached the spool does not count as written, so the
+    watermark stays before it.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        influxdb_handler = InfluxDBHandler(
+            websocket_url="http://localhost:8086", ohlc_url="http://localhost:8086",
+            token="token", org="org", spool_dir=tmp)
+        influxdb_handler.ohlc_write_api = DownWriteApi()
+        candle = {"open": 1, "high": 2, "low": 0.5, "close": 1.5, "volume": 3,
+                  "timestamp": "1700000000"}
+        assert influxdb_handler.write_ohlc_batch("btcusd", [candle]) is False
+        assert influxdb_handler.spool.pending()
+        influxdb_handler.close()
+
+
+def test_spool_and_writers_start_on_first_write():
+    """
+    Constructing the handler starts no threads and creates no spool directory; the first
+    live write starts its batch writer and the spool.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        spool_dir = os.path.join(tmp, "spool")
+        threads = threading.active_count()
+        influxdb_handler = InfluxDBHandler(
+            websocket_url="http://localhost:8086", ohlc_url="http://localhost:8086",
+            token="token", org="org", spool_dir=spool_dir, flush_interval=60)
+        assert threading.active_count() == threads and not os.path.exists(spool_dir)
+        assert influxdb_handler.flush(timeout=1)
+
+        influxdb_handler.write_data("btcusd", 100.0, 1700000000000000000)
+        assert list(influxdb_handler._writers) == ["crypto_portfolio"]
+        assert influxdb_handler.spool_replayer is not None and os.path.isdir(spool_dir)
+        influxdb_handler.ws_writer.write_api = DownWriteApi()
+        influxdb_handler.close()
+        assert threading.active_count() == threads
+
+
 if __name__ == "__main__":
     test_ticker_to_influxdb()
+    test_last_timestamps_single_query()
+    test_point_times_per_pair()
+    test_query_columns_and_stream()
+    test_query_cache()
+    test_clients_created_on_first_use()
+    test_spooled_ohlc_batch_is_not_reported_written()
+    test_spool_and_writers_start_on_first_write()
@@ -0,0 +1,156 @@
+import influxdb_client
+from line_protocol import LineProtocolSerializer
+
+
+def test_trade_matches_point():
+    """
+    Trade lines are identical to what influxdb_client.Point produces.
+    """
+    serializer = LineProtocolSerializer()
+    for price in (27200.0, 0.5213, 1e-05, 100):
+        point = influxdb_client.Point("crypto_data") \
+            .tag("currency_pair", "btcusd") \
+            .field("price", float(price)) \
+            .time(1700000000000000000)
+        assert serializer.trade("btcusd", price, 1700000000000000000) == point.to_line_protocol()
+
+
+def test_conflated_trade_matches_point():
+    """
+    Conflated price lines carry the range and tick count alongside the price.
+    """
+    serializer = LineProtocolSerializer()
+    point = influxdb_client.Point("crypto_data") \
+        .tag("currency_pair", "btcusd") \
+        .field("price", 27200.5) \
+        .field("low", 27190.0) \
+        .field("high", 27210.0) \
+        .field("tick_count", 12) \
+        .time(1700000000000000000)
+    assert serializer.conflated_trade("btcusd", 27200.5, 27190, 27210, 12,
+                                      1700000000000000000) == point.to_line_protocol()
+
+
+def test_ohlc_and_candle_match_point():
+    """
+    REST OHLC lines and live candles (own measurement, resolution tag and trade count) match
+    Point.
+    """
+    serializer = LineProtocolSerializer()
+    point = influxdb_client.Point("crypto_history") \
+        .tag("currency_pair", "xrpusd") \
+        .field("open", 0.5) \
+        .field("high", 0.6) \
+        .field("low", 0.45) \
+        .field("close", 0.55) \
+        .field("volume", 12345.0) \
+        .time(1700000000000000000)
+    assert serializer.ohlc("xrpusd", "0.5", "0.6", "0.45", "0.55", "12345",
+                           1700000000000000000) == point.to_line_protocol()
+
+    point = influxdb_client.Point("crypto_candles").tag("currency_pair", "xrpusd") \
+        .field("open", 0.5).field("high", 0.6).field("low", 0.45).field("close", 0.55) \
+        .field("volume", 12345.0).time(1700000000000000000) \
+        .tag("resolution", "1m").field("trade_count", 42)
+    assert serializer.ohlc("xrpusd", 0.5, 0.6, 0.45, 0.55, 12345.0, 1700000000000000000,
+                           resolution="1m", trades=42) == point.to_line_protocol()
+
+
+def test_snapshot_matches_point():
+    """
+    Snapshot lines, with and without a trade count, match Point.
+    """
+    serializer = LineProtocolSerializer()
+    point = influxdb_client.Point("crypto_snapshot") \
+        .tag("currency_pair", "btcusd") \
+        .field("open", 100.0) \
+        .field("high", 110.0) \
+        .field("low", 95.0) \
+        .field("last", 105.0) \
+        .field("vwap", 102.5) \
+        .field("volume", 3.0) \
+        .time(1700003600000000000)
+    assert serializer.snapshot("btcusd", 1700003600000000000, 100, 110, 95, 105, 102.5,
+                               3) == point.to_line_protocol()
+
+    point = point.field("trade_count", 7)
+    assert serializer.snapshot("btcusd", 1700003600000000000, 100.0, 110.0, 95.0, 105.0,
+                               102.5, 3.0, trades=7) == point.to_line_protocol()
+
+
+def test_portfolio_lines_match_point():
+    """
+    Portfolio valuation lines for the total, assets and accounts match Point.
+    """
+    serializer = LineProtocolSerializer()
+    lines = serializer.portfolio(1700000000000000000, 30600.0,
+                                 {"BTC": (0.75, 40000.0, 30000.0)}, {"ledger": 20500.0})
+    points = [
+        influxdb_client.Point("portfolio_value").tag("scope", "total").field("value", 30600.0),
+        influxdb_client.Point("portfolio_value").tag("scope", "asset").tag("asset", "BTC")
+        .field("units", 0.75).field("price", 40000.0).field("value", 30000.0),
+        influxdb_client.Point("portfolio_value").tag("scope", "account").tag("account", "ledger")
+        .field("value", 20500.0),
+    ]
+    assert lines == [point.time(1700000000000000000).to_line_protocol() for point in points]
+
+
+def test_ticker_with_metadata_escapes_tags():
+    """
+    Ticker metadata tags are escaped exactly like Point escapes them.
+    """
+    serializer = LineProtocolSerializer()
+    ticker = {"open": "27100.00", "high": "27300.00", "low": "26950.00",
+              "last": "27200.00", "volume": "120.5"}
+    metadata = {"name": "Bitcoin Cash, Classic", "symbol": "BCH", "type": "crypto",
+                "logo": "https://example.test/logo=1.svg", "available_supply": "21000000"}
+    point = influxdb_client.Point("crypto_ticker") \
+        .tag("currency_pair", "bchusd") \
+        .field("open", 27100.0) \
+        .field("high", 27300.0) \
+        .field("low", 26950.0) \
+        .field("last", 27200.0) \
+        .field("volume", 120.5) \
+        .tag("name", metadata["name"]) \
+        .tag("symbol", metadata["symbol"]) \
+        .tag("logo_url", metadata["logo"]) \
+        .tag("type", metadata["type"]) \
+        .field("available_supply", 21000000.0) \
+        .time(1700000000000000000)
+
+    assert serializer.ticker("bchusd", ticker, 1700000000000000000,
+                             metadata) == point.to_line_protocol()
+
+
+def test_non_finite_fields_are_skipped():
+    """
+    NaN and infinite fields are left out like Point leaves them out, and a line without any
+    field left is dropped rather than sent (InfluxDB would reject the whole batch).
+    """
+    serializer = LineProtocolSerializer()
+    nan, inf = float("nan"), float("inf")
+    point = influxdb_client.Point("crypto_data").tag("currency_pair", "btcusd") \
+        .field("price", nan).time(1)
+    assert point.to_line_protocol() == ""
+    assert serializer.trade("btcusd", nan, 1) is None
+    assert serializer.conflated_trade("btcusd", inf, 1, 2, 3, 1) is None
+
+    point = influxdb_client.Point("crypto_history").tag("currency_pair", "xrpusd") \
+        .field("open", 0.5).field("high", inf).field("low", 0.45).field("close", nan) \
+        .field("volume", 10.0).time(1)
+    assert serializer.ohlc("xrpusd", 0.5, "inf", 0.45, "nan", 10, 1) == point.to_line_protocol()
+    assert serializer.snapshot("btcusd", 1, nan, nan, nan, nan, nan, nan) is None
+
+    lines = serializer.portfolio(1, nan, {"BTC": (nan, nan, nan)}, {"ledger": 5.0})
+    assert lines == [influxdb_client.Point("portfolio_value").tag("scope", "account")
+                     .tag("account", "ledger").field("value", 5.0).time(1).to_line_protocol()]
+
+
+if __name__ == "__main__":
+    test_trade_matches_point()
+    test_conflated_trade_matches_point()
+    test_ohlc_and_candle_match_point()
+    test_snapshot_matches_point()
+    test_portfolio_lines_match_point()
+    test_ticker_with_metadata_escapes_tags()
+    test_non_finite_fields_are_skipped()
@@ -0,0 +1,35 @@
+import json
+from message_decoder import TradeDecoder
+
+
+def test_decode_trade_and_skip_other_events():
+    """
+    Trade frames decode to (pair, data); heartbeats and acks are skipped.
+    """
+    decoder = TradeDecoder(["btcusd"])
+    trade = json.dumps({"data": {"price": 27200.5, "timestamp": "1700000000"},
+                        "channel": "live_trades_btcusd", "event": "trade"})
+
+    assert decoder.decode(trade) == (
+        "btcusd", {"price": 27200.5, "timestamp": "1700000000"})
+    assert decoder.decode(trade.encode())[0] == "btcusd"
+    assert decoder.decode('{"event": "bts:heartbeat", "channel": "", "data": {}}') is None
+    assert decoder.decode(json.dumps({"event": "bts:subscription_succeeded",
+                                      "channel": "live_trades_btcusd", "data": {}})) is None
+    assert decoder.skipped == 2
+
+
+def test_unregistered_channel_falls_back_to_channel_name():
+    """
+    Trades on channels that were never registered still resolve to their pair.
+    """
+    decoder = TradeDecoder()
+    trade = json.dumps({"data": {}, "channel": "live_trades_hbarusd", "event": "trade"})
+
+    assert decoder.decode(trade)[0] == "hbarusd"
+    assert decoder.channel_pairs == {"live_trades_hbarusd": "hbarusd"}
+
+
+if __name__ == "__main__":
+    test_decode_trade_and_skip_other_events()
+    test_unregistered_channel_falls_back_to_channel_name()
@@ -0,0 +1,141 @@
+import asyncio
+import json
+from message_pipeline import MessagePipeline, channel_of
+
+
+def trade_frame(pair, price):
+    return json.dumps({
+        "data": {"price": price, "timestamp": "1700000000"},
+        "channel": f"live_trades_{pair}",
+        "event": "trade",
+    })
+
+
+def test_channel_of():
+    """
+    The channel is extracted from a raw frame without parsing it.
+    """
+    assert channel_of(trade_frame("btcusd", 1)) == "live_trades_btcusd"
+    assert channel_of('{"event": "bts:heartbeat"}') is None
+
+
+def test_block_delivers_everything_in_order():
+    """
+    With one worker and the block policy every frame is handled in order.
+    """
+    async def run():
+        handled = []
+
+        async def handler(message):
+            handled.append(json.loads(message)["data"]["price"])
+
+        pipeline = MessagePipeline(maxsize=2, workers=1, overflow="block")
+        pipeline.start(handler)
+        for price in range(10):
+            await pipeline.put(trade_frame("btcusd", price))
+        await pipeline.stop()
+        return handled, pipeline.stats()
+
+    handled, stats = asyncio.run(run())
+    assert handled == list(range(10))
+    assert stats["processed"] == 10 and stats["dropped"] == 0
+
+
+def test_drop_oldest_counts_drops():
+    """
+    When the queue is full the oldest frame is discarded and counted.
+    """
+    async def run():
+        pipeline = MessagePipeline(maxsize=3, overflow="drop_oldest")
+        for price in range(5):
+            await pipeline.put(trade_frame("btcusd", price))
+        handled = []
+
+        async def handler(message):
+            handled.append(json.loads(message)["data"]["price"])
+
+        pipeline.start(handler)
+        await pipeline.stop()
+        return handled, pipeline.stats()
+
+    handled, stats = asyncio.run(run())
+    assert handled == [2, 3, 4]
+    assert stats["dropped"] == 2 and stats["received"] == 5
+
+
+def test_conflate_passes_everything_while_there_is_room():
+    """
+    The conflate policy hands every frame over unchanged while the queue has room.
+    """
+    async def run():
+        pipeline = MessagePipeline(maxsize=10, overflow="conflate")
+        frames = [trade_frame("btcusd", 1), trade_frame("ethusd", 10), trade_frame("btcusd", 2),
+                  '{"event": "bts:heartbeat"}', trade_frame("btcusd", 3)]
+        for frame in frames:
+            await pipeline.put(frame)
+        handled = []
+
+        async def handler(message):
+            handled.append(message)
+
+        pipeline.start(handler)
+        await pipeline.stop()
+        return frames, handled, pipeline.stats()
+
+    frames, handled, stats = asyncio.run(run())
+    assert handled == frames
+    assert stats["conflated"] == 0
+
+
+def test_conflate_replaces_trades_queued_by_an_overflow():
+    """
+    Once the queue is full, a trade replaces its channel's trade queued by the overflow; a
+    trade queued after that one closes the slot, so the pair's trades stay in order.
+    """
+    async def run():
+        handled = []
+        tokens = asyncio.Queue()
+
+        async def handler(message):
+            handled.append(json.loads(message).get("data", {}).get("price"))
+            await tokens.get()
+
+        async def settle():
+            for _ in range(5):
+                await asyncio.sleep(0)
+
+        pipeline = MessagePipeline(maxsize=2, overflow="conflate")
+        pipeline.start(handler)
+        await pipeline.put(trade_frame("btcusd", 1))
+        await settle()  # The worker holds btcusd 1
+        await pipeline.put(trade_frame("ethusd", 10))
+        await pipeline.put('{"event": "bts:heartbeat"}')
+        put = asyncio.create_task(pipeline.put(trade_frame("btcusd", 2)))  # Full: waits
+        await settle()
+        tokens.put_nowait(None)
+        await put  # Queued: heartbeat, btcusd 2
+
+        await pipeline.put(trade_frame("btcusd", 3))
+        await pipeline.put(trade_frame("btcusd", 4))
+        tokens.put_nowait(None)
+        await settle()  # Queued: btcusd 4
+        await pipeline.put(trade_frame("btcusd", 5))  # Closes the slot of btcusd 4
+        put = asyncio.create_task(pipeline.put(trade_frame("btcusd", 6)))  # Full: waits
+        await settle()
+        for _ in range(10):
+            tokens.put_nowait(None)
+        await put
+        await pipeline.stop()
+        return handled, pipeline.stats()
+
+    handled, stats = asyncio.run(run())
+    assert handled == [1, 10, None, 4, 5, 6]
+    assert stats["conflated"] == 2 and stats["processed"] == 6
+
+
+if __name__ == "__main__":
+    test_channel_of()
+    test_block_delivers_everything_in_order()
+    test_drop_oldest_counts_drops()
+    test_conflate_passes_everything_while_there_is_room()
+    test_conflate_replaces_trades_queued_by_an_overflow()
@@ -0,0 +1,86 @@
+import asyncio
+import urllib.request
+from metrics import Metrics, Histogram, TimedWriteApi
+
+
+def test_histogram_buckets_are_cumulative():
+    """
+    Observations land in the first bucket whose bound is >= the value.
+    """
+    histogram = Histogram("test_seconds", "Test.", (0.1, 1))
+    for value in (0.05, 0.1, 0.5, 2):
+        histogram.observe(value)
+
+    lines = histogram.render()
+    assert 'test_seconds_bucket{le="0.1"} 2' in lines
+    assert 'test_seconds_bucket{le="1"} 3' in lines
+    assert 'test_seconds_bucket{le="+Inf"} 4' in lines
+    assert "test_seconds_count 4" in lines
+    assert histogram.count() == 4
+
+
+class RecordingWriteApi:
+    def __init__(self):
+        self.records = []
+
+    def write(self, bucket, record):
+        self.records.append((bucket, record))
+
+
+def test_write_and_trade_instrumentation():
+    """
+    Write latency is recorded per bucket and written trades are counted per pair, conflated
+    lines by their tick count.
+    """
+    metrics = Metrics()
+    write_api = TimedWriteApi(RecordingWriteApi(), metrics.write_latency)
+    batch = ["crypto_data,currency_pair=btcusd price=1 1",
+             "crypto_data,currency_pair=btcusd price=2 2",
+             "crypto_data,currency_pair=xrpusd price=3 3",
+             "crypto_data,currency_pair=xrpusd high=3,low=2,price=3,tick_count=12i 4"]
+    write_api.write(bucket="crypto_portfolio", record="\n".join(batch))
+    metrics.batch_written("crypto_portfolio", batch)
+    metrics.frame_decoded(0.00002, "btcusd")
+    metrics.frame_decoded(0.00001)
+
+    assert metrics.write_latency.count("crypto_portfolio") == 1
+    assert metrics.trades_written.value("btcusd") == 2
+    assert metrics.trades_written.value("xrpusd") == 13
+    assert metrics.messages_received.value("btcusd") == 1
+    assert metrics.decode_latency.count() == 2
+
+    text = metrics.render()
+    assert 'ingest_trades_written_total{currency_pair="btcusd"} 2' in text
+    assert 'ingest_seconds_since_last_trade{currency_pair="btcusd"}' in text
+    assert "ingest_websocket_reconnects_total 0" in text
+
+
+def test_metrics_endpoint_and_loop_lag():
+    """
+    The endpoint serves the exposition, including loop lag samples and gauges.
+    """
+    metrics = Metrics()
+    metrics.add_gauge("ingest_pipeline_queue_depth", "Queue depth.", lambda: 7)
+
+    async def sample_loop_lag():
+        task = asyncio.create_task(metrics.monitor_loop_lag(interval=0.01))
+        await asyncio.sleep(0.1)
+        task.cancel()
+
+    asyncio.run(sample_loop_lag())
+    port = metrics.start_server(0)
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5) as response:
+            text = response.read().decode()
+    finally:
+        metrics.stop_server()
+
+    assert "ingest_pipeline_queue_depth 7" in text
+    assert metrics.loop_lag.count() > 0
+    assert "ingest_event_loop_lag_seconds_count" in text
+
+
+if __name__ == "__main__":
+    test_histogram_buckets_are_cumulative()
+    test_write_and_trade_instrumentation()
+    test_metrics_endpoint_and_loop_lag()
@@ -0,0 +1,104 @@
+import asyncio
+import os
+import tempfile
+from ohlc_backfill import OHLCBackfiller
+from watermark_store import WatermarkStore
+
+STEP = 3600
+
+
+class FakeHTTPHandler:
+    def __init__(self):
+        self.requests = []
+
+    async def fetch_ohlc(self, currency_pair, step, limit, start=None, end=None):
+        self.requests.append((currency_pair, limit, end))
+        return [{"timestamp": str(end - i * step), "open": "1", "high": "2",
+                 "low": "0.5", "close": "1.5", "volume": "10"} for i in range(limit)]
+
+
+class FakeInfluxDBHandler:
+    def __init__(self, fail_after=None):
+        self.fail_after = fail_after
+        self.written = []
+
+    def write_ohlc_batch(self, currency_pair, candles):
+        if self.fail_after is not None and len(self.written) >= self.fail_after:
+            return False
+        self.written.append((currency_pair, len(candles)))
+        return True
+
+
+def test_windows_cover_range():
+    """
+    The range is split into aligned windows of at most `limit` candles.
+    """
+    backfiller = OHLCBackfiller(None, None, None, step=STEP, limit=10)
+    windows = backfiller.windows(0, 25 * STEP + 5)
+
+    assert windows == [(0, 9 * STEP), (10 * STEP, 19 * STEP), (20 * STEP, 25 * STEP)]
+
+
+def test_backfill_writes_every_candle_and_resumes():
+    """
+    All windows are fetched and written, and a second run resumes after the watermark.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "watermarks.db")
+        http_handler = FakeHTTPHandler()
+        backfiller = OHLCBackfiller(http_handler, FakeInfluxDBHandler(), WatermarkStore(path),
+                                    step=STEP, limit=10)
+        written = asyncio.run(backfiller.run(["btcusd", "xrpusd"], 0, 24 * STEP))
+
+        assert written == {"btcusd": 25, "xrpusd": 25}
+        assert backfiller.last_completed("btcusd") == 24 * STEP
+
+        # A fresh instance picks up the watermark and only fetches the new candles
+        http_handler = FakeHTTPHandler()
+        backfiller = OHLCBackfiller(http_handler, FakeInfluxDBHandler(), WatermarkStore(path),
+                                    step=STEP, limit=10)
+        written = asyncio.run(backfiller.run(["btcusd"], 0, 26 * STEP))
+
+        assert written == {"btcusd": 2}
+        assert http_handler.requests == [("btcusd", 2, 26 * STEP)]
+
+
+def test_failed_write_does_not_advance_watermark():
+    """
+    The watermark only covers windows that were written contiguously from the start.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        watermarks = WatermarkStore(os.path.join(tmp, "watermarks.db"))
+        backfiller = OHLCBackfiller(FakeHTTPHandler(), FakeInfluxDBHandler(fail_after=0),
+                                    watermarks, step=STEP, limit=10)
+        asyncio.run(backfiller.run(["btcusd"], 0, 24 * STEP))
+
+        assert backfiller.last_completed("btcusd") is None
+
+
+def test_watermark_store_persists_and_never_moves_backwards():
+    """
+    Watermarks survive reopening the store and only ever advance.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "watermarks.db")
+        watermarks = WatermarkStore(path)
+        assert watermarks.created
+
+        watermarks.advance_many(STEP, {"btcusd": 10 * STEP, "xrpusd": 5 * STEP})
+        watermarks.advance("btcusd", STEP, 7 * STEP)
+        watermarks.advance("btcusd", 60, 99)
+        watermarks.close()
+
+        reopened = WatermarkStore(path)
+        assert not reopened.created
+        assert reopened.get_all(STEP) == {"btcusd": 10 * STEP, "xrpusd": 5 * STEP}
+        assert reopened.get("btcusd", 60) == 99
+        assert reopened.get("ethusd", STEP) is None
+
+
+if __name__ == "__main__":
+    test_windows_cover_range()
+    test_backfill_writes_every_candle_and_resumes()
+    test_failed_write_does_not_advance_watermark()
+    test_watermark_store_persists_and_never_moves_backwards()
@@ -0,0 +1,102 @@
+import asyncio
+import json
+import os
+import tempfile
+from websockets.asyncio.server import serve
+from pair_registry import PairRegistry
+from websocket_client import WebSocketClient
+
+TRADING_PAIRS = [
+    {"name": "BTC/USD", "url_symbol": "btcusd", "trading": "Enabled"},
+    {"name": "ETH/USD", "url_symbol": "ethusd", "trading": "Enabled"},
+    {"name": "BTC/EUR", "url_symbol": "btceur", "trading": "Enabled"},
+    {"name": "OLD/USD", "url_symbol": "oldusd", "trading": "Disabled"},
+    {"name": "DOGE/USD", "url_symbol": "dogeusd", "trading": "Enabled"},
+]
+
+
+class FakeHTTPHandler:
+    async def fetch_trading_pairs(self):
+        return TRADING_PAIRS
+
+    async def fetch_ticker_info(self, currency_pairs, bulk=False):
+        volumes = {"btcusd": ("10", "60000"), "ethusd": ("100", "3000"), "dogeusd": ("1000", "0.1")}
+        return {pair: {"volume": volumes[pair][0], "last": volumes[pair][1]}
+                for pair in currency_pairs if pair in volumes}
+
+
+def test_registry_filters_and_hot_reloads_config():
+    """
+    Pairs follow the config file, which is re-read on every refresh.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "pairs.json")
+        registry = PairRegistry(FakeHTTPHandler(), default_pairs=["btcusd", "xrpusd"],
+                                config_path=path)
+
+        # No config file: every enabled pair from the trading pairs info is tracked
+        assert registry.pairs == ["btcusd", "xrpusd"]
+        assert asyncio.run(registry.refresh()) == (["ethusd", "btceur", "dogeusd"], ["xrpusd"])
+        assert registry.pairs == ["btcusd", "ethusd", "btceur", "dogeusd"]
+
+        with open(path, "w") as f:
+            json.dump({"quote_currencies": ["usd"], "min_volume": 1000,
+                       "include": ["xrpusd"], "exclude": ["ethusd"]}, f)
+        added, removed = asyncio.run(registry.refresh())
+        assert registry.pairs == ["btcusd", "xrpusd"]
+        assert (added, removed) == (["xrpusd"], ["ethusd", "btceur", "dogeusd"])
+
+        with open(path, "w") as f:
+            json.dump({"quote_currencies": ["usd"]}, f)
+        added, removed = asyncio.run(registry.refresh())
+        assert registry.pairs == ["btcusd", "ethusd", "dogeusd"]
+        assert (added, removed) == (["ethusd", "dogeusd"], ["xrpusd"])
+
+        # A broken config keeps the current pairs
+        with open(path, "w") as f:
+            f.write("{not json")
+        assert asyncio.run(registry.refresh()) == ([], [])
+        assert registry.pairs == ["btcusd", "ethusd", "dogeusd"]
+
+
+def test_pairs_are_added_and_removed_on_the_open_connection():
+    """
+    Adds and removes are sent as subscribe/unsubscribe requests without reconnecting.
+    """
+    async def run():
+        requests = []
+        connections = []
+
+        async def server_handler(connection):
+            connections.append(connection)
+            async for message in connection:
+                request = json.loads(message)
+                requests.append((request["event"], request["data"]["channel"]))
+
+        async def handler(message):
+            pass
+
+        async with serve(server_handler, "127.0.0.1", 0) as server:
+            port = server.sockets[0].getsockname()[1]
+            client = WebSocketClient(f"ws://127.0.0.1:{port}", ["btcusd"])
+            listener = asyncio.create_task(client.listen(handler))
+            while not requests:
+                await asyncio.sleep(0.01)
+            assert await client.add_pairs(["btcusd", "ethusd"]) == ["ethusd"]
+            assert await client.remove_pairs(["btcusd"]) == ["btcusd"]
+            await asyncio.sleep(0.1)
+            listener.cancel()
+            await asyncio.gather(listener, return_exceptions=True)
+        return requests, len(connections), client.currency_pairs
+
+    requests, connections, pairs = asyncio.run(run())
+    assert requests == [("bts:subscribe", "live_trades_btcusd"),
+                        ("bts:subscribe", "live_trades_ethusd"),
+                        ("bts:unsubscribe", "live_trades_btcusd")]
+    assert connections == 1
+    assert pairs == ["ethusd"]
+
+
+if __name__ == "__main__":
+    test_registry_filters_and_hot_reloads_config()
+    test_pairs_are_added_and_removed_on_the_open_connection()
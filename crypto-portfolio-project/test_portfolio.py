@@ -0,0 +1,118 @@
+import json
+import os
+import tempfile
+import numpy as np
+from portfolio import Portfolio
+
+HOLDINGS = {
+    "accounts": {
+        "ledger": {"BTC": 0.5, "XRP": 1000},
+        "bitstamp": {"btc": 0.25, "USD": 100},
+    }
+}
+
+
+def make_portfolio(min_interval=1.0):
+    valuations = []
+    portfolio = Portfolio(None, on_valuation=lambda *v: valuations.append(v),
+                          min_interval=min_interval)
+    portfolio.load(HOLDINGS)
+    return portfolio, valuations
+
+
+def test_trades_update_value_incrementally():
+    """
+    Each trade revalues its holding; totals include cash and split per asset and account.
+    """
+    portfolio, valuations = make_portfolio()
+    assert portfolio.pairs == ["btcusd", "xrpusd"]
+    assert portfolio.total == 100.0
+    assert portfolio.unpriced_pairs() == ["btcusd", "xrpusd"]
+
+    portfolio.on_trade("btcusd", 40000.0, 10)
+    portfolio.on_trade("xrpusd", 0.5, 10)
+    portfolio.on_trade("ethusd", 2000.0, 10)  # Not held
+    assert portfolio.total == 0.75 * 40000 + 1000 * 0.5 + 100
+
+    total, assets, accounts = portfolio.valuation()
+    assert total == 30600.0
+    assert assets == {"BTC": (0.75, 40000.0, 30000.0), "XRP": (1000.0, 0.5, 500.0)}
+    assert accounts == {"ledger": 20500.0, "bitstamp": 10100.0}
+
+
+def test_valuations_are_throttled():
+    """
+    At most one valuation point is emitted per min_interval of trade time.
+    """
+    portfolio, valuations = make_portfolio(min_interval=5)
+    for second in range(12):
+        portfolio.on_trade("btcusd", 40000.0 + second, second)
+    assert [valuation[0] for valuation in valuations] == [0, 5, 10]
+    assert valuations[-1][1] == 0.75 * 40010 + 100
+
+
+def test_late_trades_keep_the_latest_price():
+    """
+    A recovered trade older than the last one does not roll the holding back.
+    """
+    portfolio, valuations = make_portfolio()
+    portfolio.on_trade("btcusd", 40000.0, 100)
+    portfolio.on_trade("btcusd", 39000.0, 50)  # Replayed by gap repair
+    assert portfolio.prices[portfolio.index["btcusd"]] == 40000.0
+    assert portfolio.total == 0.75 * 40000 + 100
+    portfolio.on_trade("btcusd", 41000.0, 100)  # Same second as the last trade
+    assert portfolio.total == 0.75 * 41000 + 100
+    assert [valuation[0] for valuation in valuations] == [100]
+
+
+def test_reload_keeps_known_prices():
+    """
+    Editing the holdings file is picked up by reload; prices of pairs still held are kept.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "holdings.json")
+        with open(path, "w") as f:
+            json.dump(HOLDINGS, f)
+        portfolio = Portfolio(path)
+        assert portfolio.reload()
+        assert not portfolio.reload()
+        portfolio.on_trade("btcusd", 40000.0, 0)
+
+        with open(path, "w") as f:
+            json.dump({"accounts": {"ledger": {"BTC": 1, "ETH": 2}}}, f)
+        os.utime(path, (1, 1))
+        assert portfolio.reload()
+        assert portfolio.pairs == ["btcusd", "ethusd"]
+        assert portfolio.total == 40000.0
+
+        with open(path, "w") as f:
+            f.write("{not json")
+        os.utime(path, (2, 2))
+        assert not portfolio.reload()
+        assert portfolio.pairs == ["btcusd", "ethusd"]
+
+
+def test_history_carries_prices_forward():
+    """
+    Historical value is computed over the union of candle times with missing closes filled.
+    """
+    portfolio, _ = make_portfolio()
+    candles = {
+        "btcusd": [{"timestamp": 0, "close": 100.0}, {"timestamp": 7200, "close": 200.0}],
+        "xrpusd": [{"timestamp": 3600, "close": 1.0}],
+        "ethusd": [{"timestamp": 0, "close": 5.0}],
+    }
+    timestamps, prices, totals, asset_values, account_values = portfolio.history(candles)
+    assert timestamps.tolist() == [0, 3600, 7200]
+    assert prices.tolist() == [[100.0, 0.0], [100.0, 1.0], [200.0, 1.0]]
+    assert np.allclose(totals, [175.0, 1175.0, 1250.0])
+    assert np.allclose(asset_values[:, 1], [0.0, 1000.0, 1000.0])
+    assert np.allclose(account_values[2], [1100.0, 150.0])
+
+
+if __name__ == "__main__":
+    test_trades_update_value_incrementally()
+    test_valuations_are_throttled()
+    test_late_trades_keep_the_latest_price()
+    test_reload_keeps_known_prices()
+    test_history_carries_prices_forward()
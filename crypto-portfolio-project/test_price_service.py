@@ -0,0 +1,112 @@
+import http.client
+import json
+import os
+import socket
+import tempfile
+from price_service import LatestPrices, PriceServer
+
+
+class FakeClock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_latest_state_from_trades_and_ticker():
+    """
+    Trades set the latest price and widen the ticker's 24h range; late trades do not
+    replace the price, and the trade rate slides over the previous minute.
+    """
+    clock = FakeClock(6000.0)
+    prices = LatestPrices(clock=clock)
+    prices.on_ticker("btcusd", {"open_24": "95", "high": "105", "low": "90", "last": "100",
+                                "volume": "12.5", "timestamp": "5990"})
+    assert prices.get("btcusd")["price"] == 100.0
+
+    for second in range(5940, 6000, 6):  # 10 trades in the previous minute
+        prices.on_trade("btcusd", 101.0, second)
+    prices.on_trade("btcusd", 110.0, 6001)
+    prices.on_trade("btcusd", 80.0, 5999)
+
+    clock.now = 6030.0  # Half way through the minute
+    row = prices.get("btcusd")
+    assert row["price"] == 110.0 and row["timestamp"] == 6001
+    assert row["high_24h"] == 110.0 and row["low_24h"] == 80.0
+    assert row["open_24h"] == 95.0 and row["volume_24h"] == 12.5
+    assert round(row["change_24h"], 4) == round((110 - 95) / 95 * 100, 4)
+    assert row["trades_per_minute"] == 10 * 0.5 + 1
+    assert json.loads(prices.encode()) == {"btcusd": row}
+    assert json.loads(prices.encode("btcusd")) == row
+
+    clock.now = 6200.0
+    assert prices.get("btcusd")["trades_per_minute"] == 0
+    assert prices.get("ethusd") is None
+    prices.discard("btcusd")
+    assert prices.snapshot() == {}
+
+
+def request(connection, method, path, body=None):
+    connection.request(method, path, body=json.dumps(body) if body is not None else None,
+                       headers={"Content-Type": "application/json"})
+    response = connection.getresponse()
+    return response.status, json.loads(response.read() or b"null")
+
+
+def test_http_and_grafana_endpoints():
+    """
+    The service answers REST and Grafana JSON datasource requests over one kept-alive
+    connection.
+    """
+    prices = LatestPrices()
+    prices.on_trade("btcusd", 100.0, 1700000000)
+    prices.on_trade("xrpusd", 0.5, 1700000001)
+    server = PriceServer(prices)
+    port = server.start(0)
+    try:
+        connection = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+        status, body = request(connection, "GET", "/prices")
+        assert status == 200 and set(body) == {"btcusd", "xrpusd"}
+        status, body = request(connection, "GET", "/prices/BTCUSD")
+        assert status == 200 and body["price"] == 100.0
+        status, _ = request(connection, "GET", "/prices/ethusd")
+        assert status == 404
+
+        assert request(connection, "GET", "/")[0] == 200
+        assert request(connection, "POST", "/search", {"target": ""}) == (200, ["btcusd", "xrpusd"])
+        status, body = request(connection, "POST", "/query",
+                               {"targets": [{"target": "btcusd"}, {"target": "ethusd"}]})
+        assert body == [{"target": "btcusd", "datapoints": [[100.0, 1700000000000]]},
+                        {"target": "ethusd", "datapoints": []}]
+        connection.close()
+    finally:
+        server.stop()
+
+
+def test_unix_socket_endpoint():
+    """
+    The same routes are served over a Unix socket, which is removed on stop.
+    """
+    prices = LatestPrices()
+    prices.on_trade("btcusd", 100.0, 1700000000)
+    path = os.path.join(tempfile.mkdtemp(), "prices.sock")
+    server = PriceServer(prices)
+    server.start(unix_socket=path)
+    try:
+        client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        client.connect(path)
+        connection = http.client.HTTPConnection("localhost", timeout=5)
+        connection.sock = client
+        status, body = request(connection, "GET", "/prices/btcusd")
+        assert status == 200 and body["price"] == 100.0
+        connection.close()
+    finally:
+        server.stop()
+    assert not os.path.exists(path)
+
+
+if __name__ == "__main__":
+    test_latest_state_from_trades_and_ticker()
+    test_http_and_grafana_endpoints()
+    test_unix_socket_endpoint()
@@ -0,0 +1,50 @@
+from query_cache import QueryCache
+
+
+def test_key_normalizes_text_and_extracts_range():
+    """
+    Comments and whitespace do not change the key; URLs inside strings are kept.
+    """
+    key = QueryCache.key('from(bucket: "b")\n  |> range(start: -1h) // last hour', "records")
+    assert key == ('from(bucket: "b") |> range(start: -1h)', "start: -1h", ("records",))
+    assert QueryCache.key('filter(fn: (r) => r.logo_url == "https://x/y.png")')[0].endswith(
+        '"https://x/y.png")')
+
+
+def test_relative_ranges_expire_and_lru_evicts():
+    """
+    Ranges fixed in the past stay cached, anything else expires after the TTL, and the oldest
+    entry is evicted.
+    """
+    cache = QueryCache(max_entries=2, ttl=0)
+    absolute = QueryCache.key("range(start: 2024-01-01T00:00:00Z, stop: 2024-02-01T00:00:00Z)")
+    relative = QueryCache.key("range(start: -1d, stop: now())")
+    assert not QueryCache.is_relative(absolute)
+    assert QueryCache.is_relative(relative)
+    assert QueryCache.is_relative(QueryCache.key("range(start: 1700000000)"))
+    assert QueryCache.is_relative(QueryCache.key("range(start: -1h30m, stop: 1700000000)"))
+    # Bounds bound to variables, e.g., stop = now() earlier in the script
+    assert QueryCache.is_relative(QueryCache.key("stop = now() range(start: start, stop: stop)"))
+    future = QueryCache.key("range(start: 2024-01-01T00:00:00Z, stop: 2999-01-01T00:00:00Z)")
+    assert QueryCache.is_relative(future)
+    assert not QueryCache.is_relative(future, now=32472144000)
+    # Every range of the query counts
+    assert QueryCache.is_relative(QueryCache.key(
+        "union(tables: [from(bucket: \"a\") |> range(start: 0, stop: 1), "
+        "from(bucket: \"b\") |> range(start: -1h)])"))
+
+    cache.put(absolute, [1])
+    cache.put(relative, [2])
+    assert cache.get(absolute) == [1]
+    assert cache.get(relative) is None
+
+    cache.put(QueryCache.key("range(start: 0, stop: 1)"), [3])
+    cache.put(QueryCache.key("range(start: 1, stop: 2)"), [4])
+    assert cache.get(absolute) is None
+    assert len(cache) == 2
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+if __name__ == "__main__":
+    test_key_normalizes_text_and_extracts_range()
+    test_relative_ranges_expire_and_lru_evicts()
@@ -0,0 +1,98 @@
+import asyncio
+import json
+from websockets.asyncio.server import serve
+from message_decoder import TradeDecoder
+from message_pipeline import MessagePipeline
+from sharded_client import ShardedWebSocketClient, balance_pairs
+
+
+def test_balance_pairs_spreads_trade_rate():
+    """
+    The busiest pairs end up on different shards and the load is even.
+    """
+    rates = {"btcusd": 100, "ethusd": 90, "xrpusd": 60, "ltcusd": 40, "solusd": 10}
+    assignment = balance_pairs(list(rates), 2, rates)
+
+    loads = sorted(sum(rates[p] for p in pairs) for pairs in assignment)
+    assert loads == [150, 150]
+    assert not any({"btcusd", "ethusd"} <= set(pairs) for pairs in assignment)
+
+    # Without rates the pairs are spread by count
+    assert sorted(len(p) for p in balance_pairs([f"p{i}usd" for i in range(7)], 3)) == [2, 2, 3]
+
+
+def test_shards_feed_one_pipeline_and_rebalance():
+    """
+    Every shard subscribes on its own connection, all trades reach the shared pipeline,
+    and rebalancing only reconnects shards whose pairs changed, repairing their gaps.
+    """
+    pairs = ["btcusd", "ethusd", "xrpusd", "ltcusd"]
+
+    async def run():
+        connections = []
+        handled = []
+
+        async def server_handler(connection):
+            subscribed = []
+            connections.append(subscribed)
+            async for message in connection:
+                channel = json.loads(message)["data"]["channel"]
+                subscribed.append(channel)
+                await connection.send(json.dumps({
+                    "event": "trade", "channel": channel,
+                    "data": {"price": 1.0, "amount": 1.0, "timestamp": "1700000000"}}))
+
+        async def handler(message):
+            handled.append(message)
+
+        class RecordingRepairer:
+            def __init__(self):
+                self.disconnects = []
+                self.repairs = []
+
+            def disconnected(self, pairs):
+                self.disconnects.append(sorted(pairs))
+
+            async def repair(self, pairs):
+                self.repairs.append(sorted(pairs))
+
+        async with serve(server_handler, "127.0.0.1", 0) as server:
+            port = server.sockets[0].getsockname()[1]
+            decoder = TradeDecoder()
+            pipeline = MessagePipeline()
+            repairer = RecordingRepairer()
+            client = ShardedWebSocketClient(f"ws://127.0.0.1:{port}", pairs, shards=2,
+                                            pipeline=pipeline, decoder=decoder,
+                                            gap_repairer=repairer)
+            listener = asyncio.create_task(client.listen(handler))
+            while len(handled) < len(pairs):
+                await asyncio.sleep(0.01)
+
+            balanced = client.rebalance({pair: 1.0 for pair in pairs})
+            assert repairer.disconnects == [] and repairer.repairs == []
+            # Two hot pairs landing on one shard forces a reshuffle
+            hot = {pairs[0]: 100.0, pairs[2]: 100.0}
+            client.assignment = [[pairs[0], pairs[2]], [pairs[1], pairs[3]]]
+            restarted = client.rebalance(hot)
+            await asyncio.sleep(0.2)
+
+            listener.cancel()
+            await asyncio.gather(listener, return_exceptions=True)
+            await pipeline.stop()
+            return connections, balanced, restarted, client.assignment, repairer
+
+    connections, balanced, restarted, assignment, repairer = asyncio.run(run())
+    first_two = connections[:2]
+    assert sorted(len(c) for c in first_two) == [2, 2]
+    assert sorted(sum(first_two, [])) == sorted(f"live_trades_{p}" for p in pairs)
+    assert balanced == 0
+    assert restarted == 2
+    assert all(len({"btcusd", "xrpusd"} & set(shard)) == 1 for shard in assignment)
+    # The old shards are marked disconnected and the new ones repair every moved pair
+    assert sorted(repairer.disconnects) == [["btcusd", "xrpusd"], ["ethusd", "ltcusd"]]
+    assert sorted(sum(repairer.repairs, [])) == sorted(pairs)
+
+
+if __name__ == "__main__":
+    test_balance_pairs_spreads_trade_rate()
+    test_shards_feed_one_pipeline_and_rebalance()
@@ -0,0 +1,139 @@
+from snapshot_rollup import SnapshotRollup, snapshots_from_candles
+
+
+def collect():
+    snapshots = []
+
+    def on_snapshot(*snapshot):
+        snapshots.append(snapshot)
+
+    return snapshots, on_snapshot
+
+
+def test_snapshot_emitted_at_hour_boundary():
+    """
+    Trades roll up into open/high/low/last, VWAP and volume, emitted when the next hour starts.
+    """
+    snapshots, on_snapshot = collect()
+    rollup = SnapshotRollup(on_snapshot=on_snapshot)
+    rollup.add_trade("btcusd", 100.0, 1.0, 3600)
+    rollup.add_trade("btcusd", 110.0, 1.0, 4000)
+    rollup.add_trade("btcusd", 90.0, 2.0, 5000)
+    rollup.add_trade("btcusd", 105.0, 1.0, 7199)
+    assert snapshots == []
+
+    rollup.add_trade("btcusd", 106.0, 1.0, 7200)
+    vwap = (100.0 + 110.0 + 180.0 + 105.0) / 5.0
+    assert snapshots == [("btcusd", 7200, 100.0, 110.0, 90.0, 105.0, vwap, 5.0, 4)]
+
+
+def test_quiet_hours_carry_the_last_price_forward():
+    """
+    close_due emits finished hours and fills hours without trades with the last price.
+    """
+    snapshots, on_snapshot = collect()
+    rollup = SnapshotRollup(on_snapshot=on_snapshot)
+    rollup.add_trade("xrpusd", 0.5, 10.0, 100)
+    rollup.close_due(3599)
+    assert snapshots == []
+
+    rollup.close_due(3 * 3600 + 10)
+    assert snapshots == [
+        ("xrpusd", 3600, 0.5, 0.5, 0.5, 0.5, 0.5, 10.0, 1),
+        ("xrpusd", 7200, 0.5, 0.5, 0.5, 0.5, 0.5, 0.0, 0),
+        ("xrpusd", 10800, 0.5, 0.5, 0.5, 0.5, 0.5, 0.0, 0),
+    ]
+
+    # The carried-forward hour opens at the previous last price
+    rollup.add_trade("xrpusd", 0.6, 5.0, 3 * 3600 + 20)
+    rollup.close_due(4 * 3600)
+    assert snapshots[-1] == ("xrpusd", 14400, 0.5, 0.6, 0.5, 0.6, 0.6, 5.0, 1)
+
+
+def test_gap_fill_is_bounded_and_late_trades_are_counted():
+    """
+    Long gaps emit at most max_fill filler snapshots; trades for emitted hours are dropped.
+    """
+    snapshots, on_snapshot = collect()
+    rollup = SnapshotRollup(on_snapshot=on_snapshot, max_fill=2)
+    rollup.add_trade("btcusd", 100.0, 1.0, 0)
+    rollup.add_trade("btcusd", 101.0, 1.0, 10 * 3600)
+    assert [snapshot[1] for snapshot in snapshots] == [3600, 7200, 10800]
+
+    rollup.add_trade("btcusd", 99.0, 1.0, 5 * 3600)
+    assert rollup.late_trades == 1
+
+    rollup.discard("btcusd")
+    rollup.close_due(float("inf"))
+    assert len(snapshots) == 3
+    assert rollup.open_snapshots() == {}
+
+
+def test_recovered_trades_amend_emitted_snapshots():
+    """
+    Trades recovered after an outage amend the hours they belong to; the carried-forward
+    hours after them are emitted again with the new last price.
+    """
+    snapshots, on_snapshot = collect()
+    rollup = SnapshotRollup(on_snapshot=on_snapshot, amend_window=6 * 3600)
+    rollup.add_trade("btcusd", 100.0, 1.0, 100)
+    rollup.close_due(3 * 3600 + 10)  # The stream was down for hours 1 and 2
+    rollup.add_trade("btcusd", 120.0, 1.0, 3 * 3600 + 20)  # Live again
+    assert len(snapshots) == 3
+
+    rollup.add_trade("btcusd", 90.0, 1.0, 50)
+    rollup.add_trade("btcusd", 110.0, 1.0, 3600 + 30)
+    assert rollup.amended_trades == 2 and rollup.late_trades == 0
+    rollup.close_due(3 * 3600 + 30)
+    assert snapshots[3:] == [
+        ("btcusd", 3600, 90.0, 100.0, 90.0, 100.0, 95.0, 2.0, 2),
+        ("btcusd", 7200, 100.0, 110.0, 100.0, 110.0, 110.0, 1.0, 1),
+        ("btcusd", 10800, 110.0, 110.0, 110.0, 110.0, 110.0, 0.0, 0),
+    ]
+
+    rollup.add_trade("btcusd", 130.0, 1.0, 20 * 3600)
+    rollup.add_trade("btcusd", 80.0, 1.0, 60)
+    assert rollup.late_trades == 1
+
+
+def test_held_pairs_are_not_carried_forward():
+    """
+    While a pair's stream is down its finished hour is emitted, but no flat snapshots are
+    produced for the outage.
+    """
+    snapshots, on_snapshot = collect()
+    rollup = SnapshotRollup(on_snapshot=on_snapshot)
+    rollup.add_trade("btcusd", 100.0, 1.0, 100)
+    rollup.add_trade("xrpusd", 0.5, 1.0, 100)
+    rollup.close_due(3600, hold={"btcusd"})
+    rollup.close_due(3 * 3600, hold={"btcusd"})
+    assert [(s[0], s[1]) for s in snapshots] == [
+        ("btcusd", 3600), ("xrpusd", 3600), ("xrpusd", 7200), ("xrpusd", 10800)]
+
+    # Live again: the next snapshot starts from the new trade
+    rollup.add_trade("btcusd", 110.0, 1.0, 3 * 3600 + 5)
+    rollup.close_due(4 * 3600)
+    assert ("btcusd", 14400, 110.0, 110.0, 110.0, 110.0, 110.0, 1.0, 1) in snapshots[-2:]
+
+
+def test_snapshots_from_candles():
+    """
+    Rebuilt snapshots are stamped with the candle end and approximate VWAP by the typical price.
+    """
+    candles = [
+        {"timestamp": 7200, "open": "2", "high": "4", "low": "1", "close": "3", "volume": "10"},
+        {"timestamp": 3600, "open": 1, "high": 2, "low": 1, "close": 2, "volume": 5},
+    ]
+    assert snapshots_from_candles("btcusd", candles) == [
+        ("btcusd", 7200, 1.0, 2.0, 1.0, 2.0, 5.0 / 3, 5.0, None),
+        ("btcusd", 10800, 2.0, 4.0, 1.0, 3.0, 8.0 / 3, 10.0, None),
+    ]
+
+
+if __name__ == "__main__":
+    test_snapshot_emitted_at_hour_boundary()
+    test_quiet_hours_carry_the_last_price_forward()
+    test_gap_fill_is_bounded_and_late_trades_are_counted()
+    test_recovered_trades_amend_emitted_snapshots()
+    test_held_pairs_are_not_carried_forward()
+    test_snapshots_from_candles()
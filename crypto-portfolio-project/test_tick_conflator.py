@@ -0,0 +1,106 @@
+from tick_conflator import TickConflator
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_conflator(**kwargs):
+    ticks = []
+    clock = FakeClock()
+    conflator = TickConflator(on_tick=lambda *tick: ticks.append(tick), clock=clock, **kwargs)
+    return conflator, ticks, clock
+
+
+def test_raw_pairs_are_passed_back():
+    """
+    Pairs in raw mode are not taken, so the caller writes every trade itself.
+    """
+    conflator, ticks, _ = make_conflator(modes={"btcusd": "conflate"})
+    assert not conflator.add("xrpusd", 0.5, 1)
+    assert conflator.add("btcusd", 100.0, 1)
+    assert ticks == [("btcusd", 100.0, 100.0, 100.0, 1, 1)]
+
+
+def test_burst_is_conflated_to_one_tick_per_interval():
+    """
+    Trades within the interval are held; the next emit carries the latest price, range and count.
+    """
+    conflator, ticks, clock = make_conflator(interval=1.0, default_mode="conflate")
+    conflator.add("btcusd", 100.0, 1)
+    for price in (101.0, 99.0, 100.5):
+        clock.now += 0.1
+        conflator.add("btcusd", price, 2)
+    assert len(ticks) == 1
+
+    conflator.flush_due()
+    assert len(ticks) == 1
+    clock.now = 1.0
+    conflator.flush_due()
+    assert ticks[-1] == ("btcusd", 100.5, 99.0, 101.0, 3, 2)
+
+    # Nothing pending: no repeated point for a quiet pair
+    clock.now = 5.0
+    conflator.flush_due()
+    assert len(ticks) == 2
+    assert conflator.stats() == {"ticks_in": 4, "ticks_out": 2, "pairs": 1}
+
+
+def test_threshold_and_late_trades():
+    """
+    A large enough move is emitted at once; older trades widen the range but keep the last price.
+    """
+    conflator, ticks, clock = make_conflator(interval=10.0, threshold=0.01,
+                                             default_mode="conflate")
+    conflator.add("btcusd", 100.0, 10)
+    clock.now = 1.0
+    conflator.add("btcusd", 100.5, 11)
+    conflator.add("btcusd", 95.0, 5)
+    assert len(ticks) == 1
+    conflator.add("btcusd", 102.0, 12)
+    assert ticks[-1] == ("btcusd", 102.0, 95.0, 102.0, 3, 12)
+
+
+def test_switching_to_raw_emits_pending():
+    """
+    set_mode flushes what a pair has pending before it goes raw.
+    """
+    conflator, ticks, clock = make_conflator(default_mode="conflate")
+    conflator.add("btcusd", 100.0, 1)
+    conflator.add("btcusd", 101.0, 1)
+    conflator.set_mode("btcusd", "raw")
+    # Same trade time as the first emit, so it is stamped just after it
+    assert ticks[-1] == ("btcusd", 101.0, 101.0, 101.0, 1, 2)
+    assert not conflator.add("btcusd", 102.0, 2)
+
+
+def test_emits_within_one_trade_second_get_unique_times():
+    """
+    Several emits stamped with the same whole-second trade time are moved apart by a
+    nanosecond each, so InfluxDB keeps all of them.
+    """
+    conflator, ticks, clock = make_conflator(interval=0.25, default_mode="conflate")
+    second = 1700000000 * 1_000_000_000
+    for step in range(4):
+        clock.now = step * 0.25
+        conflator.add("btcusd", 100.0 + step, second)
+        conflator.add("btcusd", 100.0 + step, second)
+    conflator.flush()
+    assert [tick[5] for tick in ticks] == [second + i for i in range(len(ticks))]
+    assert sum(tick[4] for tick in ticks) == 8
+
+    clock.now = 5.0
+    conflator.add("btcusd", 105.0, second + 1_000_000_000)
+    assert ticks[-1][5] == second + 1_000_000_000
+
+
+if __name__ == "__main__":
+    test_raw_pairs_are_passed_back()
+    test_burst_is_conflated_to_one_tick_per_interval()
+    test_threshold_and_late_trades()
+    test_switching_to_raw_emits_pending()
+    test_emits_within_one_trade_second_get_unique_times()
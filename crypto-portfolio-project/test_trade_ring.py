@@ -0,0 +1,162 @@
+import asyncio
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from multiprocess_ingest import IngestSupervisor, RingFeeder
+from trade_ring import FLAG_DISCONNECTED, FLAG_RECONNECTED, TradeRing
+
+
+def test_push_pop_wraps_around_and_reports_full():
+    """
+    Records come back in order across the end of the buffer; a full ring rejects pushes.
+    """
+    ring = TradeRing.create(capacity=4)
+    try:
+        for i in range(3):
+            assert ring.push(i, 1700000000 + i, 100.0 + i, 0.5, i)
+        assert ring.pop(2)["pair"].tolist() == [0, 1]
+        for i in range(3, 6):
+            assert ring.push(i, 1700000000 + i, 100.0 + i, 0.5, i)
+        assert not ring.push(6, 0, 0.0, 0.0)
+        assert ring.full_waits == 1
+        assert ring.depth() == 4
+
+        records = ring.pop()
+        assert records["pair"].tolist() == [2, 3, 4, 5]
+        assert records["price"].tolist() == [102.0, 103.0, 104.0, 105.0]
+        assert records["trade_id"].tolist() == [2, 3, 4, 5]
+        assert len(ring.pop()) == 0
+    finally:
+        ring.close()
+
+
+def test_records_cross_processes():
+    """
+    A ring attached by name in another process delivers its records to the creator.
+    """
+    ring = TradeRing.create(capacity=1024)
+    try:
+        producer = (
+            "from trade_ring import TradeRing\n"
+            f"ring = TradeRing.attach({ring.name!r})\n"
+            "for i in range(500):\n"
+            "    assert ring.push(i % 7, 1700000000 + i, float(i), 1.0, i)\n"
+            "ring.close()\n"
+        )
+        subprocess.run([sys.executable, "-c", producer], check=True)
+        records = ring.pop(1000)
+        assert len(records) == 500
+        assert records["trade_id"].tolist() == list(range(500))
+        assert records["pair"][10] == 3
+    finally:
+        ring.close()
+
+
+def test_feeder_backlog_and_hold_records():
+    """
+    Trades that do not fit wait in order without blocking the loop; pairs going down or
+    coming back are pushed as control records, and the first sync releases earlier holds.
+    """
+    async def run(ring):
+        feeder = RingFeeder(ring, held=[0, 1])
+        for i in range(3):
+            feeder.push_trade(0, {"timestamp": 1700000000 + i, "price": i, "amount": 1, "id": i})
+        feeder.sync_holds([1])
+        assert len(feeder.backlog) == 2 and ring.depth() == 2
+
+        drain = asyncio.create_task(feeder.drain())
+        await asyncio.sleep(0.01)
+        assert not drain.done()  # Waiting for room without blocking this loop
+        first = ring.pop()
+        await drain
+        rest = ring.pop()
+        feeder.sync_holds([])
+        return first, rest, ring.pop()
+
+    ring = TradeRing.create(capacity=2)
+    try:
+        first, rest, released = asyncio.run(run(ring))
+    finally:
+        ring.close()
+    assert first["trade_id"].tolist() == [0, 1]
+    assert rest["trade_id"].tolist() == [2, 0]
+    assert rest["flags"].tolist() == [0, FLAG_RECONNECTED] and rest["pair"][1] == 0
+    assert released["flags"].tolist() == [FLAG_RECONNECTED] and released["pair"][0] == 1
+
+    ring = TradeRing.create(capacity=4)
+    try:
+        feeder = RingFeeder(ring)
+        feeder.sync_holds([3])
+        assert ring.pop()[["pair", "flags"]].tolist() == [(3, FLAG_DISCONNECTED)]
+    finally:
+        ring.close()
+
+
+def test_supervisor_restarts_exited_processes():
+    """
+    Processes that exit are restarted after the restart delay, which grows on repeated failures.
+    """
+    supervisor = IngestSupervisor("ws://127.0.0.1:1", ["btcusd", "xrpusd"], parsers=2,
+                                  capacity=16, restart_delay=0.2, restart_max=0.4,
+                                  output=subprocess.DEVNULL)
+    supervisor._command = lambda role, config, offset: [sys.executable, "-c",
+                                                        "raise SystemExit(3)"]
+    supervisor.start()
+    try:
+        assert len(supervisor.rings) == 2
+        time.sleep(0.5)
+        assert supervisor.check() == []  # Exits are noticed, restarts wait for the delay
+        time.sleep(0.3)
+        assert sorted(supervisor.check()) == ["parser-0", "parser-1", "writer-0"]
+        assert supervisor.stats() == {"ring_depths": [0, 0],
+                                      "restarts": {"parser-0": 1, "parser-1": 1, "writer-0": 1}}
+    finally:
+        supervisor.stop()
+    assert supervisor.rings == []
+
+
+def test_children_ignore_sigint_and_serve_metrics():
+    """
+    A Ctrl+C reaching a child does not stop it (the supervisor stops children in order), and
+    every child serves its own metrics on the ports after the supervisor's.
+    """
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        parser_port = probe.getsockname()[1]
+    supervisor = IngestSupervisor("ws://127.0.0.1:1", ["btcusd"], parsers=1, capacity=16,
+                                  output=subprocess.DEVNULL, metrics_port=parser_port - 2)
+    command = supervisor._command
+    # Only the parser is real; a writer would need InfluxDB
+    supervisor._command = lambda role, config, offset: command(role, config, offset) \
+        if role == "parser" else [sys.executable, "-c", "import time; time.sleep(30)"]
+    supervisor.start()
+    try:
+        body = None
+        deadline = time.monotonic() + 10
+        while body is None and time.monotonic() < deadline:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{parser_port}/metrics") as response:
+                    body = response.read().decode()
+            except OSError:
+                time.sleep(0.1)
+        assert body and "ingest_ring_depth 0" in body
+
+        parser = supervisor._children["parser-0"]["process"]
+        os.kill(parser.pid, signal.SIGINT)
+        time.sleep(0.3)
+        assert parser.poll() is None
+    finally:
+        supervisor.stop()
+    assert parser.returncode is not None
+
+
+if __name__ == "__main__":
+    test_push_pop_wraps_around_and_reports_full()
+    test_records_cross_processes()
+    test_feeder_backlog_and_hold_records()
+    test_supervisor_restarts_exited_processes()
+    test_children_ignore_sigint_and_serve_metrics()
@@ -0,0 +1,136 @@
+import os
+import tempfile
+import time
+from write_spool import WriteSpool, SpoolReplayer
+
+
+def drain(spool):
+    batches = []
+    while True:
+        record = spool.peek()
+        if record is None:
+            return batches
+        bucket, payload, position = record
+        batches.append((bucket, payload))
+        spool.commit(position)
+
+
+def test_batches_replay_in_order_across_segments_and_restarts():
+    """
+    Batches come back in append order, even across segment rolls and a reopen.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        spool = WriteSpool(tmp, segment_size=256, max_bytes=1024 * 1024)
+        for i in range(20):
+            spool.append("crypto_portfolio", f"crypto_data,currency_pair=btcusd price={i} {i}")
+        assert len([n for n in os.listdir(tmp) if n.endswith(".spool")]) > 1
+
+        first = spool.peek()
+        spool.commit(first[2])
+        spool.close()
+
+        reopened = WriteSpool(tmp, segment_size=256, max_bytes=1024 * 1024)
+        assert reopened.pending()
+        reopened.append("crypto_ticker", "late")
+        batches = drain(reopened)
+
+        assert [payload for _, payload in batches] == [
+            f"crypto_data,currency_pair=btcusd price={i} {i}" for i in range(1, 20)] + ["late"]
+        assert batches[-1][0] == "crypto_ticker"
+        assert not reopened.pending()
+        reopened.close()
+
+
+def test_oldest_segment_is_evicted_when_full():
+    """
+    The spool stays within its disk budget by dropping the oldest segment.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        spool = WriteSpool(tmp, segment_size=256, max_bytes=1024)
+        for i in range(100):
+            spool.append("crypto_portfolio", f"line {i:03d} " + "x" * 40)
+
+        assert spool.evicted_segments > 0
+        batches = drain(spool)
+        assert batches[-1][1].startswith("line 099")
+        assert not batches[0][1].startswith("line 000")
+        spool.close()
+
+
+class FlakyWriteApi:
+    def __init__(self):
+        self.up = False
+        self.written = []
+
+    def write(self, bucket, record):
+        if not self.up:
+            raise ConnectionError("influx down")
+        self.written.append(record)
+
+
+def test_replayer_waits_for_recovery():
+    """
+    Spooled batches are only committed once InfluxDB accepts them.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        spool = WriteSpool(tmp)
+        spool.append("crypto_history", "a")
+        spool.append("crypto_history", "b")
+        write_api = FlakyWriteApi()
+        replayer = SpoolReplayer(spool, {"crypto_history": write_api},
+                                 rate=1000, retry_interval=0.05)
+        time.sleep(0.2)
+        assert write_api.written == [] and spool.pending()
+
+        write_api.up = True
+        deadline = time.monotonic() + 2
+        while spool.pending() and time.monotonic() < deadline:
+            time.sleep(0.02)
+        replayer.stop()
+
+        assert write_api.written == ["a", "b"]
+        spool.close()
+
+
+class RejectingWriteApi:
+    def __init__(self):
+        self.written = []
+
+    def write(self, bucket, record):
+        if record == "bad":
+            error = Exception("field type conflict")
+            error.status = 422
+            raise error
+        self.written.append(record)
+
+
+def test_replayer_drops_rejected_batches():
+    """
+    A batch InfluxDB rejects for good is dropped and counted; the batches behind it replay.
+    """
+    from metrics import Metrics
+
+    with tempfile.TemporaryDirectory() as tmp:
+        spool = WriteSpool(tmp)
+        for payload in ("a", "bad", "b"):
+            spool.append("crypto_history", payload)
+        write_api = RejectingWriteApi()
+        metrics = Metrics()
+        replayer = SpoolReplayer(spool, {"crypto_history": write_api},
+                                 rate=1000, retry_interval=10, metrics=metrics)
+        deadline = time.monotonic() + 2
+        while spool.pending() and time.monotonic() < deadline:
+            time.sleep(0.02)
+        replayer.stop()
+
+        assert write_api.written == ["a", "b"]
+        assert replayer.rejected == 1
+        assert metrics.spool_rejected.value("crypto_history") == 1
+        spool.close()
+
+
+if __name__ == "__main__":
+    test_batches_replay_in_order_across_segments_and_restarts()
+    test_oldest_segment_is_evicted_when_full()
+    test_replayer_waits_for_recovery()
+    test_replayer_drops_rejected_batches()
@@ -0,0 +1,151 @@
+import time
+
+MODES = ("raw", "conflate")
+
+# Positions in the per-pair state list
+PRICE, LOW, HIGH, COUNT, TIMESTAMP, EMITTED_AT, EMITTED_PRICE, STAMPED = range(8)
+
+
+class TickConflator:
+    def __init__(self, on_tick, interval=0.25, threshold=None, default_mode="raw", modes=None,
+                 clock=time.monotonic):
+        """
+        Cap the write rate of live prices per pair by conflating bursts of trades.
+
+        A conflated pair keeps only its latest price plus the low, high and number of trades
+        since the last emit. The first trade after a quiet `interval` is emitted at once;
+        later ones are held until the interval has passed (see flush_due) or the price moved
+        by more than `threshold`. Writes are then bounded by pairs / interval instead of by
+        exchange activity. Pairs in "raw" mode are not touched.
+
+        Args:
+            on_tick (callable): Called as on_tick(currency_pair, price, low, high, count,
+                timestamp) for every conflated emit. `timestamp` is that of the latest trade,
+                moved 1 unit (ns) past the previous emit of the pair when it would repeat it:
+                several emits within one trade second must not overwrite each other in
+                InfluxDB.
+            interval (float): Minimum seconds between emits of a pair.
+            threshold (float): Relative price change (e.g., 0.001 for 0.1%) that is emitted
+                right away regardless of the interval. None disables it.
+            default_mode (str): "raw" or "conflate" for pairs without an entry in `modes`.
+            modes (dict): Per-pair mode overrides, e.g. {"btcusd": "conflate"}.
+            clock (callable): Monotonic time source in seconds.
+        """
+        for mode in [default_mode, *(modes or {}).values()]:
+            if mode not in MODES:
+                raise ValueError(f"Unknown tick mode {mode!r}, expected one of {MODES}")
+        self.on_tick = on_tick
+        self.interval = interval
+        self.threshold = threshold
+        self.default_mode = default_mode
+        self.modes = dict(modes or {})
+        self.clock = clock
+
+        self.ticks_in = 0
+        self.ticks_out = 0
+        # pair -> [price, low, high, count, timestamp, emitted_at, emitted_price, stamped]
+        self._state = {}
+
+    def mode(self, currency_pair):
+        return self.modes.get(currency_pair, self.default_mode)
+
+    def set_mode(self, currency_pair, mode):
+        """
+        Switch a pair between "raw" and "conflate"; its pending trades are emitted first.
+        """
+        if mode not in MODES:
+            raise ValueError(f"Unknown tick mode {mode!r}, expected one of {MODES}")
+        state = self._state.pop(currency_pair, None)
+        if state is not None and state[COUNT]:
+            self._emit(currency_pair, state, self.clock())
+        self.modes[currency_pair] = mode
+
+    def add(self, currency_pair, price, timestamp):
+        """
+        Take one trade of a conflated pair.
+
+        Args:
+            currency_pair (str): The currency pair, e.g., "btcusd".
+            price (float): Trade price.
+            timestamp (int): Trade time, passed through to on_tick.
+
+        Returns:
+            bool: False if the pair is in raw mode and the caller should write the trade itself.
+        """
+        if self.modes.get(currency_pair, self.default_mode) != "conflate":
+            return False
+        self.ticks_in += 1
+        now = self.clock()
+        state = self._state.get(currency_pair)
+
+        if state is None:
+            state = self._state[currency_pair] = [price, price, price, 1, timestamp, None, None,
+                                                  None]
+        elif not state[COUNT]:
+            state[PRICE] = state[LOW] = state[HIGH] = price
+            state[COUNT] = 1
+            state[TIMESTAMP] = timestamp
+        else:
+            if price < state[LOW]:
+                state[LOW] = price
+            elif price > state[HIGH]:
+                state[HIGH] = price
+            state[COUNT] += 1
+            # Late trades (e.g., recovered after a reconnect) widen the range but never
+            # replace the latest price
+            if timestamp >= state[TIMESTAMP]:
+                state[PRICE] = price
+                state[TIMESTAMP] = timestamp
+
+        if (state[EMITTED_AT] is None or now - state[EMITTED_AT] >= self.interval
+                or (self.threshold and abs(state[PRICE] - state[EMITTED_PRICE])
+                    >= self.threshold * abs(state[EMITTED_PRICE]))):
+            self._emit(currency_pair, state, now)
+        return True
+
+    def flush_due(self, now=None):
+        """
+        Emit the pending trades of every pair whose interval has passed, so the latest price
+        of a pair that went quiet is never held back.
+        """
+        now = self.clock() if now is None else now
+        for pair, state in self._state.items():
+            if state[COUNT] and now - state[EMITTED_AT] >= self.interval:
+                self._emit(pair, state, now)
+
+    def flush(self):
+        """
+        Emit all pending trades regardless of the interval (e.g., before shutting down).
+        """
+        now = self.clock()
+        for pair, state in self._state.items():
+            if state[COUNT]:
+                self._emit(pair, state, now)
+
+    def discard(self, currency_pair):
+        self._state.pop(currency_pair, None)
+
+    def _emit(self, currency_pair, state, now):
+        state[EMITTED_AT] = now
+        state[EMITTED_PRICE] = state[PRICE]
+        count = state[COUNT]
+        state[COUNT] = 0
+        stamp = state[TIMESTAMP]
+        if state[STAMPED] is not None and stamp <= state[STAMPED]:
+            stamp = state[STAMPED] + 1
+        state[STAMPED] = stamp
+        self.ticks_out += 1
+        try:
+            self.on_tick(currency_pair, state[PRICE], state[LOW], state[HIGH], count, stamp)
+        except Exception as e:
+            print(f"[ERROR] Failed to emit conflated tick for {currency_pair}: {e}")
+
+    def stats(self):
+        """
+        Counters for logging: trades taken, ticks emitted and pairs currently conflated.
+        """
+        return {
+            "ticks_in": self.ticks_in,
+            "ticks_out": self.ticks_out,
+            "pairs": len(self._state),
+        }
@@ -1,4 +1,7 @@
+import asyncio
 import requests
+from http_handler import AsyncHTTPHandler
+from pair_registry import PairRegistry
 
 
 class HTTPHandler:
@@ -25,8 +28,11 @@ class HTTPHandler:
 def test_fetch_ticker_info():
     # Correct base URL
     http_handler = HTTPHandler(base_url="https://www.bitstamp.net/api/v2")
-    currency_pairs = ["btcusd", "xrpusd", "xlmusd",
-                      "hbarusd", "vetusd", "csprusd", "xdcusd"]
+    # The tracked pairs from the shared pairs.json
+    registry = PairRegistry(AsyncHTTPHandler(base_url=http_handler.base_url,
+                                             tracked_currency_pairs=[]))
+    asyncio.run(registry.refresh())
+    currency_pairs = registry.pairs
     ticker_info = http_handler.fetch_ticker_info(currency_pairs)
 
     print("Ticker Information:")
@@ -0,0 +1,130 @@
+from multiprocessing import resource_tracker, shared_memory
+import numpy as np
+
+# One fixed-width record per trade; pair is an index into the pair table shared by all processes
+TRADE_RECORD = np.dtype([
+    ("pair", "<u4"),
+    ("flags", "<u4"),
+    ("timestamp", "<i8"),
+    ("price", "<f8"),
+    ("amount", "<f8"),
+    ("trade_id", "<i8"),
+])
+
+# Control records carry no trade: the pair's stream went down (gap repair pending) or came back
+FLAG_DISCONNECTED = 1
+FLAG_RECONNECTED = 2
+
+# Header: write counter, capacity, then the read counter on its own cache line
+HEADER_SIZE = 128
+WRITE_OFFSET = 0
+CAPACITY_OFFSET = 8
+READ_OFFSET = 64
+
+
+class TradeRing:
+    def __init__(self, memory, owner=False):
+        """
+        Single-producer, single-consumer ring buffer of trade records in shared memory.
+
+        One process pushes records and one other process pops them; records are copied in and
+        out as fixed-width NumPy structs, so nothing is pickled. The producer writes a record
+        before it advances the write counter and the consumer copies records out before it
+        advances the read counter, so neither side ever sees a half-written slot (counters are
+        aligned 8-byte stores). Use TradeRing.create in the owning process and
+        TradeRing.attach everywhere else.
+
+        Args:
+            memory (SharedMemory): The shared memory block holding the ring.
+            owner (bool): Whether this process created the block and unlinks it on close.
+        """
+        self.memory = memory
+        self.owner = owner
+        self.name = memory.name
+        buffer = memory.buf
+        self._write = np.ndarray((1,), dtype=np.uint64, buffer=buffer, offset=WRITE_OFFSET)
+        self._read = np.ndarray((1,), dtype=np.uint64, buffer=buffer, offset=READ_OFFSET)
+        self.capacity = int(np.ndarray((1,), dtype=np.uint64, buffer=buffer,
+                                       offset=CAPACITY_OFFSET)[0])
+        self._mask = self.capacity - 1
+        self._records = np.ndarray((self.capacity,), dtype=TRADE_RECORD, buffer=buffer,
+                                   offset=HEADER_SIZE)
+        self.full_waits = 0
+
+    @classmethod
+    def create(cls, capacity=65536, name=None):
+        """
+        Allocate a new ring.
+
+        Args:
+            capacity (int): Number of records; must be a power of two.
+            name (str): Shared memory name; a random one is chosen when not set.
+        """
+        if capacity <= 0 or capacity & (capacity - 1):
+            raise ValueError(f"Ring capacity must be a power of two, got {capacity}")
+        memory = shared_memory.SharedMemory(
+            name=name, create=True, size=HEADER_SIZE + capacity * TRADE_RECORD.itemsize)
+        memory.buf[:HEADER_SIZE] = bytes(HEADER_SIZE)
+        np.ndarray((1,), dtype=np.uint64, buffer=memory.buf, offset=CAPACITY_OFFSET)[0] = capacity
+        return cls(memory, owner=True)
+
+    @classmethod
+    def attach(cls, name):
+        """
+        Open a ring created by another process.
+        """
+        memory = shared_memory.SharedMemory(name=name)
+        # Only the creator may unlink the block; stop this process's tracker from doing so on exit
+        resource_tracker.unregister(memory._name, "shared_memory")
+        return cls(memory)
+
+    def push(self, pair, timestamp, price, amount, trade_id=0, flags=0):
+        """
+        Append one trade, or a control record when flags is set (producer side).
+
+        Returns:
+            bool: False if the ring is full and the trade was not added.
+        """
+        write = int(self._write[0])
+        if write - int(self._read[0]) >= self.capacity:
+            self.full_waits += 1
+            return False
+        self._records[write & self._mask] = (pair, flags, timestamp, price, amount, trade_id)
+        self._write[0] = write + 1
+        return True
+
+    def pop(self, max_records=4096):
+        """
+        Take up to max_records trades (consumer side).
+
+        Returns:
+            numpy.ndarray: A copy of the records with dtype TRADE_RECORD, possibly empty.
+        """
+        read = int(self._read[0])
+        count = min(int(self._write[0]) - read, max_records)
+        if count <= 0:
+            return self._records[:0].copy()
+        start = read & self._mask
+        end = start + count
+        if end <= self.capacity:
+            records = self._records[start:end].copy()
+        else:
+            records = np.concatenate((self._records[start:], self._records[:end - self.capacity]))
+        self._read[0] = read + count
+        return records
+
+    def depth(self):
+        """
+        Records pushed but not popped yet.
+        """
+        return int(self._write[0]) - int(self._read[0])
+
+    def close(self):
+        """
+        Detach from the ring; the owner also frees the shared memory.
+        """
+        # Views into the buffer must be released before the block can be closed
+        self._write = self._read = self._records = None
+        self.memory.close()
+        if self.owner:
+            self.memory.unlink()
@@ -0,0 +1,87 @@
+import os
+import sqlite3
+import threading
+
+
+class WatermarkStore:
+    def __init__(self, path):
+        """
+        Persistent index of the last written candle time per currency pair and resolution.
+
+        Backed by a small SQLite file so it survives restarts and every update is atomic. The
+        file is opened (and created) on first use.
+
+        Args:
+            path (str): Location of the SQLite file.
+        """
+        self.path = path
+        # True when the file had to be created, meaning the index must be rebuilt from InfluxDB
+        self.created = not os.path.exists(path)
+        self._lock = threading.Lock()
+        self._connection = None
+
+    @property
+    def _conn(self):
+        # Always used with self._lock held
+        if self._connection is None:
+            connection = sqlite3.connect(self.path, check_same_thread=False)
+            with connection:
+                connection.execute(
+                    "CREATE TABLE IF NOT EXISTS watermarks ("
+                    " currency_pair TEXT NOT NULL,"
+                    " resolution INTEGER NOT NULL,"
+                    " timestamp INTEGER NOT NULL,"
+                    " PRIMARY KEY (currency_pair, resolution))"
+                )
+            self._connection = connection
+        return self._connection
+
+    def get(self, currency_pair, resolution):
+        """
+        Last written candle time (Unix seconds) for a pair and resolution, or None.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT timestamp FROM watermarks WHERE currency_pair = ? AND resolution = ?",
+                (currency_pair, resolution),
+            ).fetchone()
+        return row[0] if row else None
+
+    def get_all(self, resolution):
+        """
+        Mapping of {pair: last written candle time} for one resolution.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT currency_pair, timestamp FROM watermarks WHERE resolution = ?",
+                (resolution,),
+            ).fetchall()
+        return dict(rows)
+
+    def advance(self, currency_pair, resolution, timestamp):
+        """
+        Record that candles up to `timestamp` were written. Watermarks never move backwards.
+        """
+        self.advance_many(resolution, {currency_pair: timestamp})
+
+    def advance_many(self, resolution, timestamps):
+        """
+        Advance several pairs in one transaction.
+
+        Args:
+            resolution (int): Candle size in seconds.
+            timestamps (dict): {pair: last written candle time (Unix seconds)}.
+        """
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO watermarks (currency_pair, resolution, timestamp) VALUES (?, ?, ?)"
+                " ON CONFLICT (currency_pair, resolution)"
+                " DO UPDATE SET timestamp = MAX(timestamp, excluded.timestamp)",
+                [(pair, resolution, int(ts)) for pair, ts in timestamps.items()],
+            )
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
@@ -1,25 +1,64 @@
 import asyncio
 import json
+import random
+import time
 import websockets
 
 
 class WebSocketClient:
-    def __init__(self, url, currency_pairs):
+    def __init__(self, url, currency_pairs, pipeline=None, decoder=None, recorder=None,
+                 metrics=None, gap_repairer=None, ping_interval=20, ping_timeout=20,
+                 stale_timeout=60, backoff_initial=0.05, backoff_max=30.0, repair_on_connect=False):
         """
         Initialize the WebSocket client.
 
         Args:
             url (str): WebSocket server URL.
             currency_pairs (list): List of currency pairs to subscribe to.
+            pipeline (MessagePipeline): Optional queue + worker pool that decouples socket
+                reads from message handling. Without it, messages are handled inline.
+            decoder (TradeDecoder): Optional decoder whose channel -> pair map is filled in
+                as pairs are subscribed.
+            recorder (CaptureWriter): Optional capture file receiving every raw frame.
+            metrics (Metrics): Optional metrics counting frames received and reconnects.
+            gap_repairer (GapRepairer): Optional repairer told about disconnects; it recovers
+                the missed trades over REST after each reconnect.
+            ping_interval (float): Seconds between keepalive pings (None disables them).
+            ping_timeout (float): Seconds to wait for a pong before dropping the connection.
+            stale_timeout (float): Reconnect when no frame arrives for this long (None disables).
+                A quiet connection is asked for a Bitstamp heartbeat half way through, so
+                connections carrying only illiquid pairs stay up as long as the server answers.
+            backoff_initial (float): First reconnect delay cap in seconds; doubles per failure.
+            backoff_max (float): Upper bound of the reconnect delay cap.
+            repair_on_connect (bool): Repair gaps on the first connection too, for a client
+                taking over pairs whose previous connection was closed (see gap_repairer).
         """
         self.url = url
-        self.currency_pairs = currency_pairs
+        self.currency_pairs = list(currency_pairs)
+        self.pipeline = pipeline
+        self.decoder = decoder
+        self.recorder = recorder
+        self.metrics = metrics
+        self.gap_repairer = gap_repairer
+        self.ping_interval = ping_interval
+        self.ping_timeout = ping_timeout
+        self.stale_timeout = stale_timeout
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self.repair_on_connect = repair_on_connect
 
-    async def subscribe_to_pairs(self, websocket):
+        self.last_message_at = None
+        self._websocket = None  # The open connection, if any
+        self._repairs = set()
+
+    async def subscribe_to_pairs(self, websocket, currency_pairs=None):
         """
-        Subscribe to specific currency pairs.
+        Subscribe to specific currency pairs (all tracked pairs by default).
+        Requests are sent concurrently.
         """
-        for pair in self.currency_pairs:
+        async def subscribe(pair):
+            if self.decoder:
+                self.decoder.register(pair)
             subscription_message = {
                 "event": "bts:subscribe",
                 "data": {"channel": f"live_trades_{pair}"}
@@ -30,20 +69,112 @@ class WebSocketClient:
             except Exception as e:
                 print(f"[ERROR] Failed to subscribe to {pair}: {e}")
 
+        pairs = self.currency_pairs if currency_pairs is None else currency_pairs
+        await asyncio.gather(*(subscribe(pair) for pair in pairs))
+
+    async def unsubscribe_from_pairs(self, websocket, currency_pairs):
+        """
+        Unsubscribe from specific currency pairs.
+        """
+        async def unsubscribe(pair):
+            try:
+                await websocket.send(json.dumps({
+                    "event": "bts:unsubscribe",
+                    "data": {"channel": f"live_trades_{pair}"}
+                }))
+                print(f"[INFO] Unsubscribed from {pair}")
+            except Exception as e:
+                print(f"[ERROR] Failed to unsubscribe from {pair}: {e}")
+
+        await asyncio.gather(*(unsubscribe(pair) for pair in currency_pairs))
+
+    async def add_pairs(self, currency_pairs):
+        """
+        Start tracking more pairs. They are subscribed on the open connection right away
+        and included in every later reconnect.
+
+        Returns:
+            list: The pairs that were not tracked before.
+        """
+        added = [pair for pair in currency_pairs if pair not in self.currency_pairs]
+        self.currency_pairs.extend(added)
+        if added and self._websocket is not None:
+            await self.subscribe_to_pairs(self._websocket, added)
+        return added
+
+    async def remove_pairs(self, currency_pairs):
+        """
+        Stop tracking pairs without touching the subscriptions of the others.
+
+        Returns:
+            list: The pairs that were tracked before.
+        """
+        removed = [pair for pair in currency_pairs if pair in self.currency_pairs]
+        self.currency_pairs[:] = [pair for pair in self.currency_pairs if pair not in removed]
+        if removed and self._websocket is not None:
+            await self.unsubscribe_from_pairs(self._websocket, removed)
+        return removed
+
+    async def _watch_stream(self, websocket):
+        """
+        Close a connection that is still open but has stopped delivering frames. Before
+        giving up on a quiet connection, a heartbeat is requested; the server's reply counts
+        as a frame.
+        """
+        while True:
+            await asyncio.sleep(self.stale_timeout / 4)
+            silent = time.monotonic() - self.last_message_at
+            if silent > self.stale_timeout:
+                print(f"[WARNING] No WebSocket frames for {self.stale_timeout}s, reconnecting...")
+                await websocket.close()
+                return
+            if silent > self.stale_timeout / 2:
+                try:
+                    await websocket.send(json.dumps({"event": "bts:heartbeat"}))
+                except Exception as e:
+                    print(f"[ERROR] Failed to send WebSocket heartbeat: {e}")
+
+    def _start_repair(self):
+        task = asyncio.create_task(self.gap_repairer.repair(list(self.currency_pairs)))
+        # Keep a reference until the repair is done so the task is not garbage collected
+        self._repairs.add(task)
+        task.add_done_callback(self._repairs.discard)
+
     async def listen(self, message_handler):
         """
         Connect to the WebSocket, subscribe to pairs, and listen for messages.
         """
+        if self.pipeline:
+            # The reader only enqueues frames; pipeline workers run the handler
+            self.pipeline.start(message_handler)
+            message_handler = self.pipeline.put
+
+        backoff = self.backoff_initial
+        reconnecting = self.repair_on_connect
         while True:
+            watchdog = None
             try:
                 # Establish a connection to the WebSocket server
-                async with websockets.connect(self.url, ping_interval=None) as websocket:
+                async with websockets.connect(self.url, ping_interval=self.ping_interval,
+                                              ping_timeout=self.ping_timeout) as websocket:
                     print("[INFO] WebSocket connection established.")
+                    self._websocket = websocket
                     await self.subscribe_to_pairs(websocket)
+                    self.last_message_at = time.monotonic()
+                    if self.stale_timeout:
+                        watchdog = asyncio.create_task(self._watch_stream(websocket))
+                    if reconnecting and self.gap_repairer:
+                        self._start_repair()
 
                     # Receive messages and pass them to the handler
                     while True:
                         message = await websocket.recv()
+                        self.last_message_at = time.monotonic()
+                        backoff = self.backoff_initial  # The connection is healthy again
+                        if self.metrics:
+                            self.metrics.frames_received.inc()
+                        if self.recorder:
+                            self.recorder.record(message)
                         await message_handler(message)
 
             except websockets.exceptions.ConnectionClosed as e:
@@ -55,5 +186,18 @@ class WebSocketClient:
                 print(
                     f"[ERROR] Unexpected WebSocket error: {e}. Reconnecting...")
             finally:
-                print("[INFO] Reconnecting to WebSocket in 5 seconds...")
-                await asyncio.sleep(5)
+                self._websocket = None
+                if watchdog:
+                    watchdog.cancel()
+
+            # Only reached after an error; cancellation propagates without waiting
+            reconnecting = True
+            if self.gap_repairer:
+                self.gap_repairer.disconnected(self.currency_pairs)
+            if self.metrics:
+                self.metrics.reconnects.inc()
+            # Full jitter keeps shards and restarts from reconnecting in lockstep
+            delay = random.uniform(0, backoff)
+            backoff = min(backoff * 2, self.backoff_max)
+            print(f"[INFO] Reconnecting to WebSocket in {delay:.2f} seconds...")
+            await asyncio.sleep(delay)
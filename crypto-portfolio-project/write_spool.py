@@ -0,0 +1,277 @@
+import mmap
+import os
+import struct
+import threading
+import zlib
+
+# Every record is: payload length, CRC32 of the payload, payload ("bucket\nline protocol")
+RECORD_HEADER = struct.Struct("<II")
+SEGMENT_SUFFIX = ".spool"
+CURSOR_FILE = "cursor"
+
+# InfluxDB rejects the payload itself (bad line protocol, field type conflict, too large):
+# resending the same batch can never succeed. Auth and missing-bucket errors are retried,
+# since fixing the configuration makes the data writable again.
+PERMANENT_STATUSES = (400, 413, 422)
+
+
+def is_permanent(error):
+    """
+    Whether a failed write should be given up instead of retried. Errors without an HTTP
+    status (timeouts, refused connections) are always retried.
+    """
+    return getattr(error, "status", None) in PERMANENT_STATUSES
+
+
+class WriteSpool:
+    def __init__(self, directory, segment_size=16 * 1024 * 1024, max_bytes=512 * 1024 * 1024):
+        """
+        Durable, append-only on-disk queue for write batches that could not be sent to InfluxDB.
+
+        Batches are appended to memory-mapped, preallocated segment files and read back in the
+        order they were written. When the spool grows past max_bytes the oldest segment is evicted.
+
+        Args:
+            directory (str): Directory holding the segment files and the read cursor.
+            segment_size (int): Size of each preallocated segment file in bytes.
+            max_bytes (int): Upper bound on the disk space used by all segments.
+        """
+        self.directory = directory
+        self.segment_size = segment_size
+        self.max_bytes = max_bytes
+        self.evicted_segments = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(directory, exist_ok=True)
+        self._segments = sorted(
+            int(name[:-len(SEGMENT_SUFFIX)]) for name in os.listdir(directory)
+            if name.endswith(SEGMENT_SUFFIX))
+        self._cursor = self._load_cursor()
+
+        self._active = None  # (sequence, file, mmap)
+        self._offset = 0
+        if self._segments:
+            sequence = self._segments[-1]
+            self._open_active(sequence)
+            self._offset = self._scan_end(sequence)
+
+    # --- Writing ---
+
+    def append(self, bucket, payload):
+        """
+        Durably queue one batch.
+
+        Args:
+            bucket (str): Bucket the batch belongs to.
+            payload (str): Line protocol for the batch, one point per line.
+        """
+        data = f"{bucket}\n{payload}".encode()
+        size = RECORD_HEADER.size + len(data)
+        with self._lock:
+            # Leave room for the zero header that marks the end of the segment
+            if self._active is None or self._offset + size + RECORD_HEADER.size > len(self._active[2]):
+                self._roll(size + RECORD_HEADER.size)
+            mapped = self._active[2]
+            mapped[self._offset + RECORD_HEADER.size:self._offset + size] = data
+            RECORD_HEADER.pack_into(mapped, self._offset, len(data), zlib.crc32(data))
+            self._offset += size
+            self._evict()
+
+    def _roll(self, needed):
+        sequence = self._segments[-1] + 1 if self._segments else 0
+        self._close_active()
+        path = self._segment_path(sequence)
+        with open(path, "wb") as f:
+            f.truncate(max(self.segment_size, needed))
+        self._segments.append(sequence)
+        self._open_active(sequence)
+        self._offset = 0
+
+    def _open_active(self, sequence):
+        f = open(self._segment_path(sequence), "r+b")
+        self._active = (sequence, f, mmap.mmap(f.fileno(), 0))
+
+    def _close_active(self):
+        if self._active is not None:
+            _, f, mapped = self._active
+            mapped.flush()
+            mapped.close()
+            f.close()
+            self._active = None
+
+    def _evict(self):
+        while len(self._segments) > 1 and self._disk_usage() > self.max_bytes:
+            sequence = self._segments.pop(0)
+            os.remove(self._segment_path(sequence))
+            self.evicted_segments += 1
+            print(f"[WARNING] Write spool full, evicted oldest segment {sequence}")
+            if self._cursor[0] <= sequence:
+                self._save_cursor((self._segments[0], 0))
+
+    def _disk_usage(self):
+        return sum(os.path.getsize(self._segment_path(s)) for s in self._segments)
+
+    # --- Reading ---
+
+    def peek(self):
+        """
+        Oldest batch that has not been committed yet.
+
+        Returns:
+            tuple: (bucket, payload, position) or None when the spool is drained. Pass the
+                position to commit() once the batch has been written.
+        """
+        with self._lock:
+            while self._segments:
+                sequence, offset = self._cursor
+                if sequence < self._segments[0]:
+                    sequence, offset = self._segments[0], 0
+                record = self._read(sequence, offset)
+                if record is not None:
+                    data, next_offset = record
+                    bucket, _, payload = data.decode().partition("\n")
+                    return bucket, payload, (sequence, next_offset)
+                if sequence == self._active[0]:
+                    return None
+                # Fully replayed sealed segment
+                self._segments.remove(sequence)
+                os.remove(self._segment_path(sequence))
+                self._save_cursor((self._segments[0], 0))
+            return None
+
+    def commit(self, position):
+        """
+        Mark everything up to `position` (from peek) as written.
+        """
+        with self._lock:
+            self._save_cursor(position)
+
+    def pending(self):
+        """
+        True if at least one batch is waiting to be replayed.
+        """
+        with self._lock:
+            sequence, offset = self._cursor
+            if not self._segments:
+                return False
+            if sequence < self._segments[0]:
+                sequence, offset = self._segments[0], 0
+            return sequence != self._active[0] or offset < self._offset
+
+    def _read(self, sequence, offset):
+        if sequence == self._active[0]:
+            mapped = self._active[2]
+            if offset + RECORD_HEADER.size > self._offset:
+                return None
+            length, crc = RECORD_HEADER.unpack_from(mapped, offset)
+            start = offset + RECORD_HEADER.size
+            return bytes(mapped[start:start + length]), start + length
+
+        with open(self._segment_path(sequence), "rb") as f:
+            f.seek(offset)
+            header = f.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                return None
+            length, crc = RECORD_HEADER.unpack(header)
+            data = f.read(length)
+        if length == 0 or len(data) < length or zlib.crc32(data) != crc:
+            return None
+        return data, offset + RECORD_HEADER.size + length
+
+    def _scan_end(self, sequence):
+        """
+        Offset just past the last intact record of a segment (used after a restart).
+        """
+        mapped = self._active[2]
+        offset = 0
+        while offset + RECORD_HEADER.size <= len(mapped):
+            length, crc = RECORD_HEADER.unpack_from(mapped, offset)
+            start = offset + RECORD_HEADER.size
+            if length == 0 or start + length > len(mapped) \
+                    or zlib.crc32(mapped[start:start + length]) != crc:
+                break
+            offset = start + length
+        return offset
+
+    # --- Cursor ---
+
+    def _load_cursor(self):
+        try:
+            with open(os.path.join(self.directory, CURSOR_FILE)) as f:
+                sequence, offset = f.read().split()
+                return int(sequence), int(offset)
+        except (OSError, ValueError):
+            return (self._segments[0], 0) if self._segments else (0, 0)
+
+    def _save_cursor(self, position):
+        self._cursor = position
+        path = os.path.join(self.directory, CURSOR_FILE)
+        with open(f"{path}.tmp", "w") as f:
+            f.write(f"{position[0]} {position[1]}")
+        os.replace(f"{path}.tmp", path)
+
+    def _segment_path(self, sequence):
+        return os.path.join(self.directory, f"{sequence:012d}{SEGMENT_SUFFIX}")
+
+    def close(self):
+        with self._lock:
+            self._close_active()
+
+
+class SpoolReplayer:
+    def __init__(self, spool, write_apis, rate=5.0, retry_interval=5.0, metrics=None):
+        """
+        Background thread that drains a WriteSpool into InfluxDB in order, at a bounded rate.
+
+        Failed batches are retried until InfluxDB accepts them, except batches it rejects for
+        good (see is_permanent): those are dropped and counted, so one bad batch cannot stop
+        replay of everything spooled behind it.
+
+        Args:
+            spool (WriteSpool): Spool to replay.
+            write_apis (dict): {bucket: synchronous WriteApi} used to resend batches.
+            rate (float): Maximum batches replayed per second, so recovery does not swamp InfluxDB.
+            retry_interval (float): Seconds to wait after a failed replay before trying again.
+            metrics (Metrics): Optional metrics counting rejected batches per bucket.
+        """
+        self.spool = spool
+        self.write_apis = write_apis
+        self.rate = rate
+        self.retry_interval = retry_interval
+        self.metrics = metrics
+        self.replayed = 0
+        self.rejected = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="spool-replayer", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            record = self.spool.peek()
+            if record is None:
+                self._stop.wait(1.0)
+                continue
+
+            bucket, payload, position = record
+            try:
+                self.write_apis[bucket].write(bucket=bucket, record=payload)
+            except Exception as e:
+                if not is_permanent(e):
+                    print(f"[WARNING] Spool replay to {bucket} failed, retrying later: {e}")
+                    self._stop.wait(self.retry_interval)
+                    continue
+                print(f"[ERROR] InfluxDB rejected a spooled batch for {bucket} "
+                      f"({len(payload.splitlines())} lines), dropping it: {e}")
+                self.spool.commit(position)
+                self.rejected += 1
+                if self.metrics:
+                    self.metrics.spool_rejected.inc(bucket)
+                continue
+
+            self.spool.commit(position)
+            self.replayed += 1
+            self._stop.wait(1.0 / self.rate)
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        self._thread.join(timeout)